@@ -5,6 +5,8 @@ from flask import Flask, render_template, request, jsonify
 from flask_cors import CORS
 from datetime import datetime
 from debenture_calculator import DebentureCalculator
+from ipca_index import normalize_month_key
+from ipca_store import default_ipca_store, parse_index_csv
 import traceback
 
 app = Flask(__name__)
@@ -29,18 +31,9 @@ def parse_ipca_indices(raw_text: str):
         if '=' not in sanitized:
             continue
         key_part, value_part = sanitized.split('=', 1)
-        key = key_part.strip().replace('/', '-').replace(' ', '')
+        key = normalize_month_key(key_part)
         value_str = value_part.strip()
 
-        if len(key) == 6 and key.isdigit():
-            key = f"{key[:4]}-{key[4:]}"
-        elif len(key) == 7 and key[4] == '-':
-            key = f"{key[:4]}-{key[5:].zfill(2)}"
-        else:
-            parts = key.split('-')
-            if len(parts) == 2 and len(parts[0]) == 4 and parts[1].isdigit():
-                key = f"{parts[0]}-{parts[1].zfill(2)}"
-
         try:
             value = float(value_str)
         except ValueError:
@@ -52,6 +45,71 @@ def parse_ipca_indices(raw_text: str):
     normalized_text = '\n'.join(normalized_lines)
     return indices, normalized_text
 
+def resolve_ipca_indices(data: dict):
+    """
+    Índices NI da requisição: série armazenada no servidor ('ipca_indices_source':
+    'store') ou texto YYYY-MM=indice enviado no campo 'ipca_indices'.
+    Retorna tupla (índices para a calculadora, texto_normalizado, quantidade, versão).
+    """
+    if data.get('ipca_indices_source') == 'store':
+        index = default_ipca_store.index()
+        return index, None, len(index.indices), index.version
+
+    indices, text = parse_ipca_indices(data.get('ipca_indices', ''))
+    return indices, text, len(indices), None
+
+def load_calculator_curves(calc: DebentureCalculator, indexador: str, use_curve: bool,
+                           emission_date: datetime, ipca_projected_annual: float):
+    """
+    Carrega as curvas da ETTJ conforme o indexador
+    Retorna tupla (curva_carregada, informações da curva para a resposta).
+    """
+    curve_loaded = False
+    curve_info = None
+
+    if indexador == 'CDI' and use_curve:
+        curve_loaded = calc.load_di_curve(emission_date)
+        if curve_loaded and calc.di_curve is not None:
+            curve_info = {
+                'loaded': True,
+                'type': 'PRE',
+                'vertices_count': len(calc.di_curve),
+                'min_days': int(calc.di_curve['dias_uteis'].min()),
+                'max_days': int(calc.di_curve['dias_uteis'].max())
+            }
+
+    elif indexador == 'IPCA' and use_curve:
+        # Para IPCA implícito, precisa carregar AMBAS as curvas (PRE e NTN-B)
+        # Um único download da ETTJ alimenta as duas curvas
+        di_loaded, ipca_loaded = calc.load_curves(emission_date)
+
+        if di_loaded and ipca_loaded and calc.di_curve is not None and calc.ipca_curve is not None:
+            curve_info = {
+                'loaded': True,
+                'type': 'NTN-B + PRE (IPCA implícito)',
+                'vertices_count': len(calc.ipca_curve),
+                'min_days': int(calc.ipca_curve['dias_uteis'].min()),
+                'max_days': int(calc.ipca_curve['dias_uteis'].max())
+            }
+            curve_loaded = True
+        elif ipca_loaded and calc.ipca_curve is not None:
+            # Fallback: só NTN-B carregada (usa IPCA projetado manual)
+            curve_info = {
+                'loaded': True,
+                'type': 'NTN-B (taxa real)',
+                'vertices_count': len(calc.ipca_curve),
+                'min_days': int(calc.ipca_curve['dias_uteis'].min()),
+                'max_days': int(calc.ipca_curve['dias_uteis'].max())
+            }
+            curve_loaded = True
+            # Carrega projeções IPCA manual como fallback
+            calc.load_ipca_projections(ipca_projected_annual)
+        else:
+            # Nenhuma curva carregada, usa IPCA projetado manual
+            calc.load_ipca_projections(ipca_projected_annual)
+
+    return curve_loaded, curve_info
+
 @app.route('/')
 def index():
     """Página principal com formulário"""
@@ -79,6 +137,9 @@ def calculate():
         amort_type = data['amort_type']
         grace_months = int(data.get('grace_period_months', 0))
         use_curve = data.get('use_curve', False)
+        curve_interpolation = data.get('curve_interpolation', 'linear')
+        cdi_projection = data.get('cdi_projection', 'spot')
+        engine = data.get('engine', 'loop')
         cdi_rate = float(data.get('cdi_rate', 0))
 
         # Novos parâmetros para IPCA+
@@ -86,8 +147,7 @@ def calculate():
         anniversary_day_ipca = int(data.get('anniversary_day_ipca', 15))
         ipca_projected_annual = float(data.get('ipca_projected_annual', 4.5))
 
-        ipca_indices_raw = data.get('ipca_indices', '')
-        ipca_indices, ipca_indices_text = parse_ipca_indices(ipca_indices_raw)
+        ipca_indices, ipca_indices_text, ipca_indices_count, ipca_index_version = resolve_ipca_indices(data)
 
         # Valida datas
         if maturity_date <= emission_date:
@@ -95,51 +155,12 @@ def calculate():
 
         # Cria calculadora
         calc = DebentureCalculator()
+        calc.set_curve_interpolation(curve_interpolation)
 
         # Carrega curva conforme indexador
-        curve_loaded = False
-        curve_info = None
-
-        if indexador == 'CDI' and use_curve:
-            curve_loaded = calc.load_di_curve(emission_date)
-            if curve_loaded and calc.di_curve is not None:
-                curve_info = {
-                    'loaded': True,
-                    'type': 'PRE',
-                    'vertices_count': len(calc.di_curve),
-                    'min_days': int(calc.di_curve['dias_uteis'].min()),
-                    'max_days': int(calc.di_curve['dias_uteis'].max())
-                }
-
-        elif indexador == 'IPCA' and use_curve:
-            # Para IPCA implícito, precisa carregar AMBAS as curvas (PRE e NTN-B)
-            di_loaded = calc.load_di_curve(emission_date)
-            ipca_loaded = calc.load_ipca_curve(emission_date)
-
-            if di_loaded and ipca_loaded and calc.di_curve is not None and calc.ipca_curve is not None:
-                curve_info = {
-                    'loaded': True,
-                    'type': 'NTN-B + PRE (IPCA implícito)',
-                    'vertices_count': len(calc.ipca_curve),
-                    'min_days': int(calc.ipca_curve['dias_uteis'].min()),
-                    'max_days': int(calc.ipca_curve['dias_uteis'].max())
-                }
-                curve_loaded = True
-            elif ipca_loaded and calc.ipca_curve is not None:
-                # Fallback: só NTN-B carregada (usa IPCA projetado manual)
-                curve_info = {
-                    'loaded': True,
-                    'type': 'NTN-B (taxa real)',
-                    'vertices_count': len(calc.ipca_curve),
-                    'min_days': int(calc.ipca_curve['dias_uteis'].min()),
-                    'max_days': int(calc.ipca_curve['dias_uteis'].max())
-                }
-                curve_loaded = True
-                # Carrega projeções IPCA manual como fallback
-                calc.load_ipca_projections(ipca_projected_annual)
-            else:
-                # Nenhuma curva carregada, usa IPCA projetado manual
-                calc.load_ipca_projections(ipca_projected_annual)
+        curve_loaded, curve_info = load_calculator_curves(
+            calc, indexador, use_curve, emission_date, ipca_projected_annual
+        )
 
         # Gera fluxo de caixa
         cash_flow = calc.generate_cash_flow(
@@ -155,7 +176,9 @@ def calculate():
             indexador=indexador,
             anniversary_day_ipca=anniversary_day_ipca,
             ipca_projected_annual=ipca_projected_annual,
-            ipca_custom_indices=ipca_indices if indexador == 'IPCA' else None
+            ipca_custom_indices=ipca_indices if indexador == 'IPCA' else None,
+            cdi_projection=cdi_projection,
+            engine=engine
         )
 
         # Calcula métricas
@@ -182,11 +205,14 @@ def calculate():
                 'amort_type': amort_type,
                 'grace_period_months': grace_months,
                 'use_curve': use_curve,
+                'curve_interpolation': curve_interpolation if use_curve else None,
+                'cdi_projection': cdi_projection if use_curve and indexador == 'CDI' else None,
                 'indexador': indexador,
                 'anniversary_day_ipca': anniversary_day_ipca if indexador == 'IPCA' else None,
                 'ipca_projected_annual': ipca_projected_annual if indexador == 'IPCA' else None,
                 'ipca_indices_text': ipca_indices_text if indexador == 'IPCA' else None,
-                'ipca_indices_count': len(ipca_indices) if indexador == 'IPCA' else 0
+                'ipca_indices_count': ipca_indices_count if indexador == 'IPCA' else 0,
+                'ipca_index_version': ipca_index_version if indexador == 'IPCA' else None
             },
             'curve_info': curve_info
         }
@@ -201,6 +227,210 @@ def calculate():
             'error': f'Erro ao calcular: {str(e)}'
         }), 500
 
+@app.route('/sweep', methods=['POST'])
+def sweep():
+    """
+    Endpoint para calcular vários cenários do mesmo título
+
+    Mesmos campos de /calculate, mais listas opcionais 'spreads', 'cdi_rates'
+    e 'vnes' (VNE unitário) e 'grid' (todas as combinações). Cronograma e
+    curvas são processados uma vez para todos os cenários.
+    """
+    try:
+        data = request.json
+
+        emission_date = datetime.strptime(data['emission_date'], '%Y-%m-%d')
+        maturity_date = datetime.strptime(data['maturity_date'], '%Y-%m-%d')
+        if maturity_date <= emission_date:
+            return jsonify({'error': 'Data de vencimento deve ser posterior à emissão'}), 400
+
+        quantity = int(data.get('quantity', 1) or 1)
+        if quantity < 1:
+            quantity = 1
+        vnes = [float(v) * quantity for v in (data.get('vnes') or [data.get('vne', 1000.00) or 1000.00])]
+        spreads = [float(v) for v in (data.get('spreads') or [data['spread']])]
+        cdi_rates = [float(v) for v in (data.get('cdi_rates') or [data.get('cdi_rate', 0)])]
+
+        interest_freq = data['interest_frequency']
+        amort_type = data['amort_type']
+        grace_months = int(data.get('grace_period_months', 0))
+        use_curve = data.get('use_curve', False)
+        curve_interpolation = data.get('curve_interpolation', 'linear')
+        cdi_projection = data.get('cdi_projection', 'spot')
+        include_cash_flow = data.get('include_cash_flow', True)
+
+        indexador = data.get('indexador', 'CDI')
+        anniversary_day_ipca = int(data.get('anniversary_day_ipca', 15))
+        ipca_projected_annual = float(data.get('ipca_projected_annual', 4.5))
+        ipca_indices, _, _, ipca_index_version = resolve_ipca_indices(data)
+
+        calc = DebentureCalculator()
+        calc.set_curve_interpolation(curve_interpolation)
+        _, curve_info = load_calculator_curves(
+            calc, indexador, use_curve, emission_date, ipca_projected_annual
+        )
+
+        scenarios = calc.sweep(
+            emission_date=emission_date,
+            maturity_date=maturity_date,
+            vne=vnes,
+            cdi_rate_annual=cdi_rates,
+            spread_annual=spreads,
+            interest_frequency=interest_freq,
+            amort_type=amort_type,
+            grace_period_months=grace_months,
+            indexador=indexador,
+            anniversary_day_ipca=anniversary_day_ipca,
+            ipca_projected_annual=ipca_projected_annual,
+            ipca_custom_indices=ipca_indices if indexador == 'IPCA' else None,
+            cdi_projection=cdi_projection,
+            grid=bool(data.get('grid', False))
+        )
+
+        results = []
+        for scenario in scenarios:
+            result = {
+                'vne': scenario['vne'],
+                'cdi_rate': scenario['cdi_rate'],
+                'spread': scenario['spread'],
+                'metrics': scenario['metrics']
+            }
+            if include_cash_flow:
+                result['cash_flow'] = calc.cash_flow_to_json(scenario['cash_flow'])
+            results.append(result)
+
+        return jsonify({
+            'success': True,
+            'scenarios': results,
+            'curve_info': curve_info,
+            'ipca_index_version': ipca_index_version if indexador == 'IPCA' else None
+        })
+
+    except Exception as e:
+        print(f"Erro no cálculo: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': f'Erro ao calcular: {str(e)}'
+        }), 500
+
+@app.route('/key_rate_dv01', methods=['POST'])
+def key_rate_dv01():
+    """
+    Endpoint de sensibilidade às curvas da ETTJ (DV01 e DV01 por vértice)
+
+    Mesmos campos de /calculate (as curvas são sempre carregadas), mais
+    'settlement_date' (YYYY-MM-DD, opcional) e 'bump_bp' (padrão 1).
+    Retorna a sensibilidade à curva PRE e, para IPCA+, à curva de juros reais.
+    """
+    try:
+        data = request.json
+
+        emission_date = datetime.strptime(data['emission_date'], '%Y-%m-%d')
+        maturity_date = datetime.strptime(data['maturity_date'], '%Y-%m-%d')
+        if maturity_date <= emission_date:
+            return jsonify({'error': 'Data de vencimento deve ser posterior à emissão'}), 400
+        settlement_date = data.get('settlement_date')
+        settlement_date = datetime.strptime(settlement_date, '%Y-%m-%d') if settlement_date else None
+        bump_bp = float(data.get('bump_bp', 1.0))
+
+        quantity = max(int(data.get('quantity', 1) or 1), 1)
+        vne_total = float(data.get('vne', 1000.00) or 1000.00) * quantity
+        indexador = data.get('indexador', 'CDI')
+        ipca_projected_annual = float(data.get('ipca_projected_annual', 4.5))
+        ipca_indices, _, _, ipca_index_version = resolve_ipca_indices(data)
+
+        calc = DebentureCalculator()
+        calc.set_curve_interpolation(data.get('curve_interpolation', 'linear'))
+        # IPCA+ carrega as curvas PRE e NTN-B; CDI+ só a PRE
+        _, curve_info = load_calculator_curves(calc, indexador, True, emission_date, ipca_projected_annual)
+
+        cash_flow = calc.generate_cash_flow(
+            emission_date=emission_date,
+            maturity_date=maturity_date,
+            vne=vne_total,
+            cdi_rate_annual=float(data.get('cdi_rate', 0)),
+            spread_annual=float(data['spread']),
+            interest_frequency=data['interest_frequency'],
+            amort_type=data['amort_type'],
+            grace_period_months=int(data.get('grace_period_months', 0)),
+            indexador=indexador,
+            anniversary_day_ipca=int(data.get('anniversary_day_ipca', 15)),
+            ipca_projected_annual=ipca_projected_annual,
+            ipca_custom_indices=ipca_indices if indexador == 'IPCA' else None,
+            cdi_projection=data.get('cdi_projection', 'spot'),
+            engine='vectorized'
+        )
+
+        sensitivities = {}
+        curves = ('pre', 'ipca') if indexador == 'IPCA' else ('pre',)
+        for curve in curves:
+            if (calc.pre_curve if curve == 'pre' else calc.real_curve) is None:
+                continue
+            result = calc.key_rate_dv01(cash_flow, curve, settlement_date, bump_bp)
+            sensitivities[curve] = {
+                'vertices': result['vertices'].tolist(),
+                'pv': float(result['pv']),
+                'dv01': float(result['dv01']),
+                'key_rate_dv01': result['key_rate_dv01'].tolist(),
+                'key_rate_duration': result['key_rate_duration'].tolist(),
+            }
+        if not sensitivities:
+            return jsonify({'success': False, 'error': 'Não foi possível carregar as curvas da ETTJ'}), 500
+
+        return jsonify({
+            'success': True,
+            'sensitivities': sensitivities,
+            'bump_bp': bump_bp,
+            'curve_info': curve_info,
+            'ipca_index_version': ipca_index_version if indexador == 'IPCA' else None
+        })
+
+    except Exception as e:
+        print(f"Erro no cálculo: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': f'Erro ao calcular: {str(e)}'
+        }), 500
+
+@app.route('/ipca_indices', methods=['GET', 'POST'])
+def ipca_indices():
+    """
+    Série de números-índice do IPCA armazenada no servidor
+
+    GET: versão e resumo da série.
+    POST: atualização em lote por CSV (arquivo 'file', corpo text/csv ou JSON
+    {'csv': texto}); 'replace' descarta a série anterior. As requisições de
+    cálculo usam a série com 'ipca_indices_source': 'store'.
+    """
+    try:
+        if request.method == 'GET':
+            return jsonify({'success': True, **default_ipca_store.info()})
+
+        replace = request.args.get('replace', '').lower() in ('1', 'true')
+        if 'file' in request.files:
+            text = request.files['file'].read().decode('utf-8-sig')
+        elif request.is_json:
+            payload = request.json
+            text = payload.get('csv', '')
+            replace = replace or bool(payload.get('replace', False))
+        else:
+            text = request.get_data(as_text=True)
+
+        indices = parse_index_csv(text)
+        if not indices:
+            return jsonify({'success': False, 'error': 'Nenhum número-índice válido no CSV'}), 400
+
+        return jsonify({'success': True, **default_ipca_store.update(indices, replace=replace)})
+
+    except Exception as e:
+        print(f"Erro ao atualizar indices IPCA: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Erro ao atualizar índices: {str(e)}'
+        }), 500
+
 @app.route('/get_di_curve', methods=['GET'])
 def get_di_curve():
     """Endpoint para carregar curva DI"""
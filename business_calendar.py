@@ -0,0 +1,431 @@
+"""
+Calendário de dias úteis indexado (padrão ANBIMA)
+Índice cumulativo por ordinal de data - contagens em tempo constante
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Union
+import itertools
+import os
+import re
+import tempfile
+import threading
+import holidays
+import numpy as np
+
+DateLike = Union[date, datetime]
+
+# Ordinal de 1970-01-01 (origem do datetime64)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Anos que podem ser materializados sob demanda no índice de dias úteis
+MIN_INDEX_YEAR = 1900
+MAX_INDEX_YEAR = 2200
+
+# Folga (dias corridos) garantida no índice ao rolar para o próximo dia útil
+_ROLL_MARGIN_DAYS = 10
+
+# Anos materializados além do pedido a cada extensão do índice (crescimento em blocos)
+_EXTEND_MARGIN_YEARS = 10
+
+# Arquivo local com a lista oficial de feriados ANBIMA (texto/CSV ou .npy compilado)
+ANBIMA_CALENDAR_ENV = 'ANBIMA_CALENDAR_FILE'
+
+# Datas aceitas no arquivo ANBIMA: dd/mm/aaaa ou aaaa-mm-dd
+_DATE_PATTERN = re.compile(r'(\d{2})/(\d{2})/(\d{4})|(\d{4})-(\d{2})-(\d{2})')
+
+# Versões dos calendários criados no processo (uma por instância)
+_calendar_versions = itertools.count(1)
+
+
+def _to_ordinals(dates) -> np.ndarray:
+    """Converte array datetime64 (ou lista de datas) em ordinais de data (int64)"""
+    days = np.atleast_1d(np.asarray(dates, dtype='datetime64[D]'))
+    return days.astype(np.int64) + _EPOCH_ORDINAL
+
+
+def _from_ordinals(ordinals: np.ndarray) -> np.ndarray:
+    """Converte ordinais de data em array datetime64[D]"""
+    return (np.asarray(ordinals, dtype=np.int64) - _EPOCH_ORDINAL).astype('datetime64[D]')
+
+
+def _compiled_path(path: str) -> str:
+    """Caminho do calendário compilado, sempre com extensão .npy (np.save a acrescentaria)"""
+    return path if path.endswith('.npy') else path + '.npy'
+
+
+def _cumulate(business: np.ndarray) -> np.ndarray:
+    """Índice cumulativo imutável a partir da máscara de dias úteis"""
+    cumulative = np.zeros(len(business) + 1, dtype=np.int32)
+    np.cumsum(business, out=cumulative[1:])
+    return _freeze(cumulative)
+
+
+def _freeze(array: np.ndarray) -> np.ndarray:
+    # Índice imutável: pode ser compartilhado entre instâncias e threads
+    array.flags.writeable = False
+    return array
+
+
+class BusinessCalendar:
+    """
+    Índice de dias úteis pré-computado
+
+    Guarda um array cumulativo onde cumulative[i] é o número de dias úteis
+    no intervalo [start_ordinal, start_ordinal + i). Com isso:
+    - dias úteis entre duas datas = diferença de duas posições do array
+    - dia útil = cumulative[i + 1] > cumulative[i]
+    - próximo dia útil = busca binária no array cumulativo
+
+    O índice é estendido sob demanda na primeira vez que uma data fora dele é
+    consultada, mantendo-se sempre contíguo: cada extensão cobre de uma vez
+    todo o intervalo pedido mais _EXTEND_MARGIN_YEARS anos no lado que cresce,
+    então consultas em anos vizinhos não copiam o índice de novo. Cada extensão
+    publica um novo array imutável, então leituras concorrentes são seguras.
+    Datas fora de [MIN_INDEX_YEAR, MAX_INDEX_YEAR] usam o cálculo dia a dia.
+
+    holidays_calendar: objeto holidays usado para materializar anos novos
+    start_year, end_year: janela pré-carregada (default: nenhuma, tudo sob demanda)
+    holiday_dates: feriados da janela pré-carregada (default: os do holidays_calendar)
+
+    version identifica o conjunto de feriados da instância: estender o índice
+    não muda os dias úteis já conhecidos, então resultados derivados do
+    calendário (ex: cronogramas em cache) valem enquanto a versão for a mesma.
+    """
+
+    def __init__(self, holidays_calendar, start_year: int = None, end_year: int = None,
+                 holiday_dates: Iterable[date] = None):
+        # Feriados (objeto holidays ou qualquer container de datas)
+        self.holidays = holidays_calendar
+        self.version = next(_calendar_versions)
+        self._lock = threading.Lock()
+        # Índice atual: (ordinal da primeira data, array cumulativo imutável)
+        self._index = (0, _freeze(np.zeros(1, dtype=np.int32)))
+
+        if start_year is not None:
+            end_year = start_year if end_year is None else end_year
+            business = self._business_mask(start_year, end_year, holiday_dates)
+            self._index = (date(start_year, 1, 1).toordinal(), _cumulate(business))
+
+    @classmethod
+    def from_anbima_file(cls, path: str) -> 'BusinessCalendar':
+        """
+        Constrói o calendário a partir da lista oficial de feriados ANBIMA
+
+        A janela pré-carregada cobre os anos presentes no arquivo; anos fora
+        dela são materializados pelo calendário algorítmico do pacote holidays.
+        """
+        holiday_dates = load_anbima_holidays(path)
+        if not holiday_dates:
+            raise ValueError(f"Nenhum feriado encontrado no arquivo ANBIMA: {path}")
+        years = [d.year for d in holiday_dates]
+        return cls(holidays.Brazil(), min(years), max(years), holiday_dates=holiday_dates)
+
+    @classmethod
+    def from_compiled(cls, path: str) -> 'BusinessCalendar':
+        """
+        Abre um calendário compilado (.npy) via memory-map, sem nenhum cálculo
+
+        Formato: array int32 onde o elemento 0 é o ordinal da primeira data e os
+        demais são o índice cumulativo de dias úteis (ver save).
+        """
+        data = np.load(path, mmap_mode='r')
+        return cls.from_index(int(data[0]), data[1:])
+
+    @classmethod
+    def from_index(cls, start_ordinal: int, cumulative: np.ndarray, holidays_calendar=None) -> 'BusinessCalendar':
+        """
+        Usa um índice cumulativo já pronto (memory-map, memória compartilhada), sem cópia
+
+        Anos fora do índice continuam sendo materializados sob demanda pelo
+        holidays_calendar (default: holidays.Brazil()).
+        """
+        calendar = cls(holidays_calendar if holidays_calendar is not None else holidays.Brazil())
+        calendar._index = (int(start_ordinal), cumulative)
+        return calendar
+
+    @property
+    def start_ordinal(self) -> int:
+        return self._index[0]
+
+    @property
+    def end_ordinal(self) -> int:
+        start, cumulative = self._index
+        return start + len(cumulative) - 1
+
+    @property
+    def cumulative(self) -> np.ndarray:
+        return self._index[1]
+
+    def save(self, path: str) -> str:
+        """
+        Grava o índice em formato binário compacto (.npy) para memory-map
+
+        Retorna o caminho gravado (com extensão .npy).
+        """
+        path = _compiled_path(path)
+        start, cumulative = self._index
+        data = np.empty(len(cumulative) + 1, dtype=np.int32)
+        data[0] = start
+        data[1:] = cumulative
+
+        # Escrita atômica: outro processo pode abrir o arquivo (from_compiled) a qualquer momento
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.npy')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return path
+
+    def reserve(self, first_date: DateLike, last_date: DateLike):
+        """Garante que o índice cubra as datas de first_date a last_date (inclusive)"""
+        self._covering_index(first_date.toordinal(), last_date.toordinal())
+
+    def _business_mask(self, first_year: int, last_year: int, holiday_dates: Iterable[date] = None) -> np.ndarray:
+        """Dias úteis (bool por dia) de first_year a last_year, inclusive"""
+        if first_year > last_year:
+            return np.zeros(0, dtype=bool)
+
+        first = date(first_year, 1, 1).toordinal()
+        last = date(last_year + 1, 1, 1).toordinal()
+        ordinals = np.arange(first, last, dtype=np.int64)
+        # date.fromordinal(1) é uma segunda-feira: weekday = (ordinal - 1) % 7
+        business = (ordinals - 1) % 7 < 5
+
+        if holiday_dates is None:
+            # Força o pacote holidays a popular os anos pedidos (expand=True)
+            for year in range(first_year, last_year + 1):
+                date(year, 1, 1) in self.holidays
+            holiday_dates = self.holidays
+        holiday_ordinals = np.array([d.toordinal() for d in holiday_dates], dtype=np.int64)
+        in_range = (holiday_ordinals >= first) & (holiday_ordinals < last)
+        business[holiday_ordinals[in_range] - first] = False
+        return business
+
+    def _extend(self, first_year: int, last_year: int):
+        """Materializa os anos pedidos (mais a folga), mantendo o índice contíguo"""
+        with self._lock:
+            start, cumulative = self._index
+            if len(cumulative) > 1:
+                current_first = date.fromordinal(start).year
+                current_last = date.fromordinal(start + len(cumulative) - 2).year
+                if current_first <= first_year and last_year <= current_last:
+                    return
+                # Só o lado que cresce ganha folga
+                if first_year < current_first:
+                    first_year = max(MIN_INDEX_YEAR, first_year - _EXTEND_MARGIN_YEARS)
+                else:
+                    first_year = current_first
+                if last_year > current_last:
+                    last_year = min(MAX_INDEX_YEAR, last_year + _EXTEND_MARGIN_YEARS)
+                else:
+                    last_year = current_last
+                business = np.concatenate([
+                    self._business_mask(first_year, current_first - 1),
+                    np.diff(cumulative) > 0,
+                    self._business_mask(current_last + 1, last_year),
+                ])
+            else:
+                last_year = min(MAX_INDEX_YEAR, last_year + _EXTEND_MARGIN_YEARS)
+                business = self._business_mask(first_year, last_year)
+
+            self._index = (date(first_year, 1, 1).toordinal(), _cumulate(business))
+
+    def _covering_index(self, first_ordinal: int, last_ordinal: int):
+        """
+        Retorna (start_ordinal, cumulative) cobrindo os dias [first_ordinal, last_ordinal],
+        estendendo o índice se necessário. Retorna None fora dos anos indexáveis.
+        """
+        start, cumulative = self._index
+        if start <= first_ordinal and last_ordinal < start + len(cumulative) - 1:
+            return start, cumulative
+
+        first_year = date.fromordinal(first_ordinal).year
+        last_year = date.fromordinal(last_ordinal).year
+        if first_year < MIN_INDEX_YEAR or last_year > MAX_INDEX_YEAR:
+            return None
+
+        self._extend(first_year, last_year)
+        return self._index
+
+    def is_business_day(self, date: DateLike) -> bool:
+        """Verifica se é dia útil (exclui sábados, domingos e feriados nacionais)"""
+        ordinal = date.toordinal()
+        index = self._covering_index(ordinal, ordinal)
+        if index is not None:
+            start, cumulative = index
+            i = ordinal - start
+            return bool(cumulative[i + 1] > cumulative[i])
+        return date.weekday() < 5 and date not in self.holidays
+
+    def next_business_day(self, date: DateLike) -> DateLike:
+        """Retorna o próximo dia útil (a própria data se já for dia útil)"""
+        ordinal = date.toordinal()
+        index = self._covering_index(ordinal, ordinal + _ROLL_MARGIN_DAYS)
+        if index is not None:
+            start, cumulative = index
+            i = ordinal - start
+            # Primeira posição j >= i com cumulative[j + 1] = cumulative[i] + 1
+            j = int(np.searchsorted(cumulative, cumulative[i] + 1)) - 1
+            if j < len(cumulative) - 1:
+                return date + timedelta(days=j - i)
+
+        next_day = date
+        while not self.is_business_day(next_day):
+            next_day += timedelta(days=1)
+        return next_day
+
+    def count_business_days(self, start_date: DateLike, end_date: DateLike) -> int:
+        """Conta dias úteis entre duas datas (exclusive end_date)"""
+        start = start_date.toordinal()
+        end = end_date.toordinal()
+        # Mesma semântica do laço original (start + k dias < end_date):
+        # se end_date tem horário posterior ao de start_date, o dia final também conta
+        if isinstance(start_date, datetime) and isinstance(end_date, datetime) \
+                and end_date.time() > start_date.time():
+            end += 1
+
+        if end <= start:
+            return 0
+
+        index = self._covering_index(start, end - 1)
+        if index is not None:
+            first, cumulative = index
+            return int(cumulative[end - first] - cumulative[start - first])
+
+        count = 0
+        current = start_date
+        while current < end_date:
+            if self.is_business_day(current):
+                count += 1
+            current += timedelta(days=1)
+        return count
+
+    def count_business_days_batch(self, starts, ends) -> np.ndarray:
+        """
+        Versão vetorizada de count_business_days (estilo numpy.busday_count)
+
+        starts, ends: arrays datetime64 (ou listas de datas), com broadcasting
+        Retorna array int64 com os dias úteis em [start, end); pares com
+        end <= start retornam 0, como na versão escalar.
+        """
+        start, end = np.broadcast_arrays(_to_ordinals(starts), _to_ordinals(ends))
+        counts = np.zeros(start.shape, dtype=np.int64)
+
+        valid = end > start
+        if not valid.any():
+            return counts
+
+        index = self._covering_index(int(start[valid].min()), int(end[valid].max()) - 1)
+        if index is None:
+            # Algum par fora dos anos indexáveis: cálculo escalar
+            for idx in zip(*np.nonzero(valid)):
+                counts[idx] = self.count_business_days(date.fromordinal(int(start[idx])),
+                                                       date.fromordinal(int(end[idx])))
+            return counts
+
+        first, cumulative = index
+        counts[valid] = cumulative[end[valid] - first] - cumulative[start[valid] - first]
+        return counts
+
+    def roll_forward_batch(self, dates) -> np.ndarray:
+        """
+        Versão vetorizada de next_business_day (estilo numpy.busday_offset com roll='forward')
+
+        dates: array datetime64 (ou lista de datas)
+        Retorna array datetime64[D] com o próximo dia útil de cada data.
+        """
+        ordinals = _to_ordinals(dates)
+        if ordinals.size == 0:
+            return _from_ordinals(ordinals)
+
+        index = self._covering_index(int(ordinals.min()), int(ordinals.max()) + _ROLL_MARGIN_DAYS)
+        if index is None:
+            rolled = np.array([self.next_business_day(date.fromordinal(int(o))).toordinal()
+                               for o in ordinals.ravel()], dtype=np.int64)
+            return _from_ordinals(rolled.reshape(ordinals.shape))
+
+        first, cumulative = index
+        i = ordinals - first
+        rolled = np.searchsorted(cumulative, cumulative[i] + 1) - 1 + first
+        return _from_ordinals(rolled)
+
+
+def load_anbima_holidays(path: str) -> List[date]:
+    """
+    Lê a lista oficial de feriados ANBIMA de um arquivo texto/CSV
+
+    Cada linha com uma data (dd/mm/aaaa ou aaaa-mm-dd) vira um feriado;
+    cabeçalhos, nomes dos feriados e linhas sem data são ignorados.
+    """
+    holiday_dates = set()
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            match = _DATE_PATTERN.search(line)
+            if not match:
+                continue
+            if match.group(1):
+                day, month, year = match.group(1), match.group(2), match.group(3)
+            else:
+                year, month, day = match.group(4), match.group(5), match.group(6)
+            try:
+                holiday_dates.add(date(int(year), int(month), int(day)))
+            except ValueError:
+                continue
+    return sorted(holiday_dates)
+
+
+def compile_anbima_calendar(source_path: str, compiled_path: str = None) -> str:
+    """
+    Compila a lista de feriados ANBIMA em um índice binário (.npy)
+
+    Só recompila se o arquivo compilado não existir ou for mais antigo que a fonte.
+    Retorna o caminho do arquivo compilado.
+    """
+    if compiled_path is None:
+        compiled_path = os.path.splitext(source_path)[0]
+    compiled_path = _compiled_path(compiled_path)
+
+    if not os.path.exists(compiled_path) or os.path.getmtime(compiled_path) < os.path.getmtime(source_path):
+        compiled_path = BusinessCalendar.from_anbima_file(source_path).save(compiled_path)
+        print(f"[OK] Calendario ANBIMA compilado em {compiled_path}")
+
+    return compiled_path
+
+
+def load_anbima_calendar(path: str) -> BusinessCalendar:
+    """Carrega o calendário ANBIMA (compilando a lista de feriados, se necessário) via memory-map"""
+    if not path.endswith('.npy'):
+        path = compile_anbima_calendar(path)
+    return BusinessCalendar.from_compiled(path)
+
+
+# Calendário compartilhado pelo processo (criado sob demanda na primeira consulta)
+_shared_calendar = None
+_shared_calendar_lock = threading.Lock()
+
+
+def get_shared_calendar() -> BusinessCalendar:
+    """
+    Retorna o calendário de dias úteis compartilhado pelo processo
+
+    Construído uma única vez (thread-safe) e reutilizado por todas as
+    instâncias de DebentureCalculator e por todas as requisições.
+    Se a variável de ambiente ANBIMA_CALENDAR_FILE apontar para a lista oficial
+    de feriados ANBIMA, usa esse arquivo; senão, o calendário do pacote holidays,
+    com os anos materializados sob demanda.
+    """
+    global _shared_calendar
+    if _shared_calendar is None:
+        with _shared_calendar_lock:
+            if _shared_calendar is None:
+                anbima_file = os.environ.get(ANBIMA_CALENDAR_ENV)
+                if anbima_file:
+                    _shared_calendar = load_anbima_calendar(anbima_file)
+                else:
+                    _shared_calendar = BusinessCalendar(holidays.Brazil())
+    return _shared_calendar
@@ -0,0 +1,333 @@
+"""
+Fluxo de caixa em colunas (struct-of-arrays)
+Um array contíguo por campo em vez de um dicionário por evento
+"""
+
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+# Campos de cada evento, na ordem usada pelo fluxo em lista de dicionários
+ROW_KEYS = (
+    'evento', 'data', 'dias_uteis', 'dias_corridos', 'saldo_devedor', 'juros',
+    'amortizacao', 'pmt', 'taxa_cdi_efetiva', 'taxa_real_efetiva',
+    'vertice_dias_uteis', 'indexador'
+)
+# Campos adicionais do IPCA+
+IPCA_KEYS = ('vna_atualizado', 'ipca_acumulado')
+
+# Vértice ausente (taxa fixa) na coluna de vértices
+_NO_VERTEX = -1
+
+
+def _column(values, dtype) -> np.ndarray:
+    array = np.ascontiguousarray(values, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+
+class CashFlowRow(Mapping):
+    """
+    Evento do fluxo de caixa: visão somente leitura de uma linha do CashFlow
+
+    Comporta-se como o dicionário de antes (row['pmt'], row.get(...),
+    dict(row)), com valores em tipos nativos do Python.
+    """
+
+    __slots__ = ('_flow', '_index')
+
+    def __init__(self, flow: 'CashFlow', index: int):
+        self._flow = flow
+        self._index = index
+
+    def __getitem__(self, key):
+        return self._flow.value(key, self._index)
+
+    def __iter__(self):
+        return iter(self._flow.keys())
+
+    def __len__(self) -> int:
+        return len(self._flow.keys())
+
+    def copy(self) -> Dict:
+        return dict(self)
+
+    def __repr__(self) -> str:
+        return f"CashFlowRow({dict(self)!r})"
+
+
+class CashFlow:
+    """
+    Fluxo de caixa de uma debênture armazenado em colunas
+
+    Cada campo é um array NumPy somente leitura (datas em datetime64[s],
+    dias em int32, valores em float64). A taxa efetiva fica em uma única
+    coluna e é exposta como taxa_cdi_efetiva ou taxa_real_efetiva conforme
+    o indexador; colunas ausentes (vértices com taxa fixa, campos do IPCA+
+    no CDI+) não ocupam memória.
+
+    cdi_projection: modo de projeção do CDI pela curva PRE ('spot' ou
+    'forward'); None quando o fluxo não foi projetado pela curva.
+
+    Acesso por linha para os chamadores existentes: len(), iteração,
+    cash_flow[i] (CashFlowRow) e fatias (cash_flow[:10] -> CashFlow).
+    """
+
+    __slots__ = ('indexador', 'data', 'dias_uteis', 'dias_corridos', 'saldo_devedor', 'juros',
+                 'amortizacao', 'pmt', 'taxa_efetiva', 'vertice_dias_uteis',
+                 'vna_atualizado', 'ipca_acumulado', 'evento', 'cdi_projection')
+
+    # Atributos do título (não são colunas por evento)
+    _SCALARS = ('indexador', 'cdi_projection')
+
+    def __init__(self, indexador: str, data, dias_uteis, dias_corridos, saldo_devedor, juros,
+                 amortizacao, pmt, taxa_efetiva, vertice_dias_uteis=None,
+                 vna_atualizado=None, ipca_acumulado=None, evento=None, cdi_projection=None):
+        self.indexador = indexador
+        self.cdi_projection = cdi_projection
+        self.data = _column(data, 'datetime64[s]')
+        self.dias_uteis = _column(dias_uteis, np.int32)
+        self.dias_corridos = _column(dias_corridos, np.int32)
+        self.saldo_devedor = _column(saldo_devedor, np.float64)
+        self.juros = _column(juros, np.float64)
+        self.amortizacao = _column(amortizacao, np.float64)
+        self.pmt = _column(pmt, np.float64)
+        self.taxa_efetiva = _column(taxa_efetiva, np.float64)
+        self.vertice_dias_uteis = None if vertice_dias_uteis is None else _column(vertice_dias_uteis, np.int32)
+        self.vna_atualizado = None if vna_atualizado is None else _column(vna_atualizado, np.float64)
+        self.ipca_acumulado = None if ipca_acumulado is None else _column(ipca_acumulado, np.float64)
+        self.evento = _column(np.arange(1, len(self.pmt) + 1) if evento is None else evento, np.int32)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict], indexador: str = 'CDI', cdi_projection: str = None) -> 'CashFlow':
+        """Cria o fluxo em colunas a partir da lista de dicionários (um por evento)"""
+        if isinstance(rows, CashFlow):
+            return rows
+        if rows:
+            indexador = rows[0]['indexador']
+        rate_key = 'taxa_cdi_efetiva' if indexador == 'CDI' else 'taxa_real_efetiva'
+
+        vertices = [row['vertice_dias_uteis'] for row in rows]
+        if all(v is None for v in vertices):
+            vertices = None
+        else:
+            vertices = [_NO_VERTEX if v is None else v for v in vertices]
+
+        is_ipca = indexador == 'IPCA'
+        return cls(
+            indexador,
+            [row['data'] for row in rows],
+            [row['dias_uteis'] for row in rows],
+            [row['dias_corridos'] for row in rows],
+            [row['saldo_devedor'] for row in rows],
+            [row['juros'] for row in rows],
+            [row['amortizacao'] for row in rows],
+            [row['pmt'] for row in rows],
+            [row[rate_key] for row in rows],
+            vertices,
+            [row['vna_atualizado'] for row in rows] if is_ipca else None,
+            [row['ipca_acumulado'] for row in rows] if is_ipca else None,
+            [row['evento'] for row in rows],
+            cdi_projection,
+        )
+
+    def keys(self):
+        return ROW_KEYS + IPCA_KEYS if self.indexador == 'IPCA' else ROW_KEYS
+
+    def __len__(self) -> int:
+        return len(self.pmt)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield CashFlowRow(self, index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CashFlow(*(getattr(self, name) if name in self._SCALARS or getattr(self, name) is None
+                              else getattr(self, name)[index] for name in self.__slots__))
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("Evento fora do fluxo de caixa")
+        return CashFlowRow(self, index)
+
+    def column(self, key: str):
+        """Coluna do campo como array (None para campos que não se aplicam ao indexador)"""
+        if key == 'taxa_cdi_efetiva':
+            return self.taxa_efetiva if self.indexador == 'CDI' else None
+        if key == 'taxa_real_efetiva':
+            return self.taxa_efetiva if self.indexador == 'IPCA' else None
+        if key == 'indexador':
+            return np.full(len(self), self.indexador, dtype=object)
+        if key not in self.keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def value(self, key: str, index: int):
+        """Valor de um campo em um evento, como tipo nativo do Python"""
+        if key == 'indexador':
+            return self.indexador
+        if key == 'data':
+            return self.data[index].astype(datetime)
+        if key == 'vertice_dias_uteis':
+            if self.vertice_dias_uteis is None or self.vertice_dias_uteis[index] == _NO_VERTEX:
+                return None
+            return int(self.vertice_dias_uteis[index])
+        array = self.column(key)
+        return None if array is None else array[index].item()
+
+    def to_json(self) -> List[Dict]:
+        """Lista de dicionários (um por evento) com datas em 'YYYY-MM-DD', pronta para JSON"""
+        columns = {}
+        for key in self.keys():
+            if key == 'data':
+                columns[key] = np.datetime_as_string(self.data, unit='D').tolist()
+            elif key == 'indexador':
+                columns[key] = [self.indexador] * len(self)
+            elif key == 'vertice_dias_uteis' and self.vertice_dias_uteis is not None:
+                columns[key] = [None if v == _NO_VERTEX else v for v in self.vertice_dias_uteis.tolist()]
+            else:
+                array = self.column(key)
+                columns[key] = [None] * len(self) if array is None else array.tolist()
+
+        keys = list(columns)
+        return [dict(zip(keys, values)) for values in zip(*columns.values())]
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelas colunas (bytes)"""
+        return sum(getattr(self, name).nbytes for name in self.__slots__
+                   if name not in self._SCALARS and getattr(self, name) is not None)
+
+    def __repr__(self) -> str:
+        return f"CashFlow(indexador={self.indexador!r}, eventos={len(self)})"
+
+
+def as_cash_flow(cash_flow) -> CashFlow:
+    """Aceita CashFlow ou a lista de dicionários de versões anteriores"""
+    if isinstance(cash_flow, CashFlow):
+        return cash_flow
+    return CashFlow.from_rows(list(cash_flow))
+
+
+# Colunas por evento do CashFlow (tudo exceto o indexador) e seus dtypes
+_EVENT_COLUMNS = {
+    'data': 'datetime64[s]',
+    'dias_uteis': np.int32,
+    'dias_corridos': np.int32,
+    'saldo_devedor': np.float64,
+    'juros': np.float64,
+    'amortizacao': np.float64,
+    'pmt': np.float64,
+    'taxa_efetiva': np.float64,
+    'vertice_dias_uteis': np.int32,
+    'vna_atualizado': np.float64,
+    'ipca_acumulado': np.float64,
+    'evento': np.int32,
+}
+
+
+class CashFlowBook:
+    """
+    Fluxos de caixa de vários títulos em colunas únicas
+
+    Cada campo é um único array com os eventos de todos os títulos em
+    sequência; offsets[i]:offsets[i + 1] delimita os eventos do título i.
+    Vértices ausentes são gravados como -1 e campos do IPCA+ como NaN nos
+    títulos CDI+; o modo de projeção do CDI fica em cdi_projections ('' sem
+    projeção pela curva). Funciona como uma sequência de CashFlow (len, iteração,
+    book[i]), cada um uma visão sem cópia das colunas.
+    """
+
+    __slots__ = ('indexadores', 'has_vertices', 'offsets', 'columns', 'cdi_projections')
+
+    def __init__(self, indexadores, has_vertices, offsets, columns: Dict[str, np.ndarray], cdi_projections=None):
+        self.indexadores = np.asarray(indexadores, dtype='<U4')
+        self.has_vertices = np.asarray(has_vertices, dtype=bool)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.columns = columns
+        if cdi_projections is None:
+            cdi_projections = [''] * len(self.indexadores)
+        self.cdi_projections = np.asarray(cdi_projections, dtype='<U7')
+
+    @classmethod
+    def from_cash_flows(cls, cash_flows: List[CashFlow]) -> 'CashFlowBook':
+        """Concatena os CashFlow de vários títulos"""
+        lengths = [len(cash_flow) for cash_flow in cash_flows]
+        offsets = np.concatenate(([0], np.cumsum(lengths, dtype=np.int64)))
+
+        columns = {}
+        for name, dtype in _EVENT_COLUMNS.items():
+            fill = _NO_VERTEX if name == 'vertice_dias_uteis' else np.nan
+            parts = [np.full(length, fill, dtype=dtype) if getattr(cash_flow, name) is None
+                     else getattr(cash_flow, name)
+                     for cash_flow, length in zip(cash_flows, lengths)]
+            columns[name] = _column(np.concatenate(parts) if parts else [], dtype)
+
+        return cls(
+            [cash_flow.indexador for cash_flow in cash_flows],
+            [cash_flow.vertice_dias_uteis is not None for cash_flow in cash_flows],
+            offsets,
+            columns,
+            [cash_flow.cdi_projection or '' for cash_flow in cash_flows],
+        )
+
+    @classmethod
+    def concatenate(cls, books: List['CashFlowBook']) -> 'CashFlowBook':
+        """Junta vários livros em um só (títulos na ordem dos livros)"""
+        lengths = np.concatenate([np.diff(book.offsets) for book in books])
+        return cls(
+            np.concatenate([book.indexadores for book in books]),
+            np.concatenate([book.has_vertices for book in books]),
+            np.concatenate(([0], np.cumsum(lengths))),
+            {name: _column(np.concatenate([book.columns[name] for book in books]), dtype)
+             for name, dtype in _EVENT_COLUMNS.items()},
+            np.concatenate([book.cdi_projections for book in books]),
+        )
+
+    def take(self, positions) -> 'CashFlowBook':
+        """Livro com os títulos nas posições pedidas (reordena todas as colunas de uma vez)"""
+        positions = np.asarray(positions, dtype=np.int64)
+        starts = self.offsets[positions]
+        lengths = self.offsets[positions + 1] - starts
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        rows = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return CashFlowBook(
+            self.indexadores[positions],
+            self.has_vertices[positions],
+            offsets,
+            {name: _column(column[rows], _EVENT_COLUMNS[name]) for name, column in self.columns.items()},
+            self.cdi_projections[positions],
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def __getitem__(self, position: int) -> CashFlow:
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("Título fora da carteira")
+        rows = slice(self.offsets[position], self.offsets[position + 1])
+        indexador = str(self.indexadores[position])
+        columns = {name: column[rows] for name, column in self.columns.items()}
+        if not self.has_vertices[position]:
+            columns['vertice_dias_uteis'] = None
+        if indexador != 'IPCA':
+            columns['vna_atualizado'] = columns['ipca_acumulado'] = None
+        return CashFlow(indexador, cdi_projection=str(self.cdi_projections[position]) or None, **columns)
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelas colunas (bytes)"""
+        return sum(column.nbytes for column in self.columns.values()) + self.offsets.nbytes
+
+    def __repr__(self) -> str:
+        return f"CashFlowBook(titulos={len(self)}, eventos={self.offsets[-1]})"
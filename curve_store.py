@@ -0,0 +1,283 @@
+"""
+Cache local da ETTJ ANBIMA
+Um arquivo .npz por data de referência - curvas publicadas não mudam
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+from collections import OrderedDict
+import os
+import tempfile
+import threading
+import time
+from pyettj import get_ettj_anbima
+import pandas as pd
+import numpy as np
+
+from business_calendar import get_shared_calendar
+
+# Diretório do cache (pode ser alterado pela variável de ambiente ETTJ_CACHE_DIR)
+CURVE_CACHE_ENV = 'ETTJ_CACHE_DIR'
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'curve_cache')
+
+# Colunas da ETTJ armazenadas (chave no cache -> coluna pyettj)
+ETTJ_COLUMNS = {
+    'pre': 'Prefixados',
+    'ipca': 'IPCA',
+}
+
+
+def parse_ettj_column(ettj: pd.DataFrame, column: str):
+    """
+    Extrai (vértices, taxas) de uma coluna da ETTJ ANBIMA
+
+    Retorna arrays contíguos (int64 dias úteis, float64 taxa % a.a.),
+    ou None se a coluna não existir.
+    """
+    if column not in ettj.columns:
+        return None
+
+    # Remove linhas vazias e converte valores
+    curve = ettj.dropna(subset=['Vertice', column]).copy()
+    curve['Vertice'] = curve['Vertice'].str.replace('.', '').str.strip()
+    curve[column] = curve[column].str.replace(',', '.').str.strip()
+
+    # Remove linhas com valores vazios
+    curve = curve[(curve['Vertice'] != '') & (curve[column] != '')]
+
+    vertices = np.ascontiguousarray(curve['Vertice'].astype(int).values, dtype=np.int64)
+    rates = np.ascontiguousarray(curve[column].astype(float).values, dtype=np.float64)
+    return vertices, rates
+
+
+def _to_float(value) -> float:
+    """Converte número no formato ANBIMA ('1.234,56') ou decimal com ponto"""
+    text = str(value).strip()
+    if ',' in text:
+        text = text.replace('.', '').replace(',', '.')
+    return float(text)
+
+
+def parse_svensson_parameters(parameters: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Converte a tabela de parâmetros Svensson da ANBIMA em {grupo: array[6]}
+
+    Ordem: beta1, beta2, beta3, beta4, lambda1, lambda2 (como publicado).
+    Grupos inválidos são ignorados.
+    """
+    result = {}
+    if parameters is None or parameters.empty:
+        return result
+
+    for group, row in parameters.iterrows():
+        try:
+            values = [_to_float(v) for v in row.values[:6]]
+        except (TypeError, ValueError):
+            continue
+        if len(values) == 6:
+            result[str(group).strip().upper()] = np.array(values, dtype=np.float64)
+    return result
+
+
+class CurveStore:
+    """
+    Armazena a ETTJ ANBIMA em disco, um arquivo .npz por data de referência
+
+    Curvas de datas passadas nunca mudam: uma vez gravadas, novas consultas
+    para a mesma data não acessam a rede. Fins de semana e feriados passados
+    (sem publicação) também são registrados, para que a busca pelo dia útil
+    anterior funcione offline.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or os.environ.get(CURVE_CACHE_ENV) or DEFAULT_CACHE_DIR
+
+    def _path(self, reference_date: datetime) -> str:
+        return os.path.join(self.directory, f"ettj_{reference_date.strftime('%Y%m%d')}.npz")
+
+    def load(self, reference_date: datetime) -> Optional[Dict]:
+        """
+        Lê a ETTJ gravada para a data
+
+        Retorna None se a data não estiver no cache; levanta ValueError se a
+        data estiver registrada como sem publicação ANBIMA.
+        """
+        path = self._path(reference_date)
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path) as data:
+            if 'empty' in data.files:
+                raise ValueError("Sem dados para a data selecionada")
+
+            ettj = {'reference_date': reference_date, 'parameters': {}}
+            for key in ETTJ_COLUMNS:
+                if f'{key}_vertices' in data.files:
+                    ettj[key] = (data[f'{key}_vertices'], data[f'{key}_rates'])
+                else:
+                    ettj[key] = None
+            if 'parameter_groups' in data.files:
+                for group, values in zip(data['parameter_groups'], data['parameter_values']):
+                    ettj['parameters'][str(group)] = values
+        return ettj
+
+    def save(self, reference_date: datetime, ettj: Optional[Dict]):
+        """Grava a ETTJ da data (ettj=None registra a data como sem publicação)"""
+        os.makedirs(self.directory, exist_ok=True)
+
+        arrays = {}
+        if ettj is None:
+            arrays['empty'] = np.array(True)
+        else:
+            for key in ETTJ_COLUMNS:
+                if ettj.get(key) is not None:
+                    arrays[f'{key}_vertices'], arrays[f'{key}_rates'] = ettj[key]
+            if ettj.get('parameters'):
+                arrays['parameter_groups'] = np.array(list(ettj['parameters'].keys()))
+                arrays['parameter_values'] = np.vstack(list(ettj['parameters'].values()))
+
+        # Escrita atômica: grava em arquivo temporário e renomeia
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.npz')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, self._path(reference_date))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def fetch(self, reference_date: datetime) -> Dict:
+        """
+        Retorna a ETTJ da data: do cache local ou, se ausente, da ANBIMA
+
+        Levanta ValueError se a ANBIMA não tiver dados para a data (mesmo
+        comportamento de get_ettj_anbima).
+        """
+        ettj = self.load(reference_date)
+        if ettj is not None:
+            return ettj
+
+        is_past_date = reference_date.date() < datetime.now().date()
+        try:
+            parameters, table, _, _ = get_ettj_anbima(reference_date.strftime('%d/%m/%Y'))
+        except ValueError:
+            # Fim de semana/feriado passado nunca terá publicação: registra no cache
+            if is_past_date and not get_shared_calendar().is_business_day(reference_date):
+                self._save_quietly(reference_date, None)
+            raise
+
+        ettj = {'reference_date': reference_date,
+                'parameters': parse_svensson_parameters(parameters)}
+        for key, column in ETTJ_COLUMNS.items():
+            ettj[key] = parse_ettj_column(table, column)
+
+        # A curva do dia corrente ainda pode ser republicada; só grava datas passadas
+        if is_past_date:
+            self._save_quietly(reference_date, ettj)
+        return ettj
+
+    def _save_quietly(self, reference_date: datetime, ettj: Optional[Dict]):
+        try:
+            self.save(reference_date, ettj)
+        except OSError as e:
+            print(f"[AVISO] Nao foi possivel gravar cache da ETTJ: {str(e)}")
+
+
+class _PendingFetch:
+    """Busca em andamento: as demais threads aguardam o mesmo resultado"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class CurveCache:
+    """
+    Cache LRU em memória das curvas já processadas, compartilhado pelo processo
+
+    Evita reprocessar a ETTJ a cada requisição do Flask. Requisições
+    simultâneas para a mesma data aguardam uma única busca (single-flight)
+    em vez de disparar várias consultas à ANBIMA.
+
+    Como no CurveStore, só datas passadas ficam em memória indefinidamente:
+    a curva do dia corrente (que a ANBIMA pode republicar) expira após
+    today_ttl segundos.
+
+    max_size: número máximo de datas mantidas em memória
+    today_ttl: validade (segundos) da curva do dia corrente
+    """
+
+    def __init__(self, store: CurveStore = None, max_size: int = 32, today_ttl: float = 300.0):
+        self.store = store or CurveStore()
+        self.max_size = max_size
+        self.today_ttl = today_ttl
+        self._entries = OrderedDict()
+        # Validade (time.monotonic) das entradas do dia corrente
+        self._expires = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, reference_date: datetime) -> Dict:
+        """Retorna a ETTJ da data (memória -> disco -> ANBIMA)"""
+        key = reference_date.date()
+
+        with self._lock:
+            if key in self._expires and time.monotonic() >= self._expires[key]:
+                del self._entries[key]
+                del self._expires[key]
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            pending = self._pending.get(key)
+            is_leader = pending is None
+            if is_leader:
+                pending = _PendingFetch()
+                self._pending[key] = pending
+
+        if not is_leader:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+
+        try:
+            ettj = self.store.fetch(reference_date)
+            # Arrays compartilhados entre requisições: somente leitura
+            for column_key in ETTJ_COLUMNS:
+                if ettj.get(column_key) is not None:
+                    for array in ettj[column_key]:
+                        array.flags.writeable = False
+            pending.result = ettj
+
+            with self._lock:
+                self._entries[key] = ettj
+                if key >= datetime.now().date():
+                    self._expires[key] = time.monotonic() + self.today_ttl
+                else:
+                    self._expires.pop(key, None)
+                while len(self._entries) > self.max_size:
+                    oldest, _ = self._entries.popitem(last=False)
+                    self._expires.pop(oldest, None)
+            return ettj
+
+        except Exception as e:
+            pending.error = e
+            raise
+
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.done.set()
+
+    def clear(self):
+        """Esvazia o cache em memória (o cache em disco é mantido)"""
+        with self._lock:
+            self._entries.clear()
+            self._expires.clear()
+
+
+# Caches padrão do processo (disco e memória)
+default_curve_store = CurveStore()
+default_curve_cache = CurveCache(default_curve_store)
@@ -0,0 +1,264 @@
+"""
+Curvas de juros para precificação (PRE, NTN-B)
+Arrays contíguos float64 e avaliação vetorizada - Base 252 dias úteis
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _grid_positions(du, size: int):
+    """Prazos como índices de uma grade diária de tamanho size (None se algum não for inteiro dentro dela)"""
+    du = np.asarray(du)
+    if du.dtype.kind not in 'iu':
+        return None
+    if du.size and (du.min() < 0 or du.max() >= size):
+        return None
+    return du
+
+
+def annual_to_monthly_rate(annual_rate):
+    """Converte taxa anual em mensal (% a.m.): (1 + taxa_anual)^(1/12) - 1"""
+    return ((1 + annual_rate / 100) ** (1 / 12) - 1) * 100
+
+
+class Curve:
+    """
+    Curva de juros por vértices (dias úteis) com interpolação linear
+
+    vertices: dias úteis dos vértices (ordem crescente)
+    rates: taxas anuais em percentual (ex: 10.65 para 10,65% a.a.)
+
+    Todos os métodos aceitam escalares ou arrays de dias úteis; prazos fora
+    da curva usam a taxa do primeiro/último vértice (extrapolação flat).
+
+    Na primeira consulta a curva pré-computa uma grade diária (du = 0 até o
+    último vértice) com taxa spot, fator de desconto e fator a termo de um dia.
+    Prazos inteiros dentro da grade são então resolvidos por indexação direta.
+
+    dense_grid: grade (spot, desconto, termo_1d) já calculada, ex: anexada de
+                memória compartilhada (opcional)
+    """
+
+    def __init__(self, vertices, rates, dense_grid=None):
+        self.vertices = np.ascontiguousarray(vertices, dtype=np.float64)
+        self.rates = np.ascontiguousarray(rates, dtype=np.float64)
+        # Grade diária (construída sob demanda, ver dense_grid)
+        self._dense = None if dense_grid is None else tuple(dense_grid)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, rate_column: str) -> 'Curve':
+        """Cria a curva a partir do DataFrame de vértices (coluna 'dias_uteis')"""
+        return cls(frame['dias_uteis'].values, frame[rate_column].values)
+
+    def __len__(self) -> int:
+        return len(self.vertices)
+
+    def _rate(self, du):
+        """Taxa do modelo da curva (interpolação linear entre vértices)"""
+        return np.interp(du, self.vertices, self.rates)
+
+    @property
+    def dense_grid(self):
+        """
+        Grade diária pré-computada: tupla (spot, desconto, termo_1d) indexada por du
+
+        spot[du]: taxa % a.a.; desconto[du]: (1 + spot)^(-du/252);
+        termo_1d[du]: fator a termo de du - 1 para du (desconto[du-1] / desconto[du]).
+        """
+        if self._dense is None:
+            last = int(np.ceil(self.vertices[-1])) if len(self.vertices) else 0
+            du = np.arange(last + 1, dtype=np.float64)
+            spot = np.ascontiguousarray(self._rate(du), dtype=np.float64)
+            discount = (1 + spot / 100) ** (-du / 252)
+            forward = np.ones_like(discount)
+            forward[1:] = discount[:-1] / discount[1:]
+            for array in (spot, discount, forward):
+                array.flags.writeable = False
+            self._dense = (spot, discount, forward)
+        return self._dense
+
+    def _grid_index(self, du):
+        """Índices na grade diária, ou None se algum prazo não for inteiro dentro dela"""
+        return _grid_positions(du, len(self.dense_grid[0]))
+
+    def rate_at(self, du):
+        """Taxa anual (% a.a.) interpolada para o(s) prazo(s) em dias úteis"""
+        index = self._grid_index(du)
+        if index is not None:
+            return self.dense_grid[0][index]
+        return self._rate(du)
+
+    def discount_factor(self, du):
+        """Fator de desconto (1 + taxa)^(-du/252)"""
+        index = self._grid_index(du)
+        if index is not None:
+            return self.dense_grid[1][index]
+        du = np.asarray(du, dtype=np.float64)
+        return (1 + self._rate(du) / 100) ** (-du / 252)
+
+    def growth_factor(self, du_start, du_end):
+        """Fator de capitalização a termo entre dois prazos: DF(du_start) / DF(du_end)"""
+        return self.discount_factor(du_start) / self.discount_factor(du_end)
+
+    def forward_rate(self, du_start, du_end):
+        """
+        Taxa a termo anual (% a.a.) entre dois prazos em dias úteis
+
+        (DF(du_start) / DF(du_end))^(252 / (du_end - du_start)) - 1
+        Para du_end == du_start retorna a taxa spot do prazo.
+        """
+        du_start = np.asarray(du_start)
+        du_end = np.asarray(du_end)
+        growth = self.growth_factor(du_start, du_end)
+        period = du_end.astype(np.float64) - du_start
+        with np.errstate(divide='ignore', invalid='ignore'):
+            forward = (growth ** (252 / period) - 1) * 100
+        return np.where(period > 0, forward, self.rate_at(du_end))
+
+    def bumped_rates(self, du, bump: float = 0.01):
+        """
+        Taxas (% a.a.) da curva e de todas as versões com choque, empilhadas
+
+        bump: choque em pontos percentuais (0.01 = 1 bp)
+
+        Retorna array shape (2 + V,) + du.shape (V = número de vértices):
+        linha 0 = curva base; linha 1 = choque paralelo; linha 2 + j = choque
+        só no vértice j, interpolado linearmente até zero nos vértices vizinhos
+        (key rate). As versões com choque são a matriz (vértice × choque) de
+        choques aplicada de uma vez aos pesos de interpolação de cada prazo.
+        """
+        if not len(self.vertices):
+            raise ValueError("Curva sem vértices para aplicar choques")
+        base = np.asarray(self.rate_at(du), dtype=np.float64)
+        shocks = np.vstack((np.ones(len(self.vertices)), np.eye(len(self.vertices)))) * bump
+        shifted = base[..., None] + vertex_weights(self.vertices, du) @ shocks.T
+        return np.concatenate((base[None], np.moveaxis(shifted, -1, 0)))
+
+    def nearest_vertex(self, du):
+        """Vértice (dias úteis) mais próximo do(s) prazo(s); empates ficam com o menor"""
+        du = np.asarray(du, dtype=np.float64)
+        if len(self.vertices) == 1:
+            return np.full(du.shape, self.vertices[0]).astype(np.int64)
+        idx = np.clip(np.searchsorted(self.vertices, du), 1, len(self.vertices) - 1)
+        left = self.vertices[idx - 1]
+        right = self.vertices[idx]
+        return np.where(du - left <= right - du, left, right).astype(np.int64)
+
+
+def vertex_weights(vertices: np.ndarray, du) -> np.ndarray:
+    """
+    Pesos da interpolação linear de cada prazo nos vértices, shape du.shape + (V,)
+
+    taxa(du) = pesos(du) @ taxas_dos_vértices, com extrapolação flat fora da curva
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    du = np.asarray(du, dtype=np.float64)
+    weights = np.zeros(du.shape + (len(vertices),))
+    if len(vertices) == 1:
+        weights[...] = 1.0
+        return weights
+
+    right = np.clip(np.searchsorted(vertices, du, side='right'), 1, len(vertices) - 1)
+    left = right - 1
+    frac = np.clip((du - vertices[left]) / (vertices[right] - vertices[left]), 0.0, 1.0)
+    np.put_along_axis(weights, left[..., None], (1 - frac)[..., None], axis=-1)
+    np.put_along_axis(weights, right[..., None], frac[..., None], axis=-1)
+    return weights
+
+
+def _svensson_loadings(lam: float, t: np.ndarray):
+    """Cargas (1 - e^(-λt)) / (λt) e (1 - e^(-λt)) / (λt) - e^(-λt), com limite em λt = 0"""
+    x = lam * t
+    decay = np.exp(-x)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(x == 0, 1.0, (1 - decay) / x)
+    return slope, slope - decay
+
+
+class SvenssonCurve(Curve):
+    """
+    Curva paramétrica Nelson-Siegel-Svensson com os parâmetros publicados pela ANBIMA
+
+    parameters: [beta1, beta2, beta3, beta4, lambda1, lambda2] (taxas em decimal)
+    vertices, rates: vértices publicados na ETTJ (opcionais, usados só como referência
+                     e para o tamanho da grade diária; fora dela vale a fórmula)
+
+    r(t) = β1 + β2·(1 - e^(-λ1·t))/(λ1·t) + β3·[(1 - e^(-λ1·t))/(λ1·t) - e^(-λ1·t)]
+              + β4·[(1 - e^(-λ2·t))/(λ2·t) - e^(-λ2·t)],   t = du / 252
+    """
+
+    def __init__(self, parameters, vertices=(), rates=(), dense_grid=None):
+        super().__init__(vertices, rates, dense_grid)
+        self.parameters = np.ascontiguousarray(parameters, dtype=np.float64)
+        if self.parameters.shape != (6,):
+            raise ValueError("Parâmetros Svensson devem ser [beta1, beta2, beta3, beta4, lambda1, lambda2]")
+
+    def _rate(self, du):
+        """Taxa anual (% a.a.) da curva Svensson para o(s) prazo(s) em dias úteis"""
+        beta1, beta2, beta3, beta4, lambda1, lambda2 = self.parameters
+        t = np.asarray(du, dtype=np.float64) / 252
+
+        slope1, curvature1 = _svensson_loadings(lambda1, t)
+        _, curvature2 = _svensson_loadings(lambda2, t)
+        rate = (beta1 + beta2 * slope1 + beta3 * curvature1 + beta4 * curvature2) * 100
+
+        return float(rate) if rate.ndim == 0 else rate
+
+
+def implied_inflation_rate(pre_curve: Curve, real_curve: Curve, du):
+    """
+    IPCA implícito anual (% a.a.) entre uma curva PRE e uma curva real
+
+    IPCA = (1 + Taxa_PRE) / (1 + Taxa_Real) - 1
+    """
+    taxa_pre = pre_curve.rate_at(du)
+    taxa_real = real_curve.rate_at(du)
+    return ((1 + taxa_pre / 100) / (1 + taxa_real / 100) - 1) * 100
+
+
+class ImpliedInflationCurve:
+    """
+    Curva de IPCA implícito derivada de um par de curvas PRE e NTN-B
+
+    Construída uma vez por par de curvas: guarda, para cada du de 0 até o
+    maior vértice, o IPCA implícito anual e mensal. Consultas com prazos
+    inteiros (escalares ou arrays) são indexação direta; os demais prazos
+    são calculados a partir das duas curvas.
+
+    grids: tupla (anual, mensal) já calculada, ex: anexada de memória
+           compartilhada (opcional)
+    """
+
+    def __init__(self, pre_curve: Curve, real_curve: Curve, grids=None):
+        self.pre_curve = pre_curve
+        self.real_curve = real_curve
+
+        if grids is not None:
+            self.annual_rates, self.monthly_rates = grids
+            return
+
+        last = max(len(pre_curve.dense_grid[0]), len(real_curve.dense_grid[0])) - 1
+        du = np.arange(last + 1, dtype=np.int64)
+        self.annual_rates = np.ascontiguousarray(implied_inflation_rate(pre_curve, real_curve, du))
+        self.monthly_rates = annual_to_monthly_rate(self.annual_rates)
+        self.annual_rates.flags.writeable = False
+        self.monthly_rates.flags.writeable = False
+
+    def annual_rate_at(self, du):
+        """IPCA implícito anual (% a.a.) para o(s) prazo(s) em dias úteis"""
+        index = _grid_positions(du, len(self.annual_rates))
+        if index is not None:
+            return self.annual_rates[index]
+        return implied_inflation_rate(self.pre_curve, self.real_curve, du)
+
+    def monthly_rate_at(self, du):
+        """IPCA implícito mensal (% a.m.) para o(s) prazo(s) em dias úteis"""
+        index = _grid_positions(du, len(self.monthly_rates))
+        if index is not None:
+            return self.monthly_rates[index]
+        return annual_to_monthly_rate(implied_inflation_rate(self.pre_curve, self.real_curve, du))
+
+    def monthly_factor_at(self, du):
+        """Fator mensal de IPCA implícito (1 + IPCA_mensal)"""
+        return 1 + self.monthly_rate_at(du) / 100
@@ -6,21 +6,32 @@ Versão Interativa
 
 from datetime import datetime, timedelta
 from typing import List, Dict, Tuple
-import calendar
-import holidays
-from pyettj import get_ettj_anbima
 import pandas as pd
 import numpy as np
 import json
 
+from business_calendar import get_shared_calendar
+from cash_flow import CashFlow, as_cash_flow
+from payment_schedule import PaymentSchedule, default_schedule_cache, schedule_key
+from curve_store import default_curve_cache
+from curves import Curve, ImpliedInflationCurve, SvenssonCurve, annual_to_monthly_rate
+from ipca_index import IPCAIndex, normalize_month_key
+from metrics import cash_flow_metrics, solve_irr
+
 class DebentureCalculator:
     """
     Calculadora de fluxo de debêntures seguindo padrões B3/ANBIMA
     """
     
     def __init__(self):
+        # Calendário de dias úteis compartilhado pelo processo (construído uma única vez)
+        self.calendar = get_shared_calendar()
         # Feriados nacionais do Brasil (ANBIMA)
-        self.br_holidays = holidays.Brazil(years=range(2020, 2050))
+        self.br_holidays = self.calendar.holidays
+        # Parâmetros Svensson publicados pela ANBIMA ({grupo: [b1, b2, b3, b4, l1, l2]})
+        self.svensson_parameters = {}
+        # Interpolação das curvas: 'linear' (entre vértices) ou 'svensson' (paramétrica ANBIMA)
+        self.curve_interpolation = 'linear'
         # Curva DI futura (será carregada quando necessário)
         self.di_curve = None
         # Curva IPCA/IMA-B (juros reais)
@@ -30,76 +41,145 @@ class DebentureCalculator:
         # Índices NI customizados (chave YYYY-MM -> índice)
         self.ipca_custom_indices = {}
         
+    @property
+    def di_curve(self) -> pd.DataFrame:
+        """Curva PRE (DataFrame dias_uteis/taxa)"""
+        return self._di_curve
+
+    @di_curve.setter
+    def di_curve(self, curve: pd.DataFrame):
+        self._di_curve = curve
+        # Versão em arrays contíguos usada nos cálculos
+        self.pre_curve = self._build_curve(curve, 'taxa', 'PREFIXADOS')
+        self._implied_inflation_curve = None
+
+    @property
+    def ipca_curve(self) -> pd.DataFrame:
+        """Curva NTN-B de juros reais (DataFrame dias_uteis/taxa_real)"""
+        return self._ipca_curve
+
+    @ipca_curve.setter
+    def ipca_curve(self, curve: pd.DataFrame):
+        self._ipca_curve = curve
+        self.real_curve = self._build_curve(curve, 'taxa_real', 'IPCA')
+        self._implied_inflation_curve = None
+
+    @property
+    def implied_inflation_curve(self) -> ImpliedInflationCurve:
+        """Curva de IPCA implícito (construída uma vez por par de curvas PRE/NTN-B)"""
+        if self._implied_inflation_curve is None and self.pre_curve is not None and self.real_curve is not None:
+            self._implied_inflation_curve = ImpliedInflationCurve(self.pre_curve, self.real_curve)
+        return self._implied_inflation_curve
+
+    def _build_curve(self, frame: pd.DataFrame, rate_column: str, group: str) -> Curve:
+        """Monta a curva de cálculo conforme o modo de interpolação"""
+        if frame is None:
+            return None
+        if self.curve_interpolation == 'svensson' and group in self.svensson_parameters:
+            return SvenssonCurve(self.svensson_parameters[group],
+                                 frame['dias_uteis'].values, frame[rate_column].values)
+        return Curve.from_frame(frame, rate_column)
+
+    def set_curve_interpolation(self, mode: str):
+        """
+        Define a interpolação das curvas carregadas
+
+        mode: 'linear' (interpolação linear entre os vértices da ETTJ) ou
+              'svensson' (curva paramétrica com os parâmetros publicados pela ANBIMA;
+              se os parâmetros não estiverem disponíveis, mantém a interpolação linear)
+        """
+        if mode not in ('linear', 'svensson'):
+            raise ValueError(f"Interpolação inválida: {mode}. Use 'linear' ou 'svensson'.")
+        self.curve_interpolation = mode
+        # Reconstrói as curvas de cálculo no novo modo
+        self.di_curve = self.di_curve
+        self.ipca_curve = self.ipca_curve
+
     def is_business_day(self, date: datetime) -> bool:
         """Verifica se é dia útil (exclui sábados, domingos e feriados nacionais)"""
-        return date.weekday() < 5 and date not in self.br_holidays
+        return self.calendar.is_business_day(date)
     
     def next_business_day(self, date: datetime) -> datetime:
         """Retorna o próximo dia útil"""
-        next_day = date
-        while not self.is_business_day(next_day):
-            next_day += timedelta(days=1)
-        return next_day
+        return self.calendar.next_business_day(date)
     
     def count_business_days(self, start_date: datetime, end_date: datetime) -> int:
         """Conta dias úteis entre duas datas (exclusive end_date)"""
-        count = 0
-        current = start_date
-        while current < end_date:
-            if self.is_business_day(current):
-                count += 1
-            current += timedelta(days=1)
-        return count
+        return self.calendar.count_business_days(start_date, end_date)
+
+    def count_business_days_batch(self, starts, ends) -> np.ndarray:
+        """Conta dias úteis para arrays de pares de datas (datetime64), exclusive ends"""
+        return self.calendar.count_business_days_batch(starts, ends)
+
+    def roll_forward_batch(self, dates) -> np.ndarray:
+        """Retorna o próximo dia útil para um array de datas (datetime64)"""
+        return self.calendar.roll_forward_batch(dates)
     
     def count_calendar_days(self, start_date: datetime, end_date: datetime) -> int:
         """Conta dias corridos entre duas datas (exclusive end_date)"""
         return (end_date - start_date).days
 
-    def load_di_curve(self, reference_date: datetime = None):
+    def _fetch_ettj(self, reference_date: datetime = None, required=('pre',)) -> Tuple[Dict, str]:
         """
-        Carrega a curva de juros prefixada (PRE) da ANBIMA como proxy para DI
+        Busca a ETTJ ANBIMA (PRE, NTN-B e parâmetros Svensson) em um único download
 
-        reference_date: Data de referência para a curva (default: dia útil anterior)
+        Se não houver publicação na data (ou faltar alguma das curvas required:
+        'pre' e/ou 'ipca'), tenta os dias anteriores.
+        Retorna tupla (ettj, data_formatada).
         """
-        try:
-            if reference_date is None:
-                reference_date = datetime.now()
+        if reference_date is None:
+            reference_date = datetime.now()
+        if isinstance(required, str):
+            required = (required,)
 
-            # Tenta carregar dados da ANBIMA
-            # ANBIMA atualiza dados com 1 dia de atraso
-            date_to_try = reference_date
-            max_attempts = 5
+        # Tenta carregar dados da ANBIMA
+        # ANBIMA atualiza dados com 1 dia de atraso
+        date_to_try = reference_date
+        max_attempts = 5
 
-            for attempt in range(max_attempts):
-                try:
-                    date_str = date_to_try.strftime('%d/%m/%Y')
-                    _, ettj, _, _ = get_ettj_anbima(date_str)
+        for attempt in range(max_attempts):
+            try:
+                # Cache em memória/disco primeiro; só acessa a ANBIMA se a data não estiver gravada
+                ettj = default_curve_cache.fetch(date_to_try)
+                for curve in required:
+                    if ettj[curve] is None:
+                        raise ValueError(f"Curva {curve.upper()} não encontrada na ETTJ ANBIMA")
+                return ettj, date_to_try.strftime('%d/%m/%Y')
 
-                    # Remove linhas vazias e converte valores
-                    ettj = ettj.dropna(subset=['Vertice', 'Prefixados'])
-                    ettj['Vertice'] = ettj['Vertice'].str.replace('.', '').str.strip()
-                    ettj['Prefixados'] = ettj['Prefixados'].str.replace(',', '.').str.strip()
+            except ValueError:
+                # Tenta dia anterior
+                date_to_try = date_to_try - timedelta(days=1)
+                if attempt < max_attempts - 1:
+                    continue
+                else:
+                    raise
 
-                    # Remove linhas com valores vazios
-                    ettj = ettj[(ettj['Vertice'] != '') & (ettj['Prefixados'] != '')]
+    def _set_di_curve(self, ettj: Dict, date_str: str):
+        vertices, taxas = ettj['pre']
+        self.svensson_parameters = ettj['parameters']
+        self.di_curve = pd.DataFrame({'dias_uteis': vertices, 'taxa': taxas})
 
-                    ettj['Vertice'] = ettj['Vertice'].astype(int)
-                    ettj['Prefixados'] = ettj['Prefixados'].astype(float)
+        print(f"[OK] Curva PRE/DI ANBIMA carregada para {date_str}")
+        print(f"     Vertices disponiveis: {len(self.di_curve)} pontos")
 
-                    self.di_curve = ettj[['Vertice', 'Prefixados']].copy()
-                    self.di_curve.columns = ['dias_uteis', 'taxa']
+    def _set_ipca_curve(self, ettj: Dict, date_str: str):
+        vertices, taxas = ettj['ipca']
+        self.svensson_parameters = ettj['parameters']
+        self.ipca_curve = pd.DataFrame({'dias_uteis': vertices, 'taxa_real': taxas})
 
-                    print(f"[OK] Curva PRE/DI ANBIMA carregada para {date_str}")
-                    print(f"     Vertices disponiveis: {len(self.di_curve)} pontos")
-                    return True
+        print(f"[OK] Curva NTN-B (taxas reais) ANBIMA carregada para {date_str}")
+        print(f"     Vertices disponiveis: {len(self.ipca_curve)} pontos")
 
-                except ValueError:
-                    # Tenta dia anterior
-                    date_to_try = date_to_try - timedelta(days=1)
-                    if attempt < max_attempts - 1:
-                        continue
-                    else:
-                        raise
+    def load_di_curve(self, reference_date: datetime = None):
+        """
+        Carrega a curva de juros prefixada (PRE) da ANBIMA como proxy para DI
+
+        reference_date: Data de referência para a curva (default: dia útil anterior)
+        """
+        try:
+            ettj, date_str = self._fetch_ettj(reference_date)
+            self._set_di_curve(ettj, date_str)
+            return True
 
         except Exception as e:
             print(f"[AVISO] Erro ao carregar curva ANBIMA: {str(e)}")
@@ -116,48 +196,10 @@ class DebentureCalculator:
         reference_date: Data de referência para a curva (default: dia útil anterior)
         """
         try:
-            if reference_date is None:
-                reference_date = datetime.now()
-
-            # Tenta carregar dados da ANBIMA
-            # ANBIMA atualiza dados com 1 dia de atraso
-            date_to_try = reference_date
-            max_attempts = 5
-
-            for attempt in range(max_attempts):
-                try:
-                    date_str = date_to_try.strftime('%d/%m/%Y')
-                    _, ettj, _, _ = get_ettj_anbima(date_str)
-
-                    # Verifica se coluna IPCA existe
-                    if 'IPCA' not in ettj.columns:
-                        raise ValueError("Coluna IPCA não encontrada na curva ANBIMA")
-
-                    # Remove linhas vazias e converte valores
-                    ettj = ettj.dropna(subset=['Vertice', 'IPCA'])
-                    ettj['Vertice'] = ettj['Vertice'].str.replace('.', '').str.strip()
-                    ettj['IPCA'] = ettj['IPCA'].str.replace(',', '.').str.strip()
-
-                    # Remove linhas com valores vazios
-                    ettj = ettj[(ettj['Vertice'] != '') & (ettj['IPCA'] != '')]
-
-                    ettj['Vertice'] = ettj['Vertice'].astype(int)
-                    ettj['IPCA'] = ettj['IPCA'].astype(float)
-
-                    self.ipca_curve = ettj[['Vertice', 'IPCA']].copy()
-                    self.ipca_curve.columns = ['dias_uteis', 'taxa_real']
-
-                    print(f"[OK] Curva NTN-B (taxas reais) ANBIMA carregada para {date_str}")
-                    print(f"     Vertices disponiveis: {len(self.ipca_curve)} pontos")
-                    return True
-
-                except ValueError:
-                    # Tenta dia anterior
-                    date_to_try = date_to_try - timedelta(days=1)
-                    if attempt < max_attempts - 1:
-                        continue
-                    else:
-                        raise
+            # Exige a coluna IPCA (taxas reais) na ETTJ
+            ettj, date_str = self._fetch_ettj(reference_date, required='ipca')
+            self._set_ipca_curve(ettj, date_str)
+            return True
 
         except Exception as e:
             print(f"[AVISO] Erro ao carregar curva IPCA ANBIMA: {str(e)}")
@@ -165,6 +207,27 @@ class DebentureCalculator:
             self.ipca_curve = None
             return False
 
+    def load_curves(self, reference_date: datetime = None) -> Tuple[bool, bool]:
+        """
+        Carrega as curvas PRE e NTN-B (e os parâmetros Svensson) de um único download da ETTJ
+
+        Equivale a load_di_curve + load_ipca_curve, mas volta aos dias
+        anteriores até uma data com as duas curvas, com uma só busca por data.
+        Se nenhuma data tiver as duas, cada curva é carregada por conta
+        própria (load_di_curve / load_ipca_curve).
+
+        Retorna tupla (curva_pre_carregada, curva_ntnb_carregada).
+        """
+        try:
+            ettj, date_str = self._fetch_ettj(reference_date, required=('pre', 'ipca'))
+        except Exception as e:
+            print(f"[AVISO] ETTJ com curvas PRE e NTN-B nao encontrada: {str(e)}")
+            return self.load_di_curve(reference_date), self.load_ipca_curve(reference_date)
+
+        self._set_di_curve(ettj, date_str)
+        self._set_ipca_curve(ettj, date_str)
+        return True, True
+
     def get_cdi_rate_from_curve(self, payment_date: datetime, emission_date: datetime) -> Tuple[float, int]:
         """
         Obtém taxa da curva PRE para uma data específica usando interpolação linear
@@ -180,20 +243,8 @@ class DebentureCalculator:
             # Calcula dias úteis até o pagamento
             business_days = self.count_business_days(emission_date, payment_date)
 
-            # Interpola taxa usando os vértices da curva
-            vertices = self.di_curve['dias_uteis'].values
-            taxas = self.di_curve['taxa'].values
-
-            # Interpolação linear
-            if business_days <= vertices[0]:
-                # Se prazo menor que primeiro vértice, usa a taxa do primeiro vértice
-                rate = taxas[0]
-            elif business_days >= vertices[-1]:
-                # Se prazo maior que último vértice, usa a taxa do último vértice
-                rate = taxas[-1]
-            else:
-                # Interpolação linear entre vértices
-                rate = np.interp(business_days, vertices, taxas)
+            # Interpolação linear (prazos fora da curva usam o primeiro/último vértice)
+            rate = self.pre_curve.rate_at(business_days)
 
             return float(rate), int(business_days)
 
@@ -218,20 +269,8 @@ class DebentureCalculator:
             # Calcula dias úteis até o pagamento
             business_days = self.count_business_days(emission_date, payment_date)
 
-            # Interpola taxa usando os vértices da curva
-            vertices = self.ipca_curve['dias_uteis'].values
-            taxas = self.ipca_curve['taxa_real'].values
-
-            # Interpolação linear
-            if business_days <= vertices[0]:
-                # Se prazo menor que primeiro vértice, usa a taxa do primeiro vértice
-                rate = taxas[0]
-            elif business_days >= vertices[-1]:
-                # Se prazo maior que último vértice, usa a taxa do último vértice
-                rate = taxas[-1]
-            else:
-                # Interpolação linear entre vértices
-                rate = np.interp(business_days, vertices, taxas)
+            # Interpolação linear (prazos fora da curva usam o primeiro/último vértice)
+            rate = self.real_curve.rate_at(business_days)
 
             return float(rate), int(business_days)
 
@@ -254,31 +293,12 @@ class DebentureCalculator:
             # Calcula dias úteis até pagamento
             business_days = self.count_business_days(emission_date, payment_date)
 
-            # Interpola taxa PRE
-            taxa_pre = np.interp(
-                business_days,
-                self.di_curve['dias_uteis'].values,
-                self.di_curve['taxa'].values
-            )
-
-            # Interpola taxa real NTN-B
-            taxa_real = np.interp(
-                business_days,
-                self.ipca_curve['dias_uteis'].values,
-                self.ipca_curve['taxa_real'].values
-            )
-
-            # Calcula IPCA implícito anual
-            # (1 + Taxa_PRE) = (1 + Taxa_Real) × (1 + IPCA)
-            # IPCA = (1 + Taxa_PRE) / (1 + Taxa_Real) - 1
-            ipca_implicit_annual = ((1 + taxa_pre/100) / (1 + taxa_real/100) - 1) * 100
-
-            # Converte para mensal: (1 + ipca_anual)^(1/12) - 1
-            ipca_implicit_monthly = ((1 + ipca_implicit_annual/100) ** (1/12) - 1) * 100
+            # IPCA implícito mensal da curva pré-computada
+            # (1 + Taxa_PRE) = (1 + Taxa_Real) × (1 + IPCA), convertido para mensal
+            ipca_implicit_monthly = self.implied_inflation_curve.monthly_rate_at(business_days)
 
             # Encontra vértice mais próximo
-            idx = (np.abs(self.di_curve['dias_uteis'].values - business_days)).argmin()
-            vertice_dias_uteis = int(self.di_curve['dias_uteis'].values[idx])
+            vertice_dias_uteis = int(self.pre_curve.nearest_vertex(business_days))
 
             return ipca_implicit_monthly, vertice_dias_uteis
 
@@ -319,39 +339,31 @@ class DebentureCalculator:
             return False
 
     def _normalize_month_key_str(self, key: str) -> str:
-        key = key.strip().replace('/', '-').replace(' ', '')
-        if len(key) == 6 and key.isdigit():
-            return f"{key[:4]}-{key[4:]}"
-        if len(key) == 7 and key[4] == '-':
-            return f"{key[:4]}-{key[5:].zfill(2)}"
-        parts = key.split('-')
-        if len(parts) == 2 and len(parts[0]) == 4 and parts[1].isdigit():
-            return f"{parts[0]}-{parts[1].zfill(2)}"
-        return key
+        return normalize_month_key(key)
 
     def _month_key(self, date: datetime) -> str:
         return f"{date.year:04d}-{date.month:02d}"
 
-    def _get_ipca_monthly_factor(self, prev_date: datetime, next_date: datetime, fallback_rate: float = None) -> Tuple[float, float]:
-        monthly_factor = None
-        monthly_pct = None
-
-        if getattr(self, 'ipca_custom_indices', None):
-            prev_key = self._month_key(prev_date)
-            next_key = self._month_key(next_date)
-            prev_index = self.ipca_custom_indices.get(prev_key)
-            next_index = self.ipca_custom_indices.get(next_key)
-
-            if prev_index and next_index and prev_index > 0:
-                monthly_factor = next_index / prev_index
-                monthly_pct = (monthly_factor - 1) * 100
-
-        if monthly_factor is None:
-            rate = fallback_rate if fallback_rate is not None else 0.0
-            monthly_factor = 1 + rate / 100
-            monthly_pct = rate
+    @property
+    def ipca_custom_indices(self) -> Dict[str, float]:
+        """Índices NI customizados (chave YYYY-MM -> índice)"""
+        return self._ipca_custom_indices
+
+    @ipca_custom_indices.setter
+    def ipca_custom_indices(self, indices):
+        # Índice NI acumulado por mês, montado uma vez por conjunto de índices
+        # (um IPCAIndex pronto, p.ex. do IPCAIndexStore, é usado diretamente)
+        if isinstance(indices, IPCAIndex):
+            self.ipca_index = indices
+            self._ipca_custom_indices = indices.indices
+        else:
+            self.ipca_index = IPCAIndex(indices)
+            self._ipca_custom_indices = indices
 
-        return monthly_factor, monthly_pct
+    def _default_ipca_monthly_rate(self) -> float:
+        if self.ipca_projections:
+            return self.ipca_projections['monthly_rate']
+        return 0.3675  # Default: ~4.5% a.a.
 
     def calculate_vna(self, base_vna: float, base_date: datetime, current_date: datetime,
                      anniversary_day: int = 15, ipca_monthly_rate: float = None) -> Tuple[float, float]:
@@ -362,70 +374,68 @@ class DebentureCalculator:
         base_date: data base a partir da qual o IPCA deve ser acumulado
         current_date: data alvo para o novo cálculo
 
+        O fator é a razão entre os níveis do índice NI nas duas datas
+        (IPCAIndex), com pró-rata de dias úteis entre aniversários.
+
         Retorna tupla (VNA_atualizado, IPCA_acumulado_percentual_no_período)
         """
         try:
             if ipca_monthly_rate is None:
-                if self.ipca_projections:
-                    ipca_monthly_rate = self.ipca_projections['monthly_rate']
-                else:
-                    ipca_monthly_rate = 0.3675  # Default: ~4.5% a.a.
+                ipca_monthly_rate = self._default_ipca_monthly_rate()
 
             if current_date <= base_date:
                 return base_vna, 0.0
 
-            vna = base_vna
-            ipca_accumulated = 0.0
-
-            def _clamp_anniversary(year: int, month: int) -> datetime:
-                last_day = calendar.monthrange(year, month)[1]
-                day = min(anniversary_day, last_day)
-                return datetime(year, month, day)
-
-            def _next_anniversary(date: datetime) -> datetime:
-                if date.day < anniversary_day:
-                    return _clamp_anniversary(date.year, date.month)
-                month = date.month + 1
-                year = date.year + (month - 1) // 12
-                month = ((month - 1) % 12) + 1
-                return _clamp_anniversary(year, month)
-
-            last_anniversary = base_date
-            next_anniversary = _next_anniversary(last_anniversary)
-
-            while next_anniversary <= current_date:
-                monthly_factor, monthly_pct = self._get_ipca_monthly_factor(last_anniversary, next_anniversary, ipca_monthly_rate)
-                vna *= monthly_factor
-                ipca_accumulated += monthly_pct
-                last_anniversary = next_anniversary
-                next_anniversary = _next_anniversary(last_anniversary)
-
-            if current_date > last_anniversary:
-                dp = self.count_business_days(last_anniversary, current_date)
-                dt = self.count_business_days(last_anniversary, next_anniversary)
-                if dt > 0 and dp > 0:
-                    monthly_factor, monthly_pct = self._get_ipca_monthly_factor(last_anniversary, next_anniversary, ipca_monthly_rate)
-                    pro_rata = dp / dt
-                    vna *= monthly_factor ** pro_rata
-                    ipca_accumulated += monthly_pct * pro_rata
-
-            return vna, ipca_accumulated
+            factor, accumulated = self.ipca_index.update_factors(
+                np.array([base_date.date()], dtype='datetime64[D]'),
+                np.array([current_date.date()], dtype='datetime64[D]'),
+                anniversary_day, ipca_monthly_rate, self.calendar
+            )
+            return base_vna * float(factor[0]), float(accumulated[0])
 
         except Exception as e:
             print(f"[AVISO] Erro ao calcular VNA: {str(e)}")
             return base_vna, 0.0
 
-    def generate_payment_dates(self, 
+    def payment_schedule(self,
+                         emission_date: datetime,
+                         maturity_date: datetime,
+                         frequency: str,
+                         grace_period_months: int = 0) -> PaymentSchedule:
+        """
+        Cronograma de pagamentos imutável, com dias úteis/corridos por período
+
+        Memoizado por (emissão, vencimento, frequência, carência, versão do
+        calendário) no cache LRU do processo: títulos com o mesmo cronograma
+        reaproveitam datas e contagens.
+        """
+        key = schedule_key(emission_date, maturity_date, frequency, grace_period_months, self.calendar)
+        return default_schedule_cache.get(key, lambda: PaymentSchedule(
+            emission_date,
+            *self._build_payment_dates(emission_date, maturity_date, frequency, grace_period_months),
+            self.calendar
+        ))
+
+    def generate_payment_dates(self,
                               emission_date: datetime,
                               maturity_date: datetime,
                               frequency: str,
                               grace_period_months: int = 0) -> Tuple[List[datetime], List[datetime]]:
         """
         Gera datas de pagamento de juros e amortização
-        
+
         frequency: 'mensal', 'trimestral', 'semestral', 'anual', 'bullet'
         grace_period_months: meses de carência do principal
         """
+        schedule = self.payment_schedule(emission_date, maturity_date, frequency, grace_period_months)
+        return list(schedule.interest_dates), list(schedule.amort_dates)
+
+    def _build_payment_dates(self,
+                             emission_date: datetime,
+                             maturity_date: datetime,
+                             frequency: str,
+                             grace_period_months: int = 0) -> Tuple[List[datetime], List[datetime]]:
+        """Constrói as datas de juros e amortização (ver generate_payment_dates)"""
         
         freq_months = {
             'mensal': 1,
@@ -494,6 +504,30 @@ class DebentureCalculator:
         
         return interest_dates, amort_dates
     
+    def project_cdi_forward(self, payment_dates: List[datetime],
+                            emission_date: datetime) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Projeta o CDI de cada período pelas taxas a termo da curva PRE
+
+        Em vez da taxa spot da emissão até o pagamento, cada período usa o fator
+        a termo entre o pagamento anterior e o atual, obtido dos fatores de
+        desconto acumulados: FatorDI_i = DF(du_{i-1}) / DF(du_i).
+        Todo o cronograma é resolvido em uma única passada vetorizada.
+
+        Retorna tupla (fatores_di, taxas_termo_%, dias_uteis_acumulados), um
+        elemento por data de pagamento (du contados a partir da emissão).
+        """
+        if self.pre_curve is None:
+            raise ValueError("Curva PRE precisa estar carregada para projetar o CDI a termo")
+
+        dates = np.array([d.date() for d in payment_dates], dtype='datetime64[D]')
+        cumulative_du = self.count_business_days_batch(np.datetime64(emission_date.date()), dates)
+        previous_du = np.concatenate(([0], cumulative_du[:-1]))
+
+        cdi_factors = self.pre_curve.growth_factor(previous_du, cumulative_du)
+        forward_rates = self.pre_curve.forward_rate(previous_du, cumulative_du)
+        return cdi_factors, forward_rates, cumulative_du
+
     def calculate_cdi_factor(self, 
                             cdi_rate_annual: float,
                             business_days: int) -> float:
@@ -631,6 +665,38 @@ class DebentureCalculator:
         
         return amort_schedule
     
+    def _prepare_ipca_inputs(self, indexador: str, ipca_projected_annual: float,
+                             ipca_custom_indices: Dict[str, float] = None):
+        """
+        Carrega projeções IPCA e normaliza os índices NI customizados (YYYY-MM)
+
+        ipca_custom_indices também pode ser um IPCAIndex já montado (série do
+        IPCAIndexStore), usado sem nova normalização.
+        """
+        # Carrega projeções IPCA se indexador for IPCA
+        if indexador == 'IPCA' and self.ipca_projections is None:
+            self.load_ipca_projections(ipca_projected_annual)
+        self._set_ipca_custom_indices(indexador, ipca_custom_indices)
+
+    def _set_ipca_custom_indices(self, indexador: str, ipca_custom_indices: Dict[str, float] = None):
+        """Normaliza os índices NI customizados (YYYY-MM) e monta o IPCAIndex"""
+        if indexador == 'IPCA':
+            if isinstance(ipca_custom_indices, IPCAIndex):
+                self.ipca_custom_indices = ipca_custom_indices
+            elif ipca_custom_indices:
+                tmp_indices = {}
+                for key, value in ipca_custom_indices.items():
+                    try:
+                        normalized_key = self._normalize_month_key_str(str(key))
+                        tmp_indices[normalized_key] = float(value)
+                    except (TypeError, ValueError):
+                        continue
+                self.ipca_custom_indices = tmp_indices
+            else:
+                self.ipca_custom_indices = {}
+        else:
+            self.ipca_custom_indices = {}
+
     def generate_cash_flow(self,
                           emission_date: datetime,
                           maturity_date: datetime,
@@ -644,45 +710,54 @@ class DebentureCalculator:
                           indexador: str = 'CDI',
                           anniversary_day_ipca: int = 15,
                           ipca_projected_annual: float = 4.5,
-                          ipca_custom_indices: Dict[str, float] = None) -> List[Dict]:
+                          ipca_custom_indices: Dict[str, float] = None,
+                          cdi_projection: str = 'spot',
+                          engine: str = 'loop') -> CashFlow:
         """
         Gera fluxo de caixa completo da debênture (CDI+ ou IPCA+)
 
+        Retorna um CashFlow (colunas NumPy com acesso por linha: cash_flow[i]['pmt']).
+
         Parâmetros adicionais:
         - indexador: 'CDI' ou 'IPCA'
         - anniversary_day_ipca: Dia de aniversário para atualização do VNA (padrão: 15)
         - ipca_projected_annual: IPCA projetado em % a.a. (padrão: 4.5)
         - ipca_custom_indices: dicionário opcional {YYYY-MM: índice NI} para usar dados oficiais da ANBIMA
+          (ou IPCAIndex da série armazenada, ver ipca_store)
+        - cdi_projection: 'spot' (taxa da curva da emissão até o pagamento, aplicada ao período)
+          ou 'forward' (taxa a termo entre pagamentos consecutivos); só vale para CDI+ com curva
+        - engine: 'loop' (pagamento a pagamento) ou 'vectorized' (cronograma inteiro em arrays NumPy;
+          mesmos valores do laço)
         """
+        if cdi_projection not in ('spot', 'forward'):
+            raise ValueError(f"Projeção de CDI inválida: {cdi_projection}. Use 'spot' ou 'forward'.")
+        if engine not in ('loop', 'vectorized'):
+            raise ValueError(f"Engine inválida: {engine}. Use 'loop' ou 'vectorized'.")
 
-        # Gera datas de pagamento
-        interest_dates, amort_dates = self.generate_payment_dates(
+        # Gera datas de pagamento (cronograma memoizado)
+        payment_schedule = self.payment_schedule(
             emission_date, maturity_date, interest_frequency, grace_period_months
         )
+        interest_dates = list(payment_schedule.interest_dates)
+        amort_dates = list(payment_schedule.amort_dates)
 
         # Cronograma de amortização
         amort_schedule = self.calculate_amortization_schedule(
             vne, amort_dates, amort_type, custom_amort_percentages
         )
 
-        # Carrega projeções IPCA se indexador for IPCA
-        if indexador == 'IPCA' and self.ipca_projections is None:
-            self.load_ipca_projections(ipca_projected_annual)
+        self._prepare_ipca_inputs(indexador, ipca_projected_annual, ipca_custom_indices)
 
-        if indexador == 'IPCA':
-            if ipca_custom_indices:
-                tmp_indices = {}
-                for key, value in ipca_custom_indices.items():
-                    try:
-                        normalized_key = self._normalize_month_key_str(str(key))
-                        tmp_indices[normalized_key] = float(value)
-                    except (TypeError, ValueError):
-                        continue
-                self.ipca_custom_indices = tmp_indices
-            else:
-                self.ipca_custom_indices = {}
-        else:
-            self.ipca_custom_indices = {}
+        if engine == 'vectorized':
+            schedule = self._schedule_arrays(
+                payment_schedule, amort_schedule, indexador, anniversary_day_ipca, cdi_projection
+            )
+            return self._evaluate_schedule(schedule, vne, cdi_rate_annual, spread_annual)[0]
+
+        # Projeção a termo do CDI: fatores de todo o cronograma em uma passada
+        forward_rates = None
+        if indexador == 'CDI' and cdi_projection == 'forward' and self.pre_curve is not None:
+            _, forward_rates, cumulative_du = self.project_cdi_forward(interest_dates, emission_date)
 
         # Constrói fluxo de caixa
         cash_flow = []
@@ -708,7 +783,6 @@ class DebentureCalculator:
                     ipca_implicit, _ = self.get_ipca_implicit_from_curve(payment_date, emission_date)
                     if ipca_implicit is not None:
                         ipca_monthly_to_use = ipca_implicit
-                        print(f"[INFO] Usando IPCA implícito da curva: {ipca_implicit:.4f}% a.m. para data {payment_date.strftime('%d/%m/%Y')}")
 
                 # Fallback para IPCA projetado manual
                 if ipca_monthly_to_use is None:
@@ -727,11 +801,19 @@ class DebentureCalculator:
 
             # Calcula juros APENAS sobre a taxa real (não inclui atualização monetária)
             # A atualização monetária já está embutida no saldo devedor
-            interest, taxa_efetiva, vertice_dias_uteis = self.calculate_interest(
-                saldo_devedor_atualizado, cdi_rate_annual, spread_annual, business_days,
-                payment_date=payment_date, emission_date=emission_date,
-                indexador=indexador
-            )
+            if forward_rates is not None:
+                # Taxa a termo do período: (1 + termo)^(du/252) = DF(du_anterior) / DF(du_atual)
+                interest, taxa_efetiva, _ = self.calculate_interest(
+                    saldo_devedor_atualizado, float(forward_rates[idx]), spread_annual, business_days,
+                    indexador=indexador
+                )
+                vertice_dias_uteis = int(cumulative_du[idx])
+            else:
+                interest, taxa_efetiva, vertice_dias_uteis = self.calculate_interest(
+                    saldo_devedor_atualizado, cdi_rate_annual, spread_annual, business_days,
+                    payment_date=payment_date, emission_date=emission_date,
+                    indexador=indexador
+                )
 
             # Calcula amortização sobre o saldo atualizado
             amortization = 0.0
@@ -785,155 +867,643 @@ class DebentureCalculator:
 
             previous_date = payment_date
 
-        return cash_flow
+        projected = indexador == 'CDI' and self.pre_curve is not None
+        return CashFlow.from_rows(cash_flow, indexador, cdi_projection if projected else None)
+
+    def _vna_period_factors(self,
+                            start_dates: List[datetime],
+                            end_dates: List[datetime],
+                            anniversary_day: int,
+                            monthly_rates) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Fator de atualização do VNA e IPCA acumulado (%) de cada período
 
-    def cash_flow_to_json(self, cash_flow: List[Dict]) -> List[Dict]:
+        Razão entre os níveis do índice NI no fim e no início de cada período,
+        calculada de uma vez para todo o cronograma; o VNA do cronograma é o
+        produto acumulado dos fatores.
+        """
+        default_rate = self._default_ipca_monthly_rate()
+        rates = np.array([default_rate if rate is None else rate for rate in monthly_rates], dtype=np.float64)
+        return self.ipca_index.update_factors(
+            np.array([d.date() for d in start_dates], dtype='datetime64[D]'),
+            np.array([d.date() for d in end_dates], dtype='datetime64[D]'),
+            anniversary_day, rates, self.calendar
+        )
+
+    def _schedule_arrays(self,
+                         payment_schedule: PaymentSchedule,
+                         amort_schedule: Dict[datetime, float],
+                         indexador: str,
+                         anniversary_day_ipca: int,
+                         cdi_projection: str,
+                         ipca_monthly_rate: float = None) -> Dict:
+        """
+        Parte do motor vetorizado que só depende do cronograma e das curvas
+
+        Dias úteis/corridos (do PaymentSchedule), percentuais de amortização,
+        taxas das curvas (None com taxa fixa) e, no IPCA+, fatores de VNA por
+        período. Pode ser reaproveitada por todos os títulos com o mesmo
+        cronograma, qualquer que seja o VNE ou o spread.
+
+        ipca_monthly_rate: IPCA projetado (% a.m.) sem curvas carregadas
+                           (default: projeção carregada na calculadora)
+        """
+        emission_date = payment_schedule.emission_date
+        interest_dates = payment_schedule.interest_dates
+        n = len(interest_dates)
+        cumulative_du = payment_schedule.cumulative_business_days
+
+        # Mesmos dtypes das colunas do CashFlow: os arrays são compartilhados, sem cópia
+        schedule = {
+            'indexador': indexador,
+            'dates': payment_schedule.dates.astype('datetime64[s]'),
+            'business_days': payment_schedule.business_days,
+            'calendar_days': payment_schedule.calendar_days,
+            'amort_percent': np.array([amort_schedule.get(d, 0.0) for d in interest_dates], dtype=np.float64),
+            'curve_rates': None,
+            'vertices': None,
+            'cdi_projection': None,
+        }
+
+        if indexador == 'CDI':
+            if self.pre_curve is not None and cdi_projection == 'forward':
+                _, schedule['curve_rates'], _ = self.project_cdi_forward(interest_dates, emission_date)
+                schedule['vertices'] = cumulative_du
+            elif self.pre_curve is not None:
+                schedule['curve_rates'] = self.pre_curve.rate_at(cumulative_du)
+                schedule['vertices'] = cumulative_du
+            if self.pre_curve is not None:
+                schedule['cdi_projection'] = cdi_projection
+
+        else:
+            # IPCA mensal de cada período: implícito das curvas ou projeção manual
+            if self.implied_inflation_curve is not None:
+                monthly_rates = self.implied_inflation_curve.monthly_rate_at(cumulative_du)
+            else:
+                if ipca_monthly_rate is None and self.ipca_projections:
+                    ipca_monthly_rate = self.ipca_projections['monthly_rate']
+                monthly_rates = [ipca_monthly_rate] * n
+
+            previous_dates = (emission_date,) + interest_dates[:-1]
+            schedule['vna_factors'], schedule['ipca_accumulated'] = self._vna_period_factors(
+                previous_dates, interest_dates, anniversary_day_ipca, monthly_rates
+            )
+            if self.real_curve is not None:
+                schedule['curve_rates'] = self.real_curve.rate_at(cumulative_du)
+                schedule['vertices'] = cumulative_du
+
+        return schedule
+
+    def _evaluate_schedule(self, schedule: Dict, vne, cdi_rate_annual, spread_annual) -> List[CashFlow]:
+        """
+        Parte do motor vetorizado que depende do título: juros, amortização, saldos e PMT
+
+        vne, cdi_rate_annual e spread_annual podem ser escalares ou arrays com um
+        valor por título; o cronograma é avaliado para todos de uma vez (arrays
+        títulos × eventos) e o resultado é um CashFlow por título. Mesmos
+        valores do laço de generate_cash_flow:
+        - saldo nominal: subtrações acumuladas das amortizações programadas
+        - IPCA+: saldo atualizado_i = VNE × Π(fator_VNA_k × (1 - amortizado_{k-1}))
+        """
+        indexador = schedule['indexador']
+        n = len(schedule['dates'])
+        du_fraction = schedule['business_days'] / 252
+
+        # Uma linha por título
+        vne = np.atleast_1d(np.asarray(vne, dtype=np.float64))[:, None]
+        cdi_rate_annual = np.atleast_1d(np.asarray(cdi_rate_annual, dtype=np.float64))[:, None]
+        spread_annual = np.atleast_1d(np.asarray(spread_annual, dtype=np.float64))[:, None]
+        n_bonds = max(len(vne), len(cdi_rate_annual), len(spread_annual))
+        vne = np.broadcast_to(vne, (n_bonds, 1))
+
+        # Amortização nominal programada (% do VNE) e saldo nominal antes de cada pagamento
+        amortization_nominal = vne * (schedule['amort_percent'] / 100)
+        nominal = np.subtract.accumulate(np.concatenate((vne, amortization_nominal), axis=1), axis=1)
+        saldo_nominal_before = np.maximum(nominal[:, :-1], 0.0)
+
+        vna_atualizado = None
+        if indexador == 'CDI':
+            rates = schedule['curve_rates']
+            if rates is None:
+                rates = np.broadcast_to(cdi_rate_annual, (n_bonds, n))
+
+            saldo = saldo_nominal_before
+            fator_juros = (1 + rates / 100) ** du_fraction * (1 + spread_annual / 100) ** du_fraction
+            interest = saldo * (fator_juros - 1)
+            amortization = amortization_nominal
+
+        else:
+            # Fração do saldo amortizada em cada pagamento (proporcional ao saldo nominal)
+            positive = saldo_nominal_before > 0
+            ratio = np.where(
+                positive,
+                np.minimum(1.0, amortization_nominal / np.where(positive, saldo_nominal_before, 1.0)),
+                0.0
+            )
+            remaining = np.concatenate((np.ones((n_bonds, 1)), 1 - ratio[:, :-1]), axis=1)
+            saldo = vne * np.cumprod(schedule['vna_factors'] * remaining, axis=1)
+            vna_atualizado = saldo
+            amortization = saldo * ratio
+
+            rates = schedule['curve_rates']
+            if rates is None:
+                rates = np.broadcast_to(spread_annual, (n_bonds, n))
+            interest = saldo * ((1 + rates / 100) ** du_fraction - 1)
+
+        pmt = interest + amortization
+        rates = np.broadcast_to(rates, (n_bonds, n))
+
+        # Colunas do cronograma compartilhadas por todos os títulos
+        return [
+            CashFlow(
+                indexador, schedule['dates'], schedule['business_days'], schedule['calendar_days'],
+                saldo[i], interest[i], amortization[i], pmt[i], rates[i], schedule['vertices'],
+                None if vna_atualizado is None else vna_atualizado[i], schedule.get('ipca_accumulated'),
+                cdi_projection=schedule['cdi_projection']
+            )
+            for i in range(n_bonds)
+        ]
+
+    @staticmethod
+    def _schedule_key(bond: Dict) -> Tuple:
+        """Chave do cronograma de um título da carteira (títulos com a mesma chave são agrupados)"""
+        cdi_projection = bond.get('cdi_projection', 'spot')
+        if cdi_projection not in ('spot', 'forward'):
+            raise ValueError(f"Projeção de CDI inválida: {cdi_projection}. Use 'spot' ou 'forward'.")
+        custom_indices = bond.get('ipca_custom_indices') or {}
+        if not isinstance(custom_indices, IPCAIndex):
+            custom_indices = tuple(sorted(custom_indices.items()))
+        indexador = bond.get('indexador', 'CDI')
+        # IPCA projetado só altera os fatores de VNA dos títulos IPCA+
+        ipca_projected = float(bond.get('ipca_projected_annual', 4.5)) if indexador == 'IPCA' else None
+        return (
+            bond['emission_date'],
+            bond['maturity_date'],
+            bond['interest_frequency'],
+            bond.get('grace_period_months', 0),
+            bond['amort_type'],
+            tuple(bond.get('custom_amort_percentages') or ()),
+            indexador,
+            bond.get('anniversary_day_ipca', 15),
+            cdi_projection,
+            custom_indices,
+            ipca_projected,
+        )
+
+    def price_portfolio(self, bonds: List[Dict], workers: int = 1) -> List[CashFlow]:
+        """
+        Gera os fluxos de caixa de uma carteira de debêntures (CDI+ e IPCA+)
+
+        bonds: lista de dicionários com os parâmetros de generate_cash_flow
+               (emission_date, maturity_date, vne, cdi_rate_annual, spread_annual,
+               interest_frequency, amort_type, grace_period_months, indexador, ...)
+
+        Títulos com o mesmo cronograma (emissão, vencimento, frequência, carência,
+        amortização, indexador e IPCA projetado) são agrupados: dias úteis, taxas das curvas e
+        fatores de VNA são calculados uma vez por cronograma, e VNE, spread e taxa
+        CDI entram como uma dimensão a mais dos arrays. O custo cresce com o número
+        de cronogramas distintos, não com o número de títulos.
+
+        workers: número de processos; com workers > 1 os títulos são divididos
+                 entre processos (ver parallel_pricing) e o resultado é um
+                 CashFlowBook (sequência de CashFlow em colunas únicas)
+
+        Retorna um CashFlow por título, na ordem de entrada (mesmos valores de
+        generate_cash_flow com engine='vectorized').
+        """
+        if workers > 1:
+            from parallel_pricing import price_portfolio_parallel
+            return price_portfolio_parallel(self, bonds, workers)
+
+        groups = {}
+        for position, bond in enumerate(bonds):
+            groups.setdefault(self._schedule_key(bond), []).append(position)
+
+        cash_flows = [None] * len(bonds)
+        for positions in groups.values():
+            first = bonds[positions[0]]
+            indexador = first.get('indexador', 'CDI')
+
+            payment_schedule = self.payment_schedule(
+                first['emission_date'], first['maturity_date'],
+                first['interest_frequency'], first.get('grace_period_months', 0)
+            )
+            amort_schedule = self.calculate_amortization_schedule(
+                first['vne'], list(payment_schedule.amort_dates), first['amort_type'],
+                first.get('custom_amort_percentages')
+            )
+            # IPCA projetado entra direto no cronograma: não altera a projeção da calculadora
+            ipca_projected_annual = first.get('ipca_projected_annual', 4.5)
+            self._set_ipca_custom_indices(indexador, first.get('ipca_custom_indices'))
+
+            # IPCA projetado do próprio grupo (faz parte da chave), não o carregado na calculadora
+            schedule = self._schedule_arrays(
+                payment_schedule, amort_schedule, indexador,
+                first.get('anniversary_day_ipca', 15), first.get('cdi_projection', 'spot'),
+                annual_to_monthly_rate(ipca_projected_annual) if indexador == 'IPCA' else None
+            )
+            group_flows = self._evaluate_schedule(
+                schedule,
+                [bonds[i]['vne'] for i in positions],
+                [bonds[i].get('cdi_rate_annual', 0.0) for i in positions],
+                [bonds[i]['spread_annual'] for i in positions],
+            )
+            for position, cash_flow in zip(positions, group_flows):
+                cash_flows[position] = cash_flow
+
+        return cash_flows
+
+    def sweep(self,
+              emission_date: datetime,
+              maturity_date: datetime,
+              vne,
+              cdi_rate_annual,
+              spread_annual,
+              interest_frequency: str,
+              amort_type: str,
+              grace_period_months: int = 0,
+              custom_amort_percentages: List[float] = None,
+              indexador: str = 'CDI',
+              anniversary_day_ipca: int = 15,
+              ipca_projected_annual: float = 4.5,
+              ipca_custom_indices: Dict[str, float] = None,
+              cdi_projection: str = 'spot',
+              grid: bool = False) -> List[Dict]:
+        """
+        Calcula o mesmo título para vários cenários de VNE, taxa CDI e spread
+
+        vne, cdi_rate_annual, spread_annual: escalares ou listas de valores.
+        Com grid=False as listas são combinadas elemento a elemento (mesmo
+        tamanho, escalares são repetidos); com grid=True, todas as combinações.
+        Demais parâmetros como em generate_cash_flow.
+
+        Cronograma, dias úteis, taxas das curvas e fatores de VNA são calculados
+        uma vez; juros, amortização, saldos e PMT de todos os cenários saem de
+        uma única avaliação vetorizada (cenários × eventos).
+
+        Retorna uma lista com um item por cenário:
+        {'vne', 'cdi_rate', 'spread', 'cash_flow' (CashFlow), 'metrics'}
+        """
+        if cdi_projection not in ('spot', 'forward'):
+            raise ValueError(f"Projeção de CDI inválida: {cdi_projection}. Use 'spot' ou 'forward'.")
+
+        values = [np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in (vne, cdi_rate_annual, spread_annual)]
+        if grid:
+            values = [axis.ravel() for axis in np.meshgrid(*values, indexing='ij')]
+        else:
+            try:
+                values = np.broadcast_arrays(*values)
+            except ValueError:
+                raise ValueError("Listas de VNE, taxa CDI e spread devem ter o mesmo tamanho (ou use grid=True)")
+        vnes, cdi_rates, spreads = values
+
+        # Parte independente das taxas: uma vez para todos os cenários
+        payment_schedule = self.payment_schedule(
+            emission_date, maturity_date, interest_frequency, grace_period_months
+        )
+        amort_schedule = self.calculate_amortization_schedule(
+            float(vnes[0]), list(payment_schedule.amort_dates), amort_type, custom_amort_percentages
+        )
+        self._prepare_ipca_inputs(indexador, ipca_projected_annual, ipca_custom_indices)
+        schedule = self._schedule_arrays(
+            payment_schedule, amort_schedule, indexador, anniversary_day_ipca, cdi_projection
+        )
+
+        # Parte dependente das taxas: todos os cenários em uma avaliação
+        cash_flows = self._evaluate_schedule(schedule, vnes, cdi_rates, spreads)
+
+        # Métricas de todos os cenários em uma passagem (mesmas datas para todos)
+        years = self._years_from_emission(cash_flows[0], emission_date)
+        kernel = cash_flow_metrics(
+            years, np.stack([cf.pmt for cf in cash_flows]), np.stack([cf.juros for cf in cash_flows]),
+            np.stack([cf.amortizacao for cf in cash_flows]), vnes, (cdi_rates + spreads) / 100
+        )
+
+        irrs = self.calculate_irr_batch(cash_flows, vnes)
+
+        results = []
+        for i, (vne_i, cdi_i, spread_i, cash_flow) in enumerate(
+                zip(vnes.tolist(), cdi_rates.tolist(), spreads.tolist(), cash_flows)):
+            irr = float(irrs[i])
+            results.append({
+                'vne': vne_i,
+                'cdi_rate': cdi_i,
+                'spread': spread_i,
+                'cash_flow': cash_flow,
+                'metrics': self._metrics_dict(kernel, len(cash_flow), irr, i),
+            })
+        return results
+
+    def cash_flow_to_json(self, cash_flow: CashFlow) -> List[Dict]:
         """
         Converte cash flow para formato JSON serializable
         """
-        json_flow = []
-        for row in cash_flow:
-            json_row = row.copy()
-            # Converte datetime para string
-            json_row['data'] = row['data'].strftime('%Y-%m-%d')
-            json_flow.append(json_row)
-        return json_flow
+        # Colunas convertidas de uma vez (datas em 'YYYY-MM-DD')
+        return as_cash_flow(cash_flow).to_json()
+
+    def calculate_irr(self, cash_flow: CashFlow, vne: float, emission_date: datetime) -> float:
+        """
+        Calcula a TIR (Taxa Interna de Retorno) em % a.a., base 252 dias úteis
 
-    def calculate_irr(self, cash_flow: List[Dict], vne: float, emission_date: datetime) -> float:
+        VNE = Σ PMT / (1 + TIR)^(du/252), com du desde a emissão (padrão ANBIMA).
+        Resolvida por Newton-Raphson protegido por bissecção (solve_irr).
         """
-        Calcula a TIR (Taxa Interna de Retorno) usando método de Newton-Raphson
+        return float(self.calculate_irr_batch([cash_flow], [vne])[0])
+
+    def calculate_irr_batch(self, cash_flows: List[CashFlow], vnes, guess=None) -> np.ndarray:
         """
-        # Fluxo de caixa: investimento inicial negativo + pagamentos positivos
-        flows = [-vne]  # Investimento inicial
-        
-        for row in cash_flow:
-            flows.append(row['pmt'])
-        
-        # Método de Newton-Raphson para encontrar TIR
-        irr = 0.1  # Chute inicial: 10% a.a.
-        max_iterations = 100
-        tolerance = 0.0001
-        
-        for _ in range(max_iterations):
-            npv = 0
-            derivative = 0
-            
-            for i, flow in enumerate(flows):
-                npv += flow / ((1 + irr) ** i)
-                if i > 0:
-                    derivative -= i * flow / ((1 + irr) ** (i + 1))
-            
-            if abs(npv) < tolerance:
-                break
-            
-            if derivative == 0:
-                break
-                
-            irr = irr - npv / derivative
-        
-        return irr * 100  # Retorna em percentual
-    
-    def calculate_payback(self, cash_flow: List[Dict], vne: float, emission_date: datetime, discount_rate: float) -> Dict:
+        TIR (% a.a., base 252) de vários fluxos de uma vez
+
+        cash_flows: fluxos (CashFlow) com quaisquer datas e números de eventos
+        vnes: investimento inicial de cada fluxo (escalar ou um por fluxo)
+        guess: chute inicial em % a.a. (warm start, p.ex. TIRs da avaliação anterior)
+
+        Os fluxos são alinhados em uma matriz (títulos × eventos, completada
+        com zeros) e todas as TIRs são resolvidas na mesma iteração.
+        Fluxos sem TIR retornam NaN.
+        """
+        times, flows = self._flow_matrix([as_cash_flow(cf) for cf in cash_flows])
+        if guess is not None:
+            guess = np.asarray(guess, dtype=np.float64) / 100
+        return solve_irr(times, flows, np.broadcast_to(np.asarray(vnes, dtype=np.float64), len(flows)),
+                         guess) * 100
+
+    def _flow_matrix(self, cash_flows: List[CashFlow], settlement_date: datetime = None,
+                     real: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Prazos (du/252) e PMTs dos fluxos em matrizes (títulos × eventos), completadas com zeros
+
+        Sem settlement_date, o prazo é contado da emissão; com settlement_date,
+        da data de liquidação, e só entram os pagamentos posteriores a ela.
+
+        real: PMTs dos títulos IPCA+ sem a inflação projetada após a liquidação
+              (fluxos reais em moeda da data de liquidação)
+        """
+        width = max((len(cf) for cf in cash_flows), default=0)
+        times = np.zeros((len(cash_flows), width))
+        flows = np.zeros((len(cash_flows), width))
+        for i, cf in enumerate(cash_flows):
+            cumulative_du = np.cumsum(cf.dias_uteis)
+            if settlement_date is None:
+                du = cumulative_du
+                future = np.ones(len(cf), dtype=bool)
+            else:
+                settlement = np.datetime64(settlement_date.date())
+                dates = cf.data.astype('datetime64[D]')
+                future = dates > settlement
+                du = self.calendar.count_business_days_batch(np.full(len(cf), settlement), dates)
+            pmt = cf.pmt
+
+            if real:
+                if cf.ipca_acumulado is None:
+                    raise ValueError("Fluxos reais exigem títulos IPCA+")
+                # Inflação acumulada desde a emissão em cada pagamento e, na liquidação,
+                # pró-rata exponencial em dias úteis entre os pagamentos vizinhos
+                log_inflation = np.cumsum(np.log1p(cf.ipca_acumulado / 100))
+                settlement_du = float(np.max(cumulative_du[future] - du[future])) if future.any() else 0.0
+                log_settlement = np.interp(settlement_du, np.concatenate(([0], cumulative_du)),
+                                           np.concatenate(([0.0], log_inflation)))
+                pmt = pmt * np.exp(log_settlement - log_inflation)
+
+            times[i, :len(cf)] = np.where(future, du, 0) / 252
+            flows[i, :len(cf)] = np.where(future, pmt, 0.0)
+        return times, flows
+
+    def _bond_flows(self, bonds) -> Tuple[List[CashFlow], bool]:
+        """
+        Fluxos dos títulos para price_from_yield / yield_from_price
+
+        bonds: um CashFlow, ou uma sequência de CashFlow ou de títulos no
+        formato de price_portfolio (dicts, gerados em uma chamada).
+        Retorna (fluxos, True se foi passado um único título).
+        """
+        if isinstance(bonds, CashFlow):
+            return [bonds], True
+        bonds = list(bonds)
+        specs = [i for i, bond in enumerate(bonds) if isinstance(bond, dict)]
+        if specs:
+            for i, cash_flow in zip(specs, self.price_portfolio([bonds[i] for i in specs])):
+                bonds[i] = cash_flow
+        return [as_cash_flow(bond) for bond in bonds], False
+
+    @staticmethod
+    def _per_bond(values, n_bonds: int, single: bool) -> np.ndarray:
+        """Alinha taxas/PUs com os títulos: a primeira dimensão é a dos títulos"""
+        values = np.asarray(values, dtype=np.float64)
+        if single:
+            return values[None, ...]
+        if values.ndim == 0:
+            return np.broadcast_to(values, (n_bonds,))
+        if len(values) != n_bonds:
+            raise ValueError(f"Esperado um valor (ou uma linha) por título: {n_bonds}, recebido {len(values)}")
+        return values
+
+    def price_from_yield(self, bonds, yields, settlement_date: datetime = None):
+        """
+        PU pela taxa (convenção ANBIMA): PU = Σ PMT / (1 + taxa)^(du/252)
+
+        bonds: um CashFlow, ou sequência de CashFlow / títulos (dicts de price_portfolio)
+        yields: taxas em % a.a.; com um título, qualquer shape (uma curva de
+                preço por taxa); com n títulos, escalar, shape (n,) ou (n, m)
+        settlement_date: data de liquidação (padrão: emissão); só os
+                pagamentos posteriores entram no PU, descontados pelos du
+                desde a liquidação
+
+        Todos os títulos e taxas são avaliados em uma única operação sobre a
+        matriz de fluxos. Retorna os PUs no shape das taxas (float com um
+        título e uma taxa).
+        """
+        cash_flows, single = self._bond_flows(bonds)
+        times, flows = self._flow_matrix(cash_flows, settlement_date)
+        rates = self._per_bond(yields, len(cash_flows), single)
+
+        # Títulos × (taxas...) × eventos
+        expand = (slice(None),) + (None,) * (rates.ndim - 1)
+        discount = (1 + rates[..., None] / 100) ** -times[expand]
+        prices = (flows[expand] * discount).sum(axis=-1)
+
+        prices = prices[0] if single else prices
+        return float(prices) if prices.ndim == 0 else prices
+
+    def yield_from_price(self, bonds, prices, settlement_date: datetime = None, guess=None):
+        """
+        Taxa (% a.a., base 252) que leva o fluxo ao PU informado
+
+        Mesmos argumentos de price_from_yield, com PUs no lugar das taxas.
+        guess: taxas iniciais em % a.a. (warm start, p.ex. a marcação anterior)
+
+        Todas as taxas são resolvidas juntas por solve_irr; PUs sem taxa
+        possível retornam NaN.
+        """
+        cash_flows, single = self._bond_flows(bonds)
+        times, flows = self._flow_matrix(cash_flows, settlement_date)
+        prices = self._per_bond(prices, len(cash_flows), single)
+
+        expand = (slice(None),) + (None,) * (prices.ndim - 1)
+        if guess is not None:
+            guess = np.asarray(guess, dtype=np.float64) / 100
+        rates = solve_irr(times[expand], flows[expand], prices, guess) * 100
+
+        rates = rates[0] if single else rates
+        return float(rates) if rates.ndim == 0 else rates
+
+    def key_rate_dv01(self, bonds, curve: str = 'pre', settlement_date: datetime = None,
+                      bump_bp: float = 1.0) -> Dict:
+        """
+        DV01 e DV01 por vértice (key rate) contra a curva PRE ou IPCA (NTN-B) carregada
+
+        bonds: um CashFlow, ou sequência de CashFlow / títulos (dicts de price_portfolio)
+        curve: 'pre' - PMTs nominais descontados pela curva PRE (di_curve); nos
+                       CDI+ projetados pela curva, o CDI de cada período é
+                       reprojetado em cada versão com choque (spot ou a termo,
+                       conforme CashFlow.cdi_projection), então um flutuante
+                       reage só pelo spread
+               'ipca' - PMTs reais dos títulos IPCA+ (sem a inflação projetada)
+                        descontados pela curva de juros reais (ipca_curve)
+        settlement_date: data de liquidação (padrão: emissão)
+        bump_bp: choque em pontos-base
+
+        Todas as versões da curva com choque (paralelo e um vértice por vez)
+        são montadas como um único array (Curve.bumped_rates) e o fluxo é
+        reprecificado contra todas elas em uma avaliação (títulos × choques × eventos).
+
+        Retorna dict com arrays:
+        - vertices: vértices da curva (dias úteis), shape (V,)
+        - pv: valor presente pela curva base, shape (n,)
+        - dv01: PV(base) - PV(choque paralelo), shape (n,)
+        - key_rate_dv01: PV(base) - PV(choque no vértice), shape (n, V)
+        - key_rate_duration: key_rate_dv01 / (PV × choque), shape (n, V)
+        Com um único CashFlow, a dimensão dos títulos é removida.
+        """
+        if curve not in ('pre', 'ipca'):
+            raise ValueError(f"Curva inválida: {curve}. Use 'pre' ou 'ipca'.")
+        rate_curve = self.pre_curve if curve == 'pre' else self.real_curve
+        if rate_curve is None:
+            raise ValueError(f"Curva {curve.upper()} não carregada")
+
+        cash_flows, single = self._bond_flows(bonds)
+        times, flows = self._flow_matrix(cash_flows, settlement_date, real=(curve == 'ipca'))
+        du = np.rint(times * 252).astype(np.int64)
+
+        # Choques × títulos × eventos -> títulos × choques × eventos
+        rates = np.moveaxis(rate_curve.bumped_rates(du, bump_bp / 100), 0, 1)
+        flows = np.repeat(flows[:, None, :], rates.shape[1], axis=1)
+        if curve == 'pre':
+            for i, cf in enumerate(cash_flows):
+                if cf.indexador == 'CDI' and cf.cdi_projection is not None:
+                    pmt = self._reprojected_cdi_pmt(cf, bump_bp / 100)
+                    future = np.ones(len(cf), dtype=bool) if settlement_date is None else \
+                        cf.data.astype('datetime64[D]') > np.datetime64(settlement_date.date())
+                    flows[i, :, :len(cf)] = np.where(future, pmt, 0.0)
+        pvs = (flows * (1 + rates / 100) ** -times[:, None, :]).sum(axis=-1)
+
+        pv = pvs[:, 0]
+        key_rate_dv01 = pv[:, None] - pvs[:, 2:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            key_rate_duration = key_rate_dv01 / (pv[:, None] * bump_bp / 10000)
+
+        result = {
+            'vertices': rate_curve.vertices.astype(np.int64),
+            'pv': pv,
+            'dv01': pv - pvs[:, 1],
+            'key_rate_dv01': key_rate_dv01,
+            'key_rate_duration': key_rate_duration,
+        }
+        if single:
+            result.update({key: value[0] for key, value in result.items() if key != 'vertices'})
+        return result
+
+    def _reprojected_cdi_pmt(self, cash_flow: CashFlow, bump: float) -> np.ndarray:
+        """
+        PMTs de um CDI+ projetado pela curva PRE, reprojetados em cada versão com choque
+
+        Retorna array (2 + V, eventos) na ordem de Curve.bumped_rates. Usa o
+        modo de projeção gravado no fluxo (cash_flow.cdi_projection); o fator
+        do spread de cada período é recuperado do fluxo:
+        (1 + juros / saldo) / fator CDI do período.
+        """
+        current = cash_flow.vertice_dias_uteis.astype(np.int64)
+        previous = np.concatenate(([0], current[:-1]))
+        period = cash_flow.dias_uteis / 252
+        rates = cash_flow.taxa_efetiva
+
+        if cash_flow.cdi_projection == 'forward':
+            # A termo: FatorDI = DF(du_anterior) / DF(du_atual) em cada curva
+            log_growth = (np.log1p(self.pre_curve.bumped_rates(current, bump) / 100) * current / 252
+                          - np.log1p(self.pre_curve.bumped_rates(previous, bump) / 100) * previous / 252)
+            cdi_factors = np.exp(log_growth)
+        else:
+            cdi_factors = (1 + self.pre_curve.bumped_rates(current, bump) / 100) ** period
+
+        saldo = cash_flow.saldo_devedor
+        positive = saldo > 0
+        spread_factors = (1 + cash_flow.juros / np.where(positive, saldo, 1.0)) / (1 + rates / 100) ** period
+        interest = np.where(positive, saldo * (spread_factors * cdi_factors - 1), 0.0)
+        return interest + cash_flow.amortizacao
+
+    def _years_from_emission(self, cash_flow: CashFlow, emission_date: datetime) -> np.ndarray:
+        """Prazo de cada evento em anos corridos desde a emissão (dias / 365,25)"""
+        days = (cash_flow.data - np.datetime64(emission_date, 's')) // np.timedelta64(1, 'D')
+        return days / 365.25
+
+    def calculate_payback(self, cash_flow: CashFlow, vne: float, emission_date: datetime, discount_rate: float) -> Dict:
         """
         Calcula o período de payback simples e descontado
         discount_rate: taxa de desconto em decimal (ex: 0.1 para 10%)
         """
-        accumulated_simple = 0
-        accumulated_discounted = 0
-        payback_simple_years = None
-        payback_discounted_years = None
-        
-        for i, row in enumerate(cash_flow):
-            # Payback simples
-            accumulated_simple += row['pmt']
-            if payback_simple_years is None and accumulated_simple >= vne:
-                days_from_emission = (row['data'] - emission_date).days
-                payback_simple_years = days_from_emission / 365.25
-            
-            # Payback descontado
-            years_from_emission = (row['data'] - emission_date).days / 365.25
-            pv_flow = row['pmt'] / ((1 + discount_rate) ** years_from_emission)
-            accumulated_discounted += pv_flow
-            
-            if payback_discounted_years is None and accumulated_discounted >= vne:
-                payback_discounted_years = years_from_emission
-        
+        cash_flow = as_cash_flow(cash_flow)
+        kernel = cash_flow_metrics(self._years_from_emission(cash_flow, emission_date), cash_flow.pmt,
+                                   cash_flow.juros, cash_flow.amortizacao, vne, discount_rate)
+        metrics = self._metrics_dict(kernel, len(cash_flow), irr=None)
+        return {key: metrics[key] for key in ('payback_simple_years', 'payback_simple_months',
+                                              'payback_discounted_years', 'payback_discounted_months')}
+
+    @staticmethod
+    def _metrics_dict(kernel: Dict[str, np.ndarray], num_payments: int, irr: float, i: int = None) -> Dict:
+        """Métricas de um fluxo (linha i do resultado em lote de cash_flow_metrics)"""
+        value = {key: float(array if i is None else array[i]) for key, array in kernel.items()}
+        payback_simple_years = value['payback_simple_years']
+        payback_discounted_years = value['payback_discounted_years']
+        payback_simple_years = None if np.isnan(payback_simple_years) else payback_simple_years
+        payback_discounted_years = None if np.isnan(payback_discounted_years) else payback_discounted_years
+
         return {
+            'total_juros': value['total_juros'],
+            'total_amortizacao': value['total_amortizacao'],
+            'total_pmt': value['total_pmt'],
+            'duration_years': value['duration_years'],
+            'duration_months': value['duration_years'] * 12,
+            'modified_duration': value['modified_duration'],
+            'convexity': value['convexity'],
+            'avg_maturity_years': value['avg_maturity_years'],
+            'avg_maturity_months': value['avg_maturity_years'] * 12,
+            'num_payments': num_payments,
+            'avg_pmt': value['total_pmt'] / num_payments if num_payments > 0 else 0,
+            'irr': irr,
             'payback_simple_years': payback_simple_years,
             'payback_simple_months': payback_simple_years * 12 if payback_simple_years else None,
             'payback_discounted_years': payback_discounted_years,
             'payback_discounted_months': payback_discounted_years * 12 if payback_discounted_years else None
         }
-    
-    def calculate_metrics(self, cash_flow: List[Dict], emission_date: datetime, 
+
+    def calculate_metrics(self, cash_flow: CashFlow, emission_date: datetime,
                          vne: float, cdi_rate: float, spread: float) -> Dict:
         """
-        Calcula métricas financeiras: duration, prazo médio, etc.
+        Calcula métricas financeiras: duration, prazo médio, convexidade, etc.
+
+        Totais, durations (Macaulay e modificada), prazo médio, convexidade e
+        paybacks saem de uma única passagem sobre as colunas (cash_flow_metrics),
+        com o mesmo array de fatores de desconto (taxa CDI + spread).
         """
-        total_pv = 0
-        weighted_time = 0
-        weighted_pmt = 0
-        total_juros = 0
-        total_amort = 0
-        total_pmt = 0
-        
-        # Taxa de desconto (CDI + Spread)
+        cash_flow = as_cash_flow(cash_flow)
         discount_rate = (cdi_rate + spread) / 100
-        
-        for row in cash_flow:
-            # Tempo em anos desde emissão
-            days_from_emission = (row['data'] - emission_date).days
-            years_from_emission = days_from_emission / 365.25
-            
-            # Valor presente do fluxo
-            pv_flow = row['pmt'] / ((1 + discount_rate) ** years_from_emission)
-            
-            # Acumula para cálculo de duration
-            total_pv += pv_flow
-            weighted_time += pv_flow * years_from_emission
-            
-            # Acumula para prazo médio (ponderado pelo valor nominal)
-            weighted_pmt += row['pmt'] * years_from_emission
-            
-            # Totais
-            total_juros += row['juros']
-            total_amort += row['amortizacao']
-            total_pmt += row['pmt']
-        
-        # Duration de Macaulay (em anos)
-        duration_years = weighted_time / total_pv if total_pv > 0 else 0
-        
-        # Prazo médio ponderado (em anos)
-        avg_maturity_years = weighted_pmt / total_pmt if total_pmt > 0 else 0
-        
-        # Modified Duration
-        modified_duration = duration_years / (1 + discount_rate)
-        
-        # Calcula TIR
+
+        kernel = cash_flow_metrics(self._years_from_emission(cash_flow, emission_date), cash_flow.pmt,
+                                   cash_flow.juros, cash_flow.amortizacao, vne, discount_rate)
         irr = self.calculate_irr(cash_flow, vne, emission_date)
-        
-        # Calcula Payback
-        payback = self.calculate_payback(cash_flow, vne, emission_date, discount_rate)
-        
-        return {
-            'total_juros': total_juros,
-            'total_amortizacao': total_amort,
-            'total_pmt': total_pmt,
-            'duration_years': duration_years,
-            'duration_months': duration_years * 12,
-            'modified_duration': modified_duration,
-            'avg_maturity_years': avg_maturity_years,
-            'avg_maturity_months': avg_maturity_years * 12,
-            'num_payments': len(cash_flow),
-            'avg_pmt': total_pmt / len(cash_flow) if len(cash_flow) > 0 else 0,
-            'irr': irr,
-            'payback_simple_years': payback['payback_simple_years'],
-            'payback_simple_months': payback['payback_simple_months'],
-            'payback_discounted_years': payback['payback_discounted_years'],
-            'payback_discounted_months': payback['payback_discounted_months']
-        }
-    
-    def export_to_html(self, cash_flow: List[Dict], emission_date: datetime,
+        return self._metrics_dict(kernel, len(cash_flow), irr)
+
+    def export_to_html(self, cash_flow: CashFlow, emission_date: datetime,
                       vne: float, cdi_rate: float, spread: float, filename: str = "fluxo_debenture.html",
                       maturity_date: datetime = None, interest_frequency: str = None,
                       amort_type: str = None, grace_period_months: int = 0):
@@ -1277,7 +1847,13 @@ class DebentureCalculator:
                     <div class="metric-value">""" + f"{metrics['modified_duration']:.2f}" + """</div>
                     <div class="metric-subtitle">Sensibilidade à taxa de juros</div>
                 </div>
-                
+
+                <div class="metric-card">
+                    <h4>🔁 Convexidade</h4>
+                    <div class="metric-value">""" + f"{metrics['convexity']:.2f}" + """</div>
+                    <div class="metric-subtitle">Curvatura da relação preço × taxa</div>
+                </div>
+
                 <div class="metric-card">
                     <h4>📈 TIR (Taxa Interna de Retorno)</h4>
                     <div class="metric-value">""" + f"{metrics['irr']:.2f}%" + """</div>
@@ -0,0 +1,166 @@
+"""
+Índice NI (número-índice do IPCA) materializado por mês
+Atualização do VNA em forma fechada: razão entre dois níveis do índice
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+def normalize_month_key(key: str) -> str:
+    """Normaliza a chave do mês para YYYY-MM (aceita YYYYMM, YYYY/M, YYYY-M)"""
+    key = key.strip().replace('/', '-').replace(' ', '')
+    if len(key) == 6 and key.isdigit():
+        return f"{key[:4]}-{key[4:]}"
+    if len(key) == 7 and key[4] == '-':
+        return f"{key[:4]}-{key[5:].zfill(2)}"
+    parts = key.split('-')
+    if len(parts) == 2 and len(parts[0]) == 4 and parts[1].isdigit():
+        return f"{parts[0]}-{parts[1].zfill(2)}"
+    return key
+
+
+def month_ordinal(key: str) -> int:
+    """Mês 'YYYY-MM' como ordinal de datetime64[M] (meses desde 1970-01)"""
+    year, month = key.split('-')
+    month = int(month)
+    if not 1 <= month <= 12:
+        raise ValueError(f"Mês inválido: {key}")
+    return (int(year) - 1970) * 12 + month - 1
+
+
+def month_key(ordinal: int) -> str:
+    """Ordinal de mês como chave 'YYYY-MM'"""
+    return f"{1970 + ordinal // 12:04d}-{ordinal % 12 + 1:02d}"
+
+
+class IPCAIndex:
+    """
+    Número-índice do IPCA por mês, com extensão pela taxa projetada
+
+    custom_indices: {YYYY-MM: NI} oficiais (ANBIMA/IBGE), opcional
+
+    O índice é guardado como log do produto acumulado dos fatores mensais,
+    separado em duas partes por ordinal de mês k:
+    - log_custom[k]: soma dos log(NI_k / NI_k-1) dos meses com NI conhecido
+    - projected[k]: quantidade de meses sem NI (atualizados pela taxa projetada)
+
+    Assim log NI_k = log_custom[k] + projected[k] · log(1 + taxa_mensal) para
+    qualquer taxa projetada, e o fator entre duas datas é a razão entre dois
+    níveis do índice (com pró-rata de dias úteis entre aniversários),
+    calculada para arrays de datas de uma vez.
+    """
+
+    def __init__(self, custom_indices: Dict[str, float] = None):
+        months, values = [], []
+        for key, value in (custom_indices or {}).items():
+            try:
+                ordinal = month_ordinal(normalize_month_key(str(key)))
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            months.append(ordinal)
+            values.append(value)
+        self._build(np.array(months, dtype=np.int64), np.array(values, dtype=np.float64))
+
+    @classmethod
+    def from_arrays(cls, months: np.ndarray, values: np.ndarray, version: int = None) -> 'IPCAIndex':
+        """Índice a partir de arrays (ordinal do mês, NI), como gravados no IPCAIndexStore"""
+        index = cls.__new__(cls)
+        index._build(np.asarray(months, dtype=np.int64), np.asarray(values, dtype=np.float64))
+        index.version = version
+        return index
+
+    def _build(self, months: np.ndarray, values: np.ndarray):
+        valid = values > 0
+        months, values = months[valid], values[valid]
+        # Série da qual o índice foi montado ({YYYY-MM: NI}) e versão do armazenamento
+        self.indices = {month_key(int(k)): float(v) for k, v in zip(months, values)}
+        self.version = None
+
+        if len(months):
+            self.first_month = int(months.min())
+            last_month = int(months.max())
+        else:
+            self.first_month = last_month = 0
+
+        # NI denso por ordinal de mês (NaN nos meses sem índice)
+        dense = np.full(last_month - self.first_month + 1, np.nan)
+        dense[months - self.first_month] = values
+
+        # Fator do mês k: NI_k / NI_k-1 se ambos conhecidos; senão taxa projetada
+        step_known = np.zeros(len(dense), dtype=bool)
+        step_log = np.zeros(len(dense))
+        step_known[1:] = ~np.isnan(dense[1:]) & ~np.isnan(dense[:-1])
+        step_log[1:][step_known[1:]] = np.log(dense[1:][step_known[1:]] / dense[:-1][step_known[1:]])
+        step_known[0] = True
+
+        self.log_custom = np.cumsum(step_log)
+        self.projected = np.cumsum(~step_known).astype(np.int64)
+        for array in (self.log_custom, self.projected):
+            array.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self.log_custom)
+
+    def _log_level_at_month(self, months: np.ndarray, log_rate: np.ndarray) -> np.ndarray:
+        """log NI do mês (ordinais), estendendo pela taxa projetada fora dos meses conhecidos"""
+        position = months - self.first_month
+        inside = np.clip(position, 0, len(self) - 1)
+        # Antes/depois da janela: cada mês a mais (ou a menos) é um mês projetado
+        extra = position - inside
+        return self.log_custom[inside] + (self.projected[inside] + extra) * log_rate
+
+    def log_level(self, dates, anniversary_day: int, monthly_rate, calendar) -> np.ndarray:
+        """
+        log do nível do índice em cada data (datetime64)
+
+        Nível = NI do último aniversário × (NI do próximo / NI do último)^(dp/dt),
+        com dp/dt em dias úteis desde o último aniversário.
+        """
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        log_rate = np.log1p(np.asarray(monthly_rate, dtype=np.float64) / 100)
+
+        month = dates.astype('datetime64[M]')
+        month_start = month.astype('datetime64[D]')
+        days_in_month = ((month + 1).astype('datetime64[D]') - month_start).astype(np.int64)
+        anniversary = month_start + (np.minimum(anniversary_day, days_in_month) - 1)
+
+        # Último aniversário (mês k) e o seguinte (mês k + 1)
+        before = dates < anniversary
+        last_month = month - before.astype(np.int64)
+        next_month = last_month + 1
+        last = _anniversary(last_month, anniversary_day)
+        following = _anniversary(next_month, anniversary_day)
+
+        dp = calendar.count_business_days_batch(last, dates)
+        dt = calendar.count_business_days_batch(last, following)
+        pro_rata = np.where(dt > 0, dp / np.maximum(dt, 1), 0.0)
+
+        k = last_month.astype(np.int64)
+        log_last = self._log_level_at_month(k, log_rate)
+        log_next = self._log_level_at_month(k + 1, log_rate)
+        return log_last + (log_next - log_last) * pro_rata
+
+    def update_factors(self, base_dates, current_dates, anniversary_day: int,
+                       monthly_rate, calendar) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Fator de atualização do VNA e IPCA acumulado (%) entre pares de datas
+
+        Fator = nível(current) / nível(base); pares com current <= base têm fator 1.
+        monthly_rate (% a.m.) pode ser escalar ou um valor por par.
+        """
+        base_dates = np.asarray(base_dates, dtype='datetime64[D]')
+        current_dates = np.asarray(current_dates, dtype='datetime64[D]')
+        log_factor = (self.log_level(current_dates, anniversary_day, monthly_rate, calendar)
+                      - self.log_level(base_dates, anniversary_day, monthly_rate, calendar))
+        factor = np.where(current_dates > base_dates, np.exp(log_factor), 1.0)
+        return factor, (factor - 1) * 100
+
+
+def _anniversary(months: np.ndarray, anniversary_day: int) -> np.ndarray:
+    """Data de aniversário em cada mês (datetime64[M]), limitada ao último dia do mês"""
+    start = months.astype('datetime64[D]')
+    days_in_month = ((months + 1).astype('datetime64[D]') - start).astype(np.int64)
+    return start + (np.minimum(anniversary_day, days_in_month) - 1)
@@ -0,0 +1,162 @@
+"""
+Série de números-índice do IPCA (NI) armazenada no servidor
+Um arquivo .npz (ordinal do mês, NI, versão) carregado uma vez por processo
+"""
+
+from datetime import datetime
+from typing import Dict
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from ipca_index import IPCAIndex, month_key, month_ordinal, normalize_month_key
+
+# Arquivo da série (pode ser alterado pela variável de ambiente IPCA_INDEX_PATH)
+IPCA_INDEX_ENV = 'IPCA_INDEX_PATH'
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ipca_cache', 'ipca_ni.npz')
+
+
+def parse_index_csv(text: str) -> Dict[str, float]:
+    """
+    Converte um CSV de números-índice em {YYYY-MM: NI}
+
+    Uma linha por mês: 'mes;indice', 'mes,indice', 'mes=indice' ou separado
+    por tabulação. Com separador diferente de vírgula, o índice pode usar
+    vírgula decimal. Linhas sem número (cabeçalho) são ignoradas.
+    """
+    indices = {}
+    for raw_line in (text or '').splitlines():
+        line = raw_line.strip().lstrip('\ufeff')
+        if not line:
+            continue
+        separator = next((s for s in (';', '\t', '=') if s in line), ',')
+        if separator not in line:
+            continue
+        key, value = line.split(separator, 1)
+        value = value.strip()
+        if separator != ',':
+            value = value.replace('.', '').replace(',', '.') if ',' in value else value
+        try:
+            key = normalize_month_key(key)
+            month_ordinal(key)
+            indices[key] = float(value)
+        except (TypeError, ValueError):
+            continue
+    return indices
+
+
+class IPCAIndexStore:
+    """
+    Armazena a série de NI em disco e a mantém carregada em memória
+
+    A série é lida uma vez e convertida em um IPCAIndex (arrays por ordinal
+    de mês); as requisições usam esse índice pronto em vez de enviar e
+    reinterpretar o histórico a cada cálculo. Cada atualização incrementa a
+    versão, que identifica a série usada em cada resultado.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.environ.get(IPCA_INDEX_ENV) or DEFAULT_INDEX_PATH
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._months = np.empty(0, dtype=np.int64)
+        self._values = np.empty(0, dtype=np.float64)
+        self._version = 0
+        self._updated_at = None
+        self._index = None
+
+    def _ensure_loaded(self):
+        """Lê o arquivo na primeira consulta (chamado com o lock)"""
+        if self._loaded:
+            return
+        if os.path.exists(self.path):
+            with np.load(self.path) as data:
+                self._months = data['months'].astype(np.int64)
+                self._values = data['values'].astype(np.float64)
+                self._version = int(data['version'])
+                self._updated_at = str(data['updated_at'])
+        self._index = IPCAIndex.from_arrays(self._months, self._values, self._version)
+        self._loaded = True
+
+    @property
+    def version(self) -> int:
+        """Versão da série (0 se nada foi gravado)"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._version
+
+    def index(self) -> IPCAIndex:
+        """Índice NI pronto para o cálculo (mesmo objeto até a próxima atualização)"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._index
+
+    def info(self) -> Dict:
+        """Resumo da série armazenada"""
+        with self._lock:
+            self._ensure_loaded()
+            return {
+                'version': self._version,
+                'updated_at': self._updated_at,
+                'count': len(self._months),
+                'first_month': month_key(int(self._months[0])) if len(self._months) else None,
+                'last_month': month_key(int(self._months[-1])) if len(self._months) else None,
+            }
+
+    def update(self, indices: Dict[str, float], replace: bool = False) -> Dict:
+        """
+        Grava novos números-índice e incrementa a versão
+
+        indices: {YYYY-MM: NI}; meses já existentes são sobrescritos
+        replace: True descarta a série anterior
+
+        Retorna info() da nova versão.
+        """
+        new_months = np.array([month_ordinal(normalize_month_key(str(k))) for k in indices], dtype=np.int64)
+        new_values = np.array([float(v) for v in indices.values()], dtype=np.float64)
+        if np.any(~(new_values > 0)):
+            raise ValueError("Números-índice devem ser positivos")
+
+        with self._lock:
+            self._ensure_loaded()
+            if replace:
+                months, values = new_months, new_values
+            else:
+                # Valores novos prevalecem sobre os gravados para o mesmo mês
+                months = np.concatenate((new_months, self._months))
+                values = np.concatenate((new_values, self._values))
+            months, first = np.unique(months, return_index=True)
+            values = values[first]
+
+            version = self._version + 1
+            updated_at = datetime.now().isoformat(timespec='seconds')
+            self._save(months, values, version, updated_at)
+
+            self._months, self._values = months, values
+            self._version, self._updated_at = version, updated_at
+            self._index = IPCAIndex.from_arrays(months, values, version)
+
+        print(f"[OK] Serie IPCA NI atualizada: versao {version}, {len(months)} meses")
+        return self.info()
+
+    def _save(self, months: np.ndarray, values: np.ndarray, version: int, updated_at: str):
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+
+        # Escrita atômica: grava em arquivo temporário e renomeia
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npz')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, months=months, values=values, version=np.array(version),
+                         updated_at=np.array(updated_at))
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+# Série padrão do processo
+default_ipca_store = IPCAIndexStore()
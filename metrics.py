@@ -0,0 +1,150 @@
+"""
+Métricas do fluxo de caixa em uma única passagem vetorizada
+Totais, duration, prazo médio, convexidade e payback sobre as colunas do CashFlow
+"""
+
+from typing import Dict
+
+import numpy as np
+
+
+def cash_flow_metrics(years: np.ndarray, pmt: np.ndarray, juros: np.ndarray,
+                      amortizacao: np.ndarray, vne, discount_rate) -> Dict[str, np.ndarray]:
+    """
+    Métricas de um ou vários fluxos com as mesmas datas
+
+    years: prazo de cada evento em anos desde a emissão, shape (k,)
+    pmt, juros, amortizacao: shape (k,) ou (n, k) (um fluxo por linha)
+    vne, discount_rate: escalar ou shape (n,); taxa em decimal (0.1 = 10% a.a.)
+
+    Os fatores de desconto (1 + taxa)^-t são calculados uma vez e usados por
+    duration, convexidade e payback descontado. Retorna arrays shape () ou
+    (n,); paybacks não atingidos são NaN.
+    """
+    years = np.asarray(years, dtype=np.float64)
+    pmt = np.asarray(pmt, dtype=np.float64)
+    rate = np.asarray(discount_rate, dtype=np.float64)
+    growth = 1 + rate
+
+    discount = growth[..., None] ** -years
+    pv = pmt * discount
+
+    total_pv = pv.sum(axis=-1)
+    total_pmt = pmt.sum(axis=-1)
+    weighted_time = (pv * years).sum(axis=-1)
+    weighted_convexity = (pv * (years * (years + 1))).sum(axis=-1)
+    weighted_pmt = (pmt * years).sum(axis=-1)
+
+    has_pv = total_pv > 0
+    safe_pv = np.where(has_pv, total_pv, 1.0)
+    duration = np.where(has_pv, weighted_time / safe_pv, 0.0)
+    convexity = np.where(has_pv, weighted_convexity / (safe_pv * growth ** 2), 0.0)
+    avg_maturity = np.where(total_pmt > 0, weighted_pmt / np.where(total_pmt > 0, total_pmt, 1.0), 0.0)
+
+    return {
+        'total_juros': np.asarray(juros, dtype=np.float64).sum(axis=-1),
+        'total_amortizacao': np.asarray(amortizacao, dtype=np.float64).sum(axis=-1),
+        'total_pmt': total_pmt,
+        'total_pv': total_pv,
+        'duration_years': duration,
+        'modified_duration': duration / growth,
+        'convexity': convexity,
+        'avg_maturity_years': avg_maturity,
+        'payback_simple_years': _first_reached(np.cumsum(pmt, axis=-1), vne, years),
+        'payback_discounted_years': _first_reached(np.cumsum(pv, axis=-1), vne, years),
+    }
+
+
+def _first_reached(accumulated: np.ndarray, target, years: np.ndarray) -> np.ndarray:
+    """Prazo do primeiro evento em que o acumulado atinge o alvo (NaN se nunca)"""
+    reached = accumulated >= np.asarray(target, dtype=np.float64)[..., None]
+    first = reached.argmax(axis=-1)
+    if not len(years):
+        return np.full(first.shape, np.nan)
+    return np.where(reached.any(axis=-1), years[first], np.nan)
+
+
+def _npv(rates: np.ndarray, times: np.ndarray, flows: np.ndarray, price: np.ndarray):
+    """VPL (fluxos descontados menos preço) e derivada em relação à taxa, por linha"""
+    growth = 1 + rates
+    pv = flows * growth[:, None] ** -times
+    return pv.sum(axis=-1) - price, -(pv * times).sum(axis=-1) / growth
+
+
+def solve_irr(times, flows, price, guess=None, tolerance: float = 1e-12,
+              max_iterations: int = 100) -> np.ndarray:
+    """
+    TIR (decimal a.a.) de um ou vários fluxos: preço = Σ fluxo · (1 + tir)^-t
+
+    times: prazo de cada fluxo em anos (du/252 no padrão ANBIMA), shape (k,) ou (n, k)
+    flows: fluxos, shape (k,) ou (n, k); eventos sem fluxo podem ser preenchidos com 0
+    price: preço (investimento inicial), escalar ou shape (n,)
+    (as dimensões antes da última são combinadas por broadcasting, p.ex.
+    fluxos (n, 1, k) com preços (n, m) resolvem m preços por título)
+    guess: chute inicial (warm start, p.ex. a TIR da avaliação anterior); por
+           padrão, a taxa que leva o total dos fluxos ao preço no prazo médio
+
+    Newton-Raphson protegido: cada linha mantém um intervalo [lo, hi] com
+    troca de sinal do VPL; passos de Newton que saem do intervalo são
+    trocados por bissecção, de modo que o método sempre converge. VPL e
+    derivada de todas as linhas ainda ativas são avaliados juntos em cada
+    iteração. Linhas sem troca de sinal (sem TIR) retornam NaN.
+    """
+    flows = np.asarray(flows, dtype=np.float64)
+    times = np.asarray(times, dtype=np.float64)
+    batch_shape = np.broadcast_shapes(flows.shape[:-1], times.shape[:-1], np.shape(price))
+    k = flows.shape[-1]
+    flows = np.broadcast_to(flows, batch_shape + (k,)).reshape(-1, k)
+    times = np.broadcast_to(times, batch_shape + (k,)).reshape(-1, k)
+    price = np.broadcast_to(np.asarray(price, dtype=np.float64), batch_shape).ravel()
+    n = len(price)
+
+    # Intervalo inicial: de -99% a.a. até uma taxa com VPL negativo
+    lo = np.full(n, -0.99)
+    hi = np.full(n, 1.0)
+    f_lo, _ = _npv(lo, times, flows, price)
+    f_hi, _ = _npv(hi, times, flows, price)
+    for _ in range(40):
+        expand = (np.sign(f_hi) == np.sign(f_lo)) & (hi < 1e6)
+        if not expand.any():
+            break
+        hi[expand] = 4 * hi[expand] + 1
+        f_hi[expand], _ = _npv(hi[expand], times[expand], flows[expand], price[expand])
+    valid = np.sign(f_hi) != np.sign(f_lo)
+
+    if guess is None:
+        total = flows.sum(axis=-1)
+        mean_time = np.where(total > 0, (flows * times).sum(axis=-1) / np.where(total > 0, total, 1.0), 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = np.where((mean_time > 0) & (price > 0), (total / price) ** (1 / mean_time) - 1, 0.1)
+    else:
+        rates = np.broadcast_to(np.asarray(guess, dtype=np.float64), batch_shape).ravel()
+    rates = np.where(np.isfinite(rates) & (rates > lo) & (rates < hi), rates, (lo + hi) / 2)
+
+    active = valid.copy()
+    for _ in range(max_iterations):
+        rows = np.flatnonzero(active)
+        if not rows.size:
+            break
+        rate = rates[rows]
+        f, df = _npv(rate, times[rows], flows[rows], price[rows])
+
+        # Mantém a troca de sinal dentro do intervalo
+        same_side = np.sign(f) == np.sign(f_lo[rows])
+        lo[rows] = np.where(same_side, rate, lo[rows])
+        hi[rows] = np.where(same_side, hi[rows], rate)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = rate - f / df
+        inside = np.isfinite(newton) & (newton > lo[rows]) & (newton < hi[rows])
+        new_rate = np.where(inside, newton, (lo[rows] + hi[rows]) / 2)
+
+        # VPL já zerado: mantém a taxa atual; senão, converge pelo tamanho do passo
+        at_root = np.abs(f) <= tolerance * np.abs(price[rows])
+        new_rate = np.where(at_root, rate, new_rate)
+        rates[rows] = new_rate
+        converged = at_root | (np.abs(new_rate - rate) <= tolerance * (1 + np.abs(rate)))
+        active[rows[converged]] = False
+
+    rates[~valid] = np.nan
+    return rates.reshape(batch_shape)
@@ -0,0 +1,171 @@
+"""
+Precificação de carteiras em paralelo (pool de processos)
+Curvas e calendário publicados uma vez em memória compartilhada
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from business_calendar import BusinessCalendar
+from cash_flow import CashFlowBook
+from curves import Curve, ImpliedInflationCurve, SvenssonCurve
+
+# Alinhamento (bytes) de cada array dentro do bloco compartilhado
+_ALIGNMENT = 64
+
+# Folga garantida no calendário publicado: antes da primeira emissão (aniversário
+# IPCA anterior à emissão) e após o último vencimento (rolagem de datas)
+_CALENDAR_MARGIN = timedelta(days=31)
+
+
+class SharedArrays:
+    """
+    Arrays NumPy publicados em um único bloco de memória compartilhada
+
+    O processo que cria o bloco copia os arrays uma única vez; os demais
+    processos recebem apenas o manifesto (nome do bloco, dtype, shape e
+    deslocamento de cada array) e anexam visões somente leitura, sem
+    serialização nem cópia.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        layout = {}
+        size = 0
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            layout[key] = (array.dtype.str, array.shape, size)
+            size += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for key, array in arrays.items():
+            dtype, shape, offset = layout[key]
+            np.ndarray(shape, dtype=dtype, buffer=self._shm.buf, offset=offset)[...] = array
+        self.manifest = {'name': self._shm.name, 'layout': layout}
+
+    @staticmethod
+    def attach(manifest: Dict) -> Tuple[shared_memory.SharedMemory, Dict[str, np.ndarray]]:
+        """Anexa o bloco publicado; retorna (bloco, {nome: array somente leitura})"""
+        shm = shared_memory.SharedMemory(name=manifest['name'])
+        arrays = {}
+        for key, (dtype, shape, offset) in manifest['layout'].items():
+            array = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            array.flags.writeable = False
+            arrays[key] = array
+        return shm, arrays
+
+    def close(self):
+        """Libera o bloco (chamado pelo processo que o criou)"""
+        self._shm.close()
+        self._shm.unlink()
+
+
+def _publish_calculator(calc, first_date, last_date) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """
+    Separa o estado de cálculo da calculadora em arrays (memória compartilhada)
+    e parâmetros pequenos (enviados uma vez a cada processo)
+    """
+    calendar = calc.calendar
+    calendar.reserve(first_date - _CALENDAR_MARGIN, last_date + _CALENDAR_MARGIN)
+
+    arrays = {'calendar': calendar.cumulative}
+    state = {
+        'calendar_start': calendar.start_ordinal,
+        # Fonte de feriados do processo pai, para datas fora da janela publicada
+        'holidays': calendar.holidays,
+        'curves': {},
+    }
+    for key, curve in (('pre', calc.pre_curve), ('real', calc.real_curve)):
+        if curve is None:
+            continue
+        spot, discount, forward = curve.dense_grid
+        arrays.update({f'{key}_vertices': curve.vertices, f'{key}_rates': curve.rates,
+                       f'{key}_spot': spot, f'{key}_discount': discount, f'{key}_forward': forward})
+        state['curves'][key] = curve.parameters if isinstance(curve, SvenssonCurve) else None
+
+    implied = calc.implied_inflation_curve
+    if implied is not None:
+        arrays['implied_annual'] = implied.annual_rates
+        arrays['implied_monthly'] = implied.monthly_rates
+    return arrays, state
+
+
+# Estado de cada processo do pool: (bloco compartilhado, calculadora)
+_worker = None
+
+
+def _init_worker(manifest: Dict, state: Dict):
+    """Inicializa o processo: anexa calendário e curvas e monta a calculadora"""
+    global _worker
+    from debenture_calculator import DebentureCalculator
+
+    shm, arrays = SharedArrays.attach(manifest)
+
+    calc = DebentureCalculator()
+    calc.calendar = BusinessCalendar.from_index(state['calendar_start'], arrays['calendar'], state['holidays'])
+    calc.br_holidays = calc.calendar.holidays
+
+    # O motor vetorizado usa apenas as curvas de cálculo (sem os DataFrames)
+    curves = {}
+    for key, parameters in state['curves'].items():
+        grid = (arrays[f'{key}_spot'], arrays[f'{key}_discount'], arrays[f'{key}_forward'])
+        if parameters is not None:
+            curves[key] = SvenssonCurve(parameters, arrays[f'{key}_vertices'], arrays[f'{key}_rates'], grid)
+        else:
+            curves[key] = Curve(arrays[f'{key}_vertices'], arrays[f'{key}_rates'], grid)
+    calc.pre_curve = curves.get('pre')
+    calc.real_curve = curves.get('real')
+    if 'implied_annual' in arrays:
+        calc._implied_inflation_curve = ImpliedInflationCurve(
+            calc.pre_curve, calc.real_curve, (arrays['implied_annual'], arrays['implied_monthly'])
+        )
+
+    _worker = (shm, calc)
+
+
+def _price_chunk(bonds: List[Dict]) -> CashFlowBook:
+    """Precifica uma parte da carteira no processo do pool"""
+    _, calc = _worker
+    return CashFlowBook.from_cash_flows(calc.price_portfolio(bonds))
+
+
+def price_portfolio_parallel(calc, bonds: List[Dict], workers: int) -> CashFlowBook:
+    """
+    Precifica a carteira dividindo os títulos entre workers processos
+
+    Calendário de dias úteis e curvas (vértices, grades diárias e IPCA
+    implícito) são publicados uma vez em memória compartilhada; cada processo
+    os anexa na inicialização, sem cópia. Os títulos são ordenados por
+    cronograma antes da divisão, para que cada processo monte poucos
+    cronogramas, e os resultados voltam como um único CashFlowBook na ordem
+    de entrada. O IPCA projetado de cada título segue nos próprios títulos
+    (faz parte da chave do cronograma).
+    """
+    if not bonds:
+        return CashFlowBook.from_cash_flows([])
+
+    # Títulos do mesmo cronograma ficam contíguos (e no mesmo processo, se couberem)
+    groups = {}
+    for position, bond in enumerate(bonds):
+        groups.setdefault(calc._schedule_key(bond), []).append(position)
+    order = np.array([position for positions in groups.values() for position in positions])
+    chunks = [chunk for chunk in np.array_split(order, workers) if len(chunk)]
+
+    arrays, state = _publish_calculator(
+        calc,
+        min(bond['emission_date'] for bond in bonds),
+        max(bond['maturity_date'] for bond in bonds),
+    )
+    shared = SharedArrays(arrays)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared.manifest, state)) as pool:
+            books = list(pool.map(_price_chunk, [[bonds[i] for i in chunk] for chunk in chunks]))
+    finally:
+        shared.close()
+
+    # Volta para a ordem de entrada
+    return CashFlowBook.concatenate(books).take(np.argsort(order))
@@ -0,0 +1,119 @@
+"""
+Cronogramas de pagamento pré-computados
+Cache LRU por (emissão, vencimento, frequência, carência, versão do calendário)
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Hashable, Tuple
+import threading
+
+import numpy as np
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+class PaymentSchedule:
+    """
+    Cronograma de pagamentos imutável
+
+    interest_dates: datas de pagamento de juros (já ajustadas para dia útil)
+    amort_dates: datas de amortização (após a carência)
+
+    Arrays somente leitura, um elemento por data de juros:
+    - dates: datas (datetime64[D])
+    - business_days / calendar_days: dias úteis / corridos desde o pagamento anterior
+    - cumulative_business_days: dias úteis desde a emissão
+    - amortizes: True nas datas de amortização
+    """
+
+    __slots__ = ('emission_date', 'interest_dates', 'amort_dates', 'dates', 'business_days',
+                 'calendar_days', 'cumulative_business_days', 'amortizes')
+
+    def __init__(self, emission_date: datetime, interest_dates, amort_dates, calendar):
+        interest_dates = tuple(interest_dates)
+        amort_dates = tuple(amort_dates)
+
+        emission = np.datetime64(emission_date.date())
+        dates = np.array([d.date() for d in interest_dates], dtype='datetime64[D]')
+        previous = np.concatenate(([emission], dates[:-1]))
+        business_days = calendar.count_business_days_batch(previous, dates).astype(np.int32)
+
+        amort_set = set(amort_dates)
+        object.__setattr__(self, 'emission_date', emission_date)
+        object.__setattr__(self, 'interest_dates', interest_dates)
+        object.__setattr__(self, 'amort_dates', amort_dates)
+        object.__setattr__(self, 'dates', _frozen(dates))
+        object.__setattr__(self, 'business_days', _frozen(business_days))
+        object.__setattr__(self, 'calendar_days', _frozen((dates - previous).astype(np.int32)))
+        object.__setattr__(self, 'cumulative_business_days', _frozen(np.cumsum(business_days, dtype=np.int32)))
+        object.__setattr__(self, 'amortizes', _frozen(np.array([d in amort_set for d in interest_dates], dtype=bool)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PaymentSchedule é imutável")
+
+    def __len__(self) -> int:
+        return len(self.interest_dates)
+
+    def __repr__(self) -> str:
+        return (f"PaymentSchedule(emissao={self.emission_date:%Y-%m-%d}, "
+                f"pagamentos={len(self)}, amortizacoes={len(self.amort_dates)})")
+
+
+class ScheduleCache:
+    """
+    Cache LRU em memória dos cronogramas, compartilhado pelo processo
+
+    Carteiras reais usam poucos cronogramas padrão: datas, ajuste para dia
+    útil e contagens de dias são calculados uma vez por chave.
+
+    max_size: número máximo de cronogramas mantidos em memória
+    """
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, build: Callable[[], PaymentSchedule]) -> PaymentSchedule:
+        """Retorna o cronograma da chave, construindo-o com build() se ausente"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Construção fora do lock (cronogramas iguais construídos em paralelo são equivalentes)
+        schedule = build()
+        with self._lock:
+            self._entries[key] = schedule
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return schedule
+
+    def clear(self):
+        """Esvazia o cache"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def schedule_key(emission_date: datetime, maturity_date: datetime, frequency: str,
+                 grace_period_months: int, calendar) -> Tuple:
+    """Chave do cronograma no cache"""
+    return emission_date, maturity_date, frequency, grace_period_months, calendar.version
+
+
+# Cache padrão do processo
+default_schedule_cache = ScheduleCache()
@@ -295,6 +295,11 @@ function displayMetrics(metrics) {
             <div class="metric-value">${metrics.modified_duration.toFixed(2)}</div>
             <div class="metric-subtitle">Sensibilidade Ã  taxa</div>
         </div>
+        <div class="metric-card">
+            <h4>Convexidade</h4>
+            <div class="metric-value">${metrics.convexity.toFixed(2)}</div>
+            <div class="metric-subtitle">Curvatura preco x taxa</div>
+        </div>
         <div class="metric-card">
             <h4>Payback Simples</h4>
             <div class="metric-value">${metrics.payback_simple_years ? metrics.payback_simple_years.toFixed(2) + ' anos' : 'N/A'}</div>
@@ -0,0 +1,144 @@
+import os
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+
+import holidays
+import numpy as np
+
+from business_calendar import BusinessCalendar, get_shared_calendar, load_anbima_calendar
+from debenture_calculator import DebentureCalculator
+
+
+def _count_loop(br_holidays, start_date, end_date):
+    count = 0
+    current = start_date
+    while current < end_date:
+        if current.weekday() < 5 and current not in br_holidays:
+            count += 1
+        current += timedelta(days=1)
+    return count
+
+
+class BusinessCalendarTest(unittest.TestCase):
+    def setUp(self):
+        self.br_holidays = holidays.Brazil(years=range(2020, 2050))
+        self.calendar = BusinessCalendar(self.br_holidays, 2020, 2049)
+
+    def test_count_matches_day_by_day_loop(self):
+        pairs = [
+            (datetime(2024, 1, 15), datetime(2025, 1, 15)),
+            (datetime(2025, 2, 28), datetime(2025, 3, 10)),   # carnaval
+            (datetime(2020, 1, 1), datetime(2049, 12, 31)),
+            (datetime(2025, 6, 1), datetime(2025, 6, 1)),
+            (datetime(2025, 6, 10), datetime(2025, 6, 1)),
+            (datetime(2025, 1, 15, 10, 0), datetime(2025, 1, 20, 12, 0)),
+            (datetime(2025, 1, 15, 12, 0), datetime(2025, 1, 20, 10, 0)),
+            (datetime(2019, 12, 1), datetime(2020, 2, 1)),     # fora da janela
+        ]
+        for start, end in pairs:
+            self.assertEqual(
+                self.calendar.count_business_days(start, end),
+                _count_loop(self.br_holidays, start, end),
+                msg=f"{start} -> {end}"
+            )
+
+    def test_next_business_day_and_is_business_day(self):
+        day = datetime(2024, 12, 20)
+        while day < datetime(2025, 3, 15):
+            expected = day
+            while expected.weekday() >= 5 or expected in self.br_holidays:
+                expected += timedelta(days=1)
+            self.assertEqual(self.calendar.next_business_day(day), expected)
+            self.assertEqual(self.calendar.is_business_day(day), expected == day)
+            day += timedelta(days=1)
+
+    def test_batch_matches_scalar(self):
+        starts = [datetime(2019, 12, 20), datetime(2024, 1, 15), datetime(2025, 3, 1),
+                  datetime(2025, 6, 10), datetime(2049, 12, 1)]
+        ends = [datetime(2020, 1, 10), datetime(2025, 1, 15), datetime(2025, 3, 8),
+                datetime(2025, 6, 1), datetime(2050, 1, 10)]
+
+        counts = self.calendar.count_business_days_batch(
+            np.array(starts, dtype='datetime64[D]'), np.array(ends, dtype='datetime64[D]')
+        )
+        expected = [self.calendar.count_business_days(s, e) for s, e in zip(starts, ends)]
+        self.assertEqual(counts.tolist(), expected)
+
+        rolled = self.calendar.roll_forward_batch(np.array(starts + ends, dtype='datetime64[D]'))
+        expected_dates = [np.datetime64(self.calendar.next_business_day(d).date()) for d in starts + ends]
+        self.assertEqual(rolled.tolist(), [d.astype(object) for d in expected_dates])
+
+    def test_calculators_share_one_calendar(self):
+        first = DebentureCalculator()
+        second = DebentureCalculator()
+        self.assertIs(first.calendar, second.calendar)
+        self.assertIs(first.calendar, get_shared_calendar())
+        self.assertFalse(first.calendar.cumulative.flags.writeable)
+
+    def test_years_are_materialized_on_demand(self):
+        calendar = BusinessCalendar(holidays.Brazil())
+        self.assertEqual(len(calendar.cumulative), 1)
+
+        start, end = datetime(2070, 3, 1), datetime(2070, 9, 1)
+        self.assertEqual(calendar.count_business_days(start, end),
+                         _count_loop(self.br_holidays, start, end))
+        # Um bloco: o ano pedido mais a folga à frente
+        self.assertEqual(calendar.start_ordinal, datetime(2070, 1, 1).toordinal())
+        self.assertEqual(calendar.end_ordinal, datetime(2081, 1, 1).toordinal())
+
+        # Anos seguintes já estão no bloco: o índice não é copiado de novo
+        cumulative = calendar.cumulative
+        for year in range(2071, 2081):
+            calendar.is_business_day(date(year, 6, 1))
+        self.assertIs(calendar.cumulative, cumulative)
+
+        # Emissão antiga: o índice é estendido para trás (com folga) e permanece contíguo
+        start, end = datetime(2015, 6, 1), datetime(2070, 9, 1)
+        self.assertEqual(calendar.count_business_days(start, end),
+                         _count_loop(self.br_holidays, start, end))
+        self.assertEqual(calendar.start_ordinal, datetime(2005, 1, 1).toordinal())
+        self.assertEqual(calendar.end_ordinal, datetime(2081, 1, 1).toordinal())
+        self.assertEqual(len(calendar.cumulative) - 1, calendar.end_ordinal - calendar.start_ordinal)
+
+
+class AnbimaCalendarFileTest(unittest.TestCase):
+    def test_compiled_calendar_is_memory_mapped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'feriados_nacionais.csv')
+            with open(source, 'w', encoding='utf-8') as f:
+                f.write("Data;Dia da Semana;Feriado\n")
+                f.write("01/01/2025;quarta-feira;Confraternização Universal\n")
+                f.write("03/03/2025;segunda-feira;Carnaval\n")
+                f.write("04/03/2025;terça-feira;Carnaval\n")
+                f.write("2026-12-25;sexta-feira;Natal\n")
+                f.write("Fonte: ANBIMA\n")
+
+            calendar = load_anbima_calendar(source)
+            self.assertTrue(os.path.exists(os.path.join(tmp, 'feriados_nacionais.npy')))
+            self.assertIsInstance(calendar.cumulative, np.memmap)
+
+            self.assertFalse(calendar.is_business_day(date(2025, 3, 4)))
+            self.assertTrue(calendar.is_business_day(date(2025, 3, 5)))
+            self.assertEqual(calendar.next_business_day(date(2025, 3, 1)), date(2025, 3, 5))
+            # Semana do carnaval: 5 dias úteis menos 2 feriados
+            self.assertEqual(calendar.count_business_days(date(2025, 3, 3), date(2025, 3, 10)), 3)
+            self.assertEqual(calendar.count_business_days(date(2025, 1, 1), date(2027, 1, 1)), 518)
+            del calendar
+
+    def test_save_replaces_compiled_file_atomically(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = BusinessCalendar(holidays.Brazil(), 2025, 2025).save(os.path.join(tmp, 'anbima'))
+            self.assertEqual(path, os.path.join(tmp, 'anbima.npy'))
+            mapped = BusinessCalendar.from_compiled(path)
+
+            # Regravação com o arquivo aberto: o mapa antigo segue íntegro, o novo vê a janela nova
+            self.assertEqual(BusinessCalendar(holidays.Brazil(), 2025, 2026).save(path), path)
+            self.assertEqual(os.listdir(tmp), ['anbima.npy'])
+            self.assertEqual(mapped.end_ordinal, date(2026, 1, 1).toordinal())
+            self.assertEqual(BusinessCalendar.from_compiled(path).end_ordinal, date(2027, 1, 1).toordinal())
+            del mapped
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from datetime import datetime
+
+from cash_flow import CashFlow
+from debenture_calculator import DebentureCalculator
+
+
+class CashFlowTest(unittest.TestCase):
+    def setUp(self):
+        self.calc = DebentureCalculator()
+        self.emission_date = datetime(2025, 1, 15)
+        self.cash_flow = self.calc.generate_cash_flow(
+            emission_date=self.emission_date, maturity_date=datetime(2028, 1, 15), vne=1000.0,
+            cdi_rate_annual=0.0, spread_annual=6.0, interest_frequency='semestral',
+            amort_type='sac', grace_period_months=12, indexador='IPCA', ipca_projected_annual=4.5
+        )
+
+    def test_row_access_matches_columns(self):
+        cash_flow = self.cash_flow
+        self.assertIsInstance(cash_flow, CashFlow)
+        self.assertEqual(len(cash_flow), 6)
+
+        last = cash_flow[-1]
+        self.assertEqual(last['evento'], 6)
+        self.assertIsInstance(last['data'], datetime)
+        self.assertEqual(last['pmt'], float(cash_flow.pmt[-1]))
+        self.assertIsNone(last['taxa_cdi_efetiva'])
+        self.assertEqual(last['taxa_real_efetiva'], 6.0)
+        self.assertIsNone(last['vertice_dias_uteis'])
+        self.assertIn('ipca_acumulado', last)
+
+        head = cash_flow[2:4]
+        self.assertEqual([row['evento'] for row in head], [3, 4])
+        with self.assertRaises(IndexError):
+            cash_flow[6]
+        with self.assertRaises(ValueError):
+            cash_flow.pmt[0] = 0.0
+
+    def test_rows_round_trip(self):
+        rows = [dict(row) for row in self.cash_flow]
+        rebuilt = CashFlow.from_rows(rows)
+        self.assertEqual(self.calc.cash_flow_to_json(rebuilt), self.calc.cash_flow_to_json(self.cash_flow))
+        self.assertEqual(self.calc.cash_flow_to_json(self.cash_flow)[0]['data'], rows[0]['data'].strftime('%Y-%m-%d'))
+
+        # Métricas aceitam tanto o CashFlow quanto a lista de dicionários
+        self.assertEqual(
+            self.calc.calculate_metrics(rows, self.emission_date, 1000.0, 0.0, 6.0),
+            self.calc.calculate_metrics(self.cash_flow, self.emission_date, 1000.0, 0.0, 6.0)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,291 @@
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from curve_store import CurveCache, CurveStore
+from curves import Curve, SvenssonCurve
+from debenture_calculator import DebentureCalculator
+
+
+def _fake_ettj_anbima(date_str):
+    """Resposta no formato de pyettj.get_ettj_anbima (strings no padrão ANBIMA)"""
+    parameters = pd.DataFrame(
+        {'Grupo': ['PREFIXADOS', 'IPCA'],
+         'B1': ['0,1400', '0,0650'], 'B2': ['-0,0100', '-0,0200'],
+         'B3': ['0,0200', '0,0100'], 'B4': ['-0,0100', '0,0050'],
+         'L1': ['1,5000', '0,8000'], 'L2': ['0,3000', '0,2000']}
+    ).set_index('Grupo')
+    ettj = pd.DataFrame({
+        'Vertice': ['126', '252', '504', '1.008', '2.520'],
+        'IPCA': ['', '6,8000', '6,9000', '7,0000', '7,1000'],
+        'Prefixados': ['14,5000', '14,2000', '13,8000', '13,5000', '13,4000'],
+        'Inflação Implícita': ['', '6,9000', '6,4000', '6,1000', '5,9000'],
+    })
+    return parameters, ettj, pd.DataFrame(), pd.DataFrame()
+
+
+class CurveStoreTest(unittest.TestCase):
+    def test_past_curve_is_fetched_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = CurveStore(tmp)
+            reference_date = datetime(2025, 3, 12)
+
+            with mock.patch('curve_store.get_ettj_anbima', side_effect=_fake_ettj_anbima) as fetch:
+                first = store.fetch(reference_date)
+                second = store.fetch(reference_date)
+                self.assertEqual(fetch.call_count, 1)
+
+            np.testing.assert_array_equal(first['pre'][0], [126, 252, 504, 1008, 2520])
+            np.testing.assert_array_equal(second['pre'][1], first['pre'][1])
+            np.testing.assert_array_equal(second['ipca'][0], [252, 504, 1008, 2520])
+            np.testing.assert_allclose(second['parameters']['PREFIXADOS'],
+                                       [0.14, -0.01, 0.02, -0.01, 1.5, 0.3])
+
+    def test_weekend_without_publication_is_remembered(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = CurveStore(tmp)
+            saturday = datetime(2025, 3, 15)
+
+            with mock.patch('curve_store.get_ettj_anbima', side_effect=ValueError("Sem dados")) as fetch:
+                for _ in range(2):
+                    with self.assertRaises(ValueError):
+                        store.fetch(saturday)
+                self.assertEqual(fetch.call_count, 1)
+
+
+class CurveCacheTest(unittest.TestCase):
+    def test_concurrent_requests_share_one_fetch(self):
+        calls = []
+
+        def slow_fetch(reference_date):
+            calls.append(reference_date)
+            time.sleep(0.05)
+            return {'reference_date': reference_date, 'parameters': {},
+                    'pre': (np.array([252]), np.array([14.2])), 'ipca': None}
+
+        store = mock.Mock(fetch=slow_fetch)
+        cache = CurveCache(store, max_size=2)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.fetch(datetime(2025, 3, 12))))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result is results[0] for result in results))
+
+        # LRU: a data mais antiga sai quando o limite é excedido
+        cache.fetch(datetime(2025, 3, 13))
+        cache.fetch(datetime(2025, 3, 14))
+        cache.fetch(datetime(2025, 3, 12))
+        self.assertEqual(len(calls), 4)
+
+    def test_today_curve_expires(self):
+        calls = []
+        store = mock.Mock(fetch=lambda d: calls.append(d) or {'reference_date': d, 'pre': None, 'ipca': None})
+        cache = CurveCache(store, today_ttl=60)
+        today = datetime.now()
+
+        with mock.patch('curve_store.time.monotonic', return_value=1000.0):
+            cache.fetch(today)
+            cache.fetch(today)
+        self.assertEqual(len(calls), 1)
+
+        # Após a validade, a curva do dia é buscada novamente (pode ter sido republicada)
+        with mock.patch('curve_store.time.monotonic', return_value=1061.0):
+            cache.fetch(today)
+        self.assertEqual(len(calls), 2)
+
+
+class LoadCurvesTest(unittest.TestCase):
+    def test_one_download_feeds_both_curves(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = CurveCache(CurveStore(tmp))
+            calc = DebentureCalculator()
+
+            with mock.patch('debenture_calculator.default_curve_cache', cache), \
+                    mock.patch('curve_store.get_ettj_anbima', side_effect=_fake_ettj_anbima) as fetch:
+                di_loaded, ipca_loaded = calc.load_curves(datetime(2025, 3, 12))
+                self.assertEqual(fetch.call_count, 1)
+
+            self.assertTrue(di_loaded and ipca_loaded)
+            self.assertEqual(calc.di_curve['dias_uteis'].tolist(), [126, 252, 504, 1008, 2520])
+            self.assertEqual(calc.ipca_curve['taxa_real'].tolist(), [6.8, 6.9, 7.0, 7.1])
+            self.assertEqual(sorted(calc.svensson_parameters), ['IPCA', 'PREFIXADOS'])
+
+    def _load_with_missing(self, missing):
+        """load_curves com a ETTJ sem as colunas missing[data] em cada data (dd/mm/aaaa)"""
+        def fake(date_str):
+            parameters, ettj, a, b = _fake_ettj_anbima(date_str)
+            ettj = ettj.drop(columns=missing.get(date_str, []))
+            return parameters, ettj, a, b
+
+        with tempfile.TemporaryDirectory() as tmp:
+            calc = DebentureCalculator()
+            with mock.patch('debenture_calculator.default_curve_cache', CurveCache(CurveStore(tmp))), \
+                    mock.patch('curve_store.get_ettj_anbima', side_effect=fake):
+                return calc, calc.load_curves(datetime(2025, 3, 12))
+
+    def test_walks_back_to_a_date_with_both_curves(self):
+        # 12/03 só tem PRE: as duas curvas vêm de 11/03
+        calc, loaded = self._load_with_missing({'12/03/2025': ['IPCA']})
+        self.assertEqual(loaded, (True, True))
+        self.assertEqual(calc.di_curve['taxa'].tolist(), [14.5, 14.2, 13.8, 13.5, 13.4])
+
+    def test_falls_back_to_each_curve(self):
+        # Nenhuma data com PRE: a curva NTN-B ainda é carregada
+        missing = {f'{day:02d}/03/2025': ['Prefixados'] for day in range(1, 13)}
+        calc, loaded = self._load_with_missing(missing)
+        self.assertEqual(loaded, (False, True))
+        self.assertIsNone(calc.di_curve)
+        self.assertEqual(calc.ipca_curve['taxa_real'].tolist(), [6.8, 6.9, 7.0, 7.1])
+
+
+class CurveTest(unittest.TestCase):
+    def setUp(self):
+        self.vertices = np.array([21, 126, 252, 504, 1008, 2520])
+        self.rates = np.array([14.9, 14.6, 14.2, 13.8, 13.5, 13.4])
+        self.curve = Curve(self.vertices, self.rates)
+
+    def test_batch_matches_scalar_interpolation(self):
+        du = np.array([1, 21, 60, 252, 700, 2520, 5000])
+        expected = []
+        for d in du:
+            if d <= self.vertices[0]:
+                expected.append(self.rates[0])
+            elif d >= self.vertices[-1]:
+                expected.append(self.rates[-1])
+            else:
+                expected.append(np.interp(d, self.vertices, self.rates))
+        np.testing.assert_allclose(self.curve.rate_at(du), expected)
+
+        nearest = [self.vertices[np.abs(self.vertices - d).argmin()] for d in du]
+        np.testing.assert_array_equal(self.curve.nearest_vertex(du), nearest)
+
+    def test_forward_rates_rebuild_discount_factors(self):
+        du = np.array([0, 21, 126, 300, 1000])
+        forwards = self.curve.forward_rate(du[:-1], du[1:])
+        growth = np.prod((1 + forwards / 100) ** (np.diff(du) / 252))
+        self.assertAlmostEqual(growth, 1 / self.curve.discount_factor(1000), places=10)
+
+    def test_dense_grid_matches_interpolation(self):
+        spot, discount, forward = self.curve.dense_grid
+        self.assertEqual(len(spot), 2521)
+
+        du = np.arange(0, 2521, 7)
+        np.testing.assert_allclose(self.curve.rate_at(du), self.curve.rate_at(du.astype(float)), rtol=1e-14)
+        np.testing.assert_allclose(self.curve.discount_factor(du),
+                                   self.curve.discount_factor(du.astype(float)), rtol=1e-14)
+        # Fatores a termo de 1 dia acumulados reconstroem o desconto
+        np.testing.assert_allclose(np.cumprod(forward[1:]), 1 / discount[1:], rtol=1e-10)
+        # Prazos além da grade continuam com extrapolação flat
+        self.assertAlmostEqual(self.curve.rate_at(4000), 13.4)
+
+    def test_calculator_uses_curve_arrays(self):
+        calc = DebentureCalculator()
+        calc.di_curve = pd.DataFrame({'dias_uteis': self.vertices, 'taxa': self.rates})
+        rate, du = calc.get_cdi_rate_from_curve(datetime(2026, 3, 12), datetime(2025, 3, 12))
+        self.assertEqual(du, calc.count_business_days(datetime(2025, 3, 12), datetime(2026, 3, 12)))
+        self.assertAlmostEqual(rate, float(np.interp(du, self.vertices, self.rates)))
+
+    def test_forward_projection_compounds_to_curve_discount(self):
+        calc = DebentureCalculator()
+        calc.di_curve = pd.DataFrame({'dias_uteis': self.vertices, 'taxa': self.rates})
+        emission_date = datetime(2025, 3, 12)
+
+        cash_flow = calc.generate_cash_flow(
+            emission_date=emission_date, maturity_date=datetime(2028, 3, 12), vne=1000.0,
+            cdi_rate_annual=0.0, spread_annual=0.0, interest_frequency='semestral',
+            amort_type='bullet', cdi_projection='forward'
+        )
+
+        growth = np.prod([1 + row['juros'] / 1000.0 for row in cash_flow])
+        total_du = cash_flow[-1]['vertice_dias_uteis']
+        self.assertEqual(total_du, sum(row['dias_uteis'] for row in cash_flow))
+        self.assertAlmostEqual(growth, 1 / calc.pre_curve.discount_factor(total_du), places=10)
+
+        with self.assertRaises(ValueError):
+            calc.generate_cash_flow(emission_date=emission_date, maturity_date=datetime(2026, 3, 12),
+                                    vne=1000.0, cdi_rate_annual=0.0, spread_annual=0.0,
+                                    interest_frequency='anual', amort_type='bullet',
+                                    cdi_projection='implicit')
+
+    def test_implied_inflation_curve_matches_pointwise_formula(self):
+        calc = DebentureCalculator()
+        calc.di_curve = pd.DataFrame({'dias_uteis': self.vertices, 'taxa': self.rates})
+        real_vertices = np.array([252, 504, 1008, 2520, 5040])
+        real_rates = np.array([6.8, 6.9, 7.0, 7.1, 7.2])
+        calc.ipca_curve = pd.DataFrame({'dias_uteis': real_vertices, 'taxa_real': real_rates})
+
+        implied = calc.implied_inflation_curve
+        self.assertIs(implied, calc.implied_inflation_curve)
+
+        du = np.array([5, 252, 777, 2520, 4000, 6000])
+        taxa_pre = np.interp(du, self.vertices, self.rates)
+        taxa_real = np.interp(du, real_vertices, real_rates)
+        annual = ((1 + taxa_pre / 100) / (1 + taxa_real / 100) - 1) * 100
+        monthly = ((1 + annual / 100) ** (1 / 12) - 1) * 100
+        np.testing.assert_allclose(implied.monthly_rate_at(du), monthly, rtol=1e-12)
+
+        ipca_monthly, vertice = calc.get_ipca_implicit_from_curve(datetime(2027, 3, 12), datetime(2025, 3, 12))
+        du_payment = calc.count_business_days(datetime(2025, 3, 12), datetime(2027, 3, 12))
+        self.assertAlmostEqual(ipca_monthly, float(implied.monthly_rate_at(du_payment)))
+        self.assertEqual(vertice, 504)
+
+        # Trocar uma das curvas invalida a curva implícita
+        calc.ipca_curve = None
+        self.assertIsNone(calc.implied_inflation_curve)
+
+    def test_bumped_rates_stack_matches_rebuilt_curves(self):
+        du = np.array([[0, 60, 252], [700, 2520, 4000]])
+        stacked = self.curve.bumped_rates(du, 0.01)
+        self.assertEqual(stacked.shape, (2 + len(self.vertices),) + du.shape)
+        np.testing.assert_allclose(stacked[0], self.curve.rate_at(du))
+        np.testing.assert_allclose(stacked[1], self.curve.rate_at(du) + 0.01)
+        for j in range(len(self.vertices)):
+            bumped = Curve(self.vertices, self.rates + 0.01 * np.eye(len(self.vertices))[j])
+            np.testing.assert_allclose(stacked[2 + j], bumped.rate_at(du), rtol=1e-14)
+
+
+class SvenssonCurveTest(unittest.TestCase):
+    def test_matches_scalar_formula(self):
+        parameters = [0.1400, -0.0100, 0.0200, -0.0100, 1.5000, 0.3000]
+        curve = SvenssonCurve(parameters)
+
+        def svensson(t):
+            b1, b2, b3, b4, l1, l2 = parameters
+            e1, e2 = np.exp(-l1 * t), np.exp(-l2 * t)
+            return (b1 + b2 * (1 - e1) / (l1 * t) + b3 * ((1 - e1) / (l1 * t) - e1)
+                    + b4 * ((1 - e2) / (l2 * t) - e2)) * 100
+
+        du = np.array([1, 21, 252, 1000, 5040])
+        np.testing.assert_allclose(curve.rate_at(du), [svensson(d / 252) for d in du])
+        # Limite no prazo zero: beta1 + beta2
+        self.assertAlmostEqual(curve.rate_at(0), 13.0)
+
+    def test_calculator_switches_interpolation_mode(self):
+        calc = DebentureCalculator()
+        calc.svensson_parameters = {'PREFIXADOS': np.array([0.14, -0.01, 0.02, -0.01, 1.5, 0.3])}
+        calc.di_curve = pd.DataFrame({'dias_uteis': [252, 504], 'taxa': [14.2, 13.8]})
+        self.assertNotIsInstance(calc.pre_curve, SvenssonCurve)
+
+        calc.set_curve_interpolation('svensson')
+        self.assertIsInstance(calc.pre_curve, SvenssonCurve)
+        rate, du = calc.get_cdi_rate_from_curve(datetime(2026, 3, 12), datetime(2025, 3, 12))
+        self.assertAlmostEqual(rate, calc.pre_curve.rate_at(du))
+
+        with self.assertRaises(ValueError):
+            calc.set_curve_interpolation('cubic')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from debenture_calculator import DebentureCalculator
+from ipca_index import IPCAIndex
+
+
+def _dates(*values):
+    return np.array([d.date() for d in values], dtype='datetime64[D]')
+
+
+class IPCAIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.calc = DebentureCalculator()
+        self.calc.ipca_custom_indices = {'2025-01': 100.0, '2025-02': 101.0, '2025-03': 101.5}
+
+    def test_batch_matches_scalar(self):
+        base = [datetime(2024, 11, 20), datetime(2025, 1, 15), datetime(2025, 2, 3)]
+        current = [datetime(2025, 2, 10), datetime(2025, 3, 17), datetime(2025, 7, 28)]
+        rates = np.array([0.3, 0.4, 0.5])
+
+        factors, accumulated = self.calc.ipca_index.update_factors(
+            _dates(*base), _dates(*current), 15, rates, self.calc.calendar
+        )
+        for i in range(len(base)):
+            vna, acc = self.calc.calculate_vna(1000.0, base[i], current[i], 15, rates[i])
+            self.assertAlmostEqual(vna, 1000.0 * factors[i], places=9)
+            self.assertAlmostEqual(acc, accumulated[i], places=9)
+
+    def test_factors_compose_across_periods(self):
+        a, b, c = datetime(2025, 1, 20), datetime(2025, 3, 3), datetime(2025, 6, 9)
+        ab, _ = self.calc.calculate_vna(1.0, a, b, 15, 0.4)
+        bc, _ = self.calc.calculate_vna(1.0, b, c, 15, 0.4)
+        ac, _ = self.calc.calculate_vna(1.0, a, c, 15, 0.4)
+        self.assertAlmostEqual(ab * bc, ac, places=12)
+
+    def test_custom_and_projected_months(self):
+        # Jan->Fev e Fev->Mar pelos índices; Mar->Abr pela taxa projetada
+        vna, _ = self.calc.calculate_vna(1000.0, datetime(2025, 1, 15), datetime(2025, 4, 15), 15, 0.5)
+        self.assertAlmostEqual(vna, 1000.0 * 101.5 / 100.0 * 1.005, places=9)
+
+    def test_hand_computed_vna_off_anniversary(self):
+        # Emissão em 20/01/2025, aniversário dia 15, 0,5% a.m. projetado, sem índices NI:
+        # - base: 3 de 23 du entre 15/01 e 15/02 já decorridos
+        # - 10/06: 4 meses cheios (15/01 -> 15/05) + 18 de 22 du entre 15/05 e 15/06
+        calc = DebentureCalculator()
+        vna, accumulated = calc.calculate_vna(1000.0, datetime(2025, 1, 20), datetime(2025, 6, 10), 15, 0.5)
+        factor = 1.005 ** (4 + 18 / 22 - 3 / 23)
+        self.assertAlmostEqual(vna, 1000.0 * factor, places=9)
+        # IPCA acumulado composto, não somado
+        self.assertAlmostEqual(accumulated, (factor - 1) * 100, places=9)
+
+        # Reset no meio do caminho (20/03): mesmo VNA, acumulados compostos
+        first, first_acc = calc.calculate_vna(1000.0, datetime(2025, 1, 20), datetime(2025, 3, 20), 15, 0.5)
+        second, second_acc = calc.calculate_vna(first, datetime(2025, 3, 20), datetime(2025, 6, 10), 15, 0.5)
+        self.assertAlmostEqual(second, vna, places=9)
+        self.assertAlmostEqual((1 + first_acc / 100) * (1 + second_acc / 100), factor, places=12)
+
+    def test_anniversary_clamped_in_short_months(self):
+        index = IPCAIndex()
+        factor, _ = index.update_factors(_dates(datetime(2025, 1, 31)), _dates(datetime(2025, 3, 31)),
+                                         31, 1.0, self.calc.calendar)
+        self.assertAlmostEqual(factor[0], 1.01 ** 2, places=12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from debenture_calculator import DebentureCalculator
+from ipca_store import IPCAIndexStore, parse_index_csv
+
+
+CSV = "mes;indice\n2024-12;7000,00\n2025-01;7.011,20\n202502;7100.5\n2025/3;7120,75\n"
+
+
+class IPCAIndexStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'ipca_ni.npz')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_parse_csv(self):
+        self.assertEqual(parse_index_csv(CSV), {
+            '2024-12': 7000.0, '2025-01': 7011.2, '2025-02': 7100.5, '2025-03': 7120.75
+        })
+        self.assertEqual(parse_index_csv("2025-01,7011.2\n2025-02,7100.5"), {'2025-01': 7011.2, '2025-02': 7100.5})
+        # ':' não é separador: linhas com horário não viram índices
+        self.assertEqual(parse_index_csv("2025-01 10:30\n2025-02:7100.5"), {})
+
+    def test_update_versions_and_persists(self):
+        store = IPCAIndexStore(self.path)
+        self.assertEqual(store.version, 0)
+
+        store.update(parse_index_csv(CSV))
+        info = store.update({'2025-03': 7125.0, '2025-04': 7140.0})
+        self.assertEqual(info['version'], 2)
+        self.assertEqual((info['count'], info['first_month'], info['last_month']), (5, '2024-12', '2025-04'))
+
+        reloaded = IPCAIndexStore(self.path)
+        self.assertEqual(reloaded.version, 2)
+        self.assertEqual(reloaded.index().indices['2025-03'], 7125.0)
+        self.assertIs(reloaded.index(), reloaded.index())
+
+        info = reloaded.update({'2025-05': 7150.0}, replace=True)
+        self.assertEqual((info['version'], info['count']), (3, 1))
+
+    def test_stored_index_matches_sent_indices(self):
+        store = IPCAIndexStore(self.path)
+        store.update(parse_index_csv(CSV))
+
+        params = dict(
+            emission_date=datetime(2024, 12, 16), maturity_date=datetime(2025, 6, 16), vne=1000.0,
+            cdi_rate_annual=0.0, spread_annual=5.0, interest_frequency='mensal', amort_type='bullet',
+            indexador='IPCA', ipca_projected_annual=4.5
+        )
+        sent = DebentureCalculator().generate_cash_flow(ipca_custom_indices=parse_index_csv(CSV), **params)
+        stored = DebentureCalculator().generate_cash_flow(ipca_custom_indices=store.index(), **params)
+        self.assertEqual(list(stored.pmt), list(sent.pmt))
+
+
+if __name__ == '__main__':
+    unittest.main()
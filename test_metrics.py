@@ -0,0 +1,207 @@
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from debenture_calculator import DebentureCalculator
+from metrics import cash_flow_metrics, solve_irr
+
+_VERTICES = [21, 126, 252, 504, 1008, 2520]
+
+
+def _curve_calculator(pre_rates=(14.9, 14.6, 14.2, 13.8, 13.5, 13.4)):
+    calc = DebentureCalculator()
+    calc.di_curve = pd.DataFrame({'dias_uteis': _VERTICES, 'taxa': list(pre_rates)})
+    calc.ipca_curve = pd.DataFrame({'dias_uteis': [252, 504, 1008, 2520],
+                                    'taxa_real': [6.8, 6.9, 7.0, 7.1]})
+    return calc
+
+
+class MetricsKernelTest(unittest.TestCase):
+    def setUp(self):
+        self.calc = DebentureCalculator()
+        self.emission_date = datetime(2025, 1, 15)
+        self.cash_flow = self.calc.generate_cash_flow(
+            emission_date=self.emission_date, maturity_date=datetime(2030, 1, 15), vne=1000.0,
+            cdi_rate_annual=10.0, spread_annual=2.0, interest_frequency='semestral', amort_type='sac',
+            grace_period_months=12
+        )
+        self.years = self.calc._years_from_emission(self.cash_flow, self.emission_date)
+
+    def test_matches_row_by_row_definitions(self):
+        metrics = self.calc.calculate_metrics(self.cash_flow, self.emission_date, 1000.0, 10.0, 2.0)
+
+        pv = [row['pmt'] / 1.12 ** t for row, t in zip(self.cash_flow, self.years)]
+        duration = sum(v * t for v, t in zip(pv, self.years)) / sum(pv)
+        self.assertAlmostEqual(metrics['duration_years'], duration, places=10)
+        self.assertAlmostEqual(metrics['modified_duration'], duration / 1.12, places=10)
+        self.assertAlmostEqual(metrics['total_pmt'], sum(row['pmt'] for row in self.cash_flow), places=8)
+
+        accumulated, payback = 0.0, None
+        for row, t in zip(self.cash_flow, self.years):
+            accumulated += row['pmt']
+            if accumulated >= 1000.0:
+                payback = t
+                break
+        self.assertEqual(metrics['payback_simple_years'], payback)
+
+    def test_convexity_matches_price_curvature(self):
+        def price(rate):
+            return float(np.sum(self.cash_flow.pmt / (1 + rate) ** self.years))
+
+        step = 1e-4
+        curvature = (price(0.12 + step) - 2 * price(0.12) + price(0.12 - step)) / (step ** 2 * price(0.12))
+        metrics = self.calc.calculate_metrics(self.cash_flow, self.emission_date, 1000.0, 10.0, 2.0)
+        self.assertAlmostEqual(metrics['convexity'], curvature, places=3)
+
+    def test_batch_matches_single(self):
+        pmt = np.stack([self.cash_flow.pmt, 2 * self.cash_flow.pmt])
+        batch = cash_flow_metrics(self.years, pmt, pmt, pmt, [1000.0, 5000.0], [0.12, 0.08])
+        single = cash_flow_metrics(self.years, pmt[1], pmt[1], pmt[1], 5000.0, 0.08)
+        for key, value in single.items():
+            np.testing.assert_allclose(batch[key][1], value, rtol=1e-13, err_msg=key)
+        self.assertTrue(np.isnan(batch['payback_discounted_years'][1]))
+
+
+class IRRSolverTest(unittest.TestCase):
+    def test_known_rates(self):
+        times = np.array([0.5, 1.0, 1.5, 2.0])
+        coupon = np.array([50.0, 50.0, 50.0, 1050.0])
+        self.assertAlmostEqual(float(solve_irr(times, coupon, 1000.0)), 1.05 ** 2 - 1, places=12)
+        # Taxa alta, longe do chute inicial; sem fluxo não há TIR
+        rates = solve_irr([1.0], np.array([[1000.0], [0.0]]), [100.0, 100.0])
+        self.assertAlmostEqual(rates[0], 9.0, places=10)
+        self.assertTrue(np.isnan(rates[1]))
+        self.assertAlmostEqual(float(solve_irr(times, coupon, 1000.0, guess=50.0)), 1.05 ** 2 - 1, places=12)
+
+    def test_irr_on_business_day_time(self):
+        calc = DebentureCalculator()
+        emission_date = datetime(2025, 1, 15)
+        cash_flows = [
+            calc.generate_cash_flow(emission_date, datetime(2028, 1, 17), 1000.0, 10.0, spread, 'semestral', 'sac')
+            for spread in (1.0, 2.0)
+        ] + [calc.generate_cash_flow(emission_date, datetime(2026, 1, 15), 500.0, 10.0, 1.5, 'mensal', 'price')]
+
+        # Taxa fixa: TIR = (1 + CDI)(1 + spread) - 1, qualquer que seja o período
+        irr = calc.calculate_irr(cash_flows[1], 1000.0, emission_date)
+        self.assertAlmostEqual(irr, (1.10 * 1.02 - 1) * 100, places=6)
+
+        batch = calc.calculate_irr_batch(cash_flows, [1000.0, 1000.0, 500.0])
+        for cash_flow, vne, value in zip(cash_flows, [1000.0, 1000.0, 500.0], batch):
+            self.assertAlmostEqual(value, calc.calculate_irr(cash_flow, vne, emission_date), places=9)
+
+
+class PriceYieldTest(unittest.TestCase):
+    def setUp(self):
+        self.calc = DebentureCalculator()
+        self.emission_date = datetime(2025, 1, 15)
+        self.cash_flow = self.calc.generate_cash_flow(
+            self.emission_date, datetime(2028, 1, 17), 1000.0, 10.0, 2.0, 'semestral', 'sac'
+        )
+
+    def test_price_and_yield_are_inverse(self):
+        # Taxa fixa CDI + spread: a própria taxa do título leva o PU ao VNE
+        self.assertAlmostEqual(self.calc.price_from_yield(self.cash_flow, 12.2), 1000.0, places=6)
+
+        yields = np.array([9.0, 12.2, 15.0])
+        prices = self.calc.price_from_yield(self.cash_flow, yields)
+        self.assertEqual(prices.shape, (3,))
+        self.assertTrue(np.all(np.diff(prices) < 0))
+        np.testing.assert_allclose(self.calc.yield_from_price(self.cash_flow, prices), yields, rtol=1e-10)
+
+    def test_settlement_discounts_remaining_flows(self):
+        settlement = datetime(2025, 9, 1)
+        price = self.calc.price_from_yield(self.cash_flow, 12.2, settlement_date=settlement)
+        expected = sum(
+            row['pmt'] / 1.122 ** (self.calc.count_business_days(settlement, row['data']) / 252)
+            for row in self.cash_flow if row['data'] > settlement
+        )
+        self.assertAlmostEqual(price, expected, places=9)
+
+    def test_book_of_bonds(self):
+        bond = dict(emission_date=self.emission_date, maturity_date=datetime(2027, 1, 15), vne=1000.0,
+                    cdi_rate_annual=10.0, spread_annual=1.0, interest_frequency='semestral', amort_type='bullet')
+        yields = np.array([[11.0, 12.0], [12.0, 13.0]])
+
+        prices = self.calc.price_from_yield([bond, self.cash_flow], yields)
+        self.assertEqual(prices.shape, (2, 2))
+        self.assertAlmostEqual(prices[1, 1], self.calc.price_from_yield(self.cash_flow, 13.0), places=9)
+        np.testing.assert_allclose(self.calc.yield_from_price([bond, self.cash_flow], prices), yields, rtol=1e-10)
+
+        with self.assertRaises(ValueError):
+            self.calc.price_from_yield([bond, self.cash_flow], [11.0, 12.0, 13.0])
+
+
+class KeyRateTest(unittest.TestCase):
+    def setUp(self):
+        self.calc = _curve_calculator()
+        self.params = dict(emission_date=datetime(2025, 1, 15), maturity_date=datetime(2030, 1, 15), vne=1000.0,
+                           cdi_rate_annual=0.0, interest_frequency='semestral', amort_type='sac')
+
+    def test_key_rates_match_bumped_curve_repricing(self):
+        # Taxa fixa (fluxo gerado sem curva): só o desconto depende da curva
+        cash_flow = DebentureCalculator().generate_cash_flow(spread_annual=12.0, **self.params)
+        result = self.calc.key_rate_dv01(cash_flow, 'pre')
+        self.assertEqual(result['key_rate_dv01'].shape, (len(self.calc.pre_curve),))
+
+        du = np.cumsum(cash_flow.dias_uteis)
+        base_pv = np.sum(cash_flow.pmt * self.calc.pre_curve.discount_factor(du))
+        self.assertAlmostEqual(result['pv'], base_pv, places=9)
+
+        vertices, rates = self.calc.pre_curve.vertices, self.calc.pre_curve.rates
+        for j in (2, 3):
+            bumped = self.calc.pre_curve.__class__(vertices, rates + 0.01 * np.eye(len(vertices))[j])
+            expected = base_pv - np.sum(cash_flow.pmt * bumped.discount_factor(du))
+            self.assertAlmostEqual(result['key_rate_dv01'][j], expected, places=9)
+        # Soma dos key rates ~ DV01 paralelo
+        self.assertAlmostEqual(result['key_rate_dv01'].sum(), result['dv01'], delta=1e-3 * result['dv01'])
+
+    def test_cdi_floater_is_reprojected(self):
+        # CDI+ sem spread projetado a termo pela própria curva: PU = VNE e DV01 ~ 0
+        cash_flow = self.calc.generate_cash_flow(spread_annual=0.0, cdi_projection='forward', **self.params)
+        result = self.calc.key_rate_dv01(cash_flow, 'pre')
+        self.assertAlmostEqual(result['pv'], 1000.0, places=6)
+        self.assertAlmostEqual(result['dv01'], 0.0, places=6)
+        np.testing.assert_allclose(result['key_rate_dv01'], 0.0, atol=1e-6)
+
+        # Com spread, só o spread reage ao choque: DV01 bem menor que o de um prefixado
+        floater = self.calc.key_rate_dv01(
+            self.calc.generate_cash_flow(spread_annual=2.0, cdi_projection='forward', **self.params), 'pre')
+        fixed = self.calc.key_rate_dv01(
+            DebentureCalculator().generate_cash_flow(spread_annual=16.0, **self.params), 'pre')
+        self.assertGreater(floater['dv01'], 0.0)
+        self.assertLess(floater['dv01'], 0.2 * fixed['dv01'])
+
+    def test_spot_floater_on_flat_curve(self):
+        # Curva flat: spot = termo, o modo vem do próprio fluxo (não das taxas)
+        flat = [13.0] * len(_VERTICES)
+        calc = _curve_calculator(flat)
+        cash_flow = calc.generate_cash_flow(spread_annual=1.0, **self.params)
+        self.assertEqual(cash_flow.cdi_projection, 'spot')
+        result = calc.key_rate_dv01(cash_flow, 'pre')
+
+        du = np.cumsum(cash_flow.dias_uteis)
+        base_pv = np.sum(cash_flow.pmt * calc.pre_curve.discount_factor(du))
+        self.assertAlmostEqual(result['pv'], base_pv, places=9)
+
+        # Cada key rate = reprecificação com a curva remontada (CDI reprojetado e desconto)
+        for j in range(len(_VERTICES)):
+            bumped = _curve_calculator(np.array(flat) + 0.01 * np.eye(len(_VERTICES))[j])
+            repriced = bumped.generate_cash_flow(spread_annual=1.0, **self.params)
+            expected = base_pv - np.sum(repriced.pmt * bumped.pre_curve.discount_factor(du))
+            self.assertAlmostEqual(result['key_rate_dv01'][j], expected, delta=1e-6, msg=f"vértice {j}")
+
+    def test_book_and_real_curve(self):
+        bonds = [dict(self.params, vne=vne, spread_annual=6.0, indexador='IPCA') for vne in (1000.0, 2000.0)]
+        result = self.calc.key_rate_dv01(bonds, 'ipca')
+        self.assertEqual(result['key_rate_dv01'].shape, (2, len(self.calc.real_curve)))
+        self.assertTrue(np.all(result['dv01'] > 0))
+        np.testing.assert_allclose(result['key_rate_dv01'][1], 2 * result['key_rate_dv01'][0], rtol=1e-12)
+
+        with self.assertRaises(ValueError):
+            self.calc.key_rate_dv01([dict(self.params, spread_annual=1.0)], 'ipca')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+import parallel_pricing
+from business_calendar import BusinessCalendar
+from cash_flow import CashFlowBook
+from debenture_calculator import DebentureCalculator
+from parallel_pricing import SharedArrays, _init_worker, _publish_calculator
+
+
+def _curve_calculator():
+    calc = DebentureCalculator()
+    calc.di_curve = pd.DataFrame({'dias_uteis': [21, 126, 252, 504, 1008, 2520],
+                                  'taxa': [14.9, 14.6, 14.2, 13.8, 13.5, 13.4]})
+    calc.ipca_curve = pd.DataFrame({'dias_uteis': [252, 504, 1008, 2520],
+                                    'taxa_real': [6.8, 6.9, 7.0, 7.1]})
+    return calc
+
+
+def _book_bonds():
+    bonds = []
+    for i in range(24):
+        bonds.append(dict(
+            emission_date=datetime(2025, 1, 15), maturity_date=datetime(2028 + i % 3, 1, 15),
+            vne=1000.0 + 10 * i, cdi_rate_annual=10.0, spread_annual=1.0 + (i % 5) / 10,
+            interest_frequency='semestral', amort_type='sac',
+            indexador='IPCA' if i % 4 == 0 else 'CDI'
+        ))
+    return bonds
+
+
+class SharedArraysTest(unittest.TestCase):
+    def test_attached_views_match_published_arrays(self):
+        arrays = {'calendar': np.arange(1000, dtype=np.int32), 'rates': np.linspace(10, 14, 7)}
+        shared = SharedArrays(arrays)
+        try:
+            shm, attached = SharedArrays.attach(shared.manifest)
+            for key, array in arrays.items():
+                np.testing.assert_array_equal(attached[key], array)
+                self.assertEqual(attached[key].dtype, array.dtype)
+                self.assertFalse(attached[key].flags.writeable)
+            del attached
+            shm.close()
+        finally:
+            shared.close()
+
+
+class WorkerCalendarTest(unittest.TestCase):
+    def test_worker_calendar_matches_parent(self):
+        # Feriado fictício: só existe na fonte de feriados do processo pai
+        holiday_dates = {date(2024, 12, 20), date(2031, 3, 12)}
+        calc = DebentureCalculator()
+        calc.calendar = BusinessCalendar(holiday_dates)
+
+        arrays, state = _publish_calculator(calc, datetime(2025, 1, 15), datetime(2028, 1, 15))
+        self.assertLessEqual(state['calendar_start'], date(2024, 12, 15).toordinal())
+
+        shared = SharedArrays(arrays)
+        try:
+            _init_worker(shared.manifest, state)
+            shm, worker = parallel_pricing._worker
+            # Dentro e fora da janela publicada: mesmos dias úteis do processo pai
+            for start, end in ((datetime(2024, 12, 16), datetime(2025, 1, 15)),
+                               (datetime(2031, 3, 1), datetime(2031, 4, 1))):
+                self.assertEqual(worker.count_business_days(start, end),
+                                 calc.calendar.count_business_days(start, end))
+            self.assertFalse(worker.calendar.is_business_day(datetime(2031, 3, 12)))
+            parallel_pricing._worker = None
+            worker.calendar = None
+            shm.close()
+        finally:
+            shared.close()
+
+
+class ParallelPortfolioTest(unittest.TestCase):
+    def test_parallel_matches_serial(self):
+        calc = _curve_calculator()
+        bonds = _book_bonds()
+
+        serial = calc.price_portfolio(bonds)
+        parallel = calc.price_portfolio(bonds, workers=2)
+
+        self.assertIsInstance(parallel, CashFlowBook)
+        self.assertEqual(len(parallel), len(bonds))
+        for expected, cash_flow in zip(serial, parallel):
+            self.assertEqual(cash_flow.indexador, expected.indexador)
+            self.assertEqual(calc.cash_flow_to_json(cash_flow), calc.cash_flow_to_json(expected))
+
+    def test_ipca_projection_per_bond(self):
+        # Sem curvas: o VNA de cada título IPCA+ usa o próprio IPCA projetado
+        bonds = [dict(bond, ipca_projected_annual=3.0 + i) for i, bond in enumerate(_book_bonds()[:12])]
+        parallel = DebentureCalculator().price_portfolio(bonds, workers=2)
+
+        for bond, cash_flow in zip(bonds, parallel):
+            expected = DebentureCalculator().generate_cash_flow(**bond)
+            np.testing.assert_allclose(cash_flow.pmt, expected.pmt, rtol=1e-10)
+
+    def test_book_reorders_without_losing_columns(self):
+        cash_flows = _curve_calculator().price_portfolio(_book_bonds()[:6])
+        book = CashFlowBook.from_cash_flows(cash_flows)
+        reordered = book.take([5, 0, 3])
+
+        for position, original in zip([5, 0, 3], reordered):
+            np.testing.assert_array_equal(original.pmt, cash_flows[position].pmt)
+            self.assertEqual(original.indexador, cash_flows[position].indexador)
+            self.assertEqual(original.vna_atualizado is None, cash_flows[position].vna_atualizado is None)
+
+
+if __name__ == '__main__':
+    unittest.main()
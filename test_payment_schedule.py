@@ -0,0 +1,60 @@
+import unittest
+from datetime import datetime
+
+import holidays
+
+from business_calendar import BusinessCalendar
+from debenture_calculator import DebentureCalculator
+from payment_schedule import PaymentSchedule, ScheduleCache, default_schedule_cache
+
+
+class PaymentScheduleTest(unittest.TestCase):
+    def setUp(self):
+        default_schedule_cache.clear()
+        self.calc = DebentureCalculator()
+        self.args = (datetime(2025, 1, 31), datetime(2027, 1, 31), 'trimestral', 6)
+
+    def test_schedule_is_memoized_and_immutable(self):
+        schedule = self.calc.payment_schedule(*self.args)
+        self.assertIs(DebentureCalculator().payment_schedule(*self.args), schedule)
+        self.assertEqual(default_schedule_cache.hits, 1)
+
+        with self.assertRaises(AttributeError):
+            schedule.interest_dates = ()
+        with self.assertRaises(ValueError):
+            schedule.business_days[0] = 0
+
+        # Listas devolvidas ao chamador são cópias
+        interest_dates, amort_dates = self.calc.generate_payment_dates(*self.args)
+        expected = len(interest_dates)
+        interest_dates.clear()
+        self.assertEqual(len(self.calc.payment_schedule(*self.args)), expected)
+
+    def test_day_counts_match_calendar(self):
+        schedule = self.calc.payment_schedule(*self.args)
+        previous = self.args[0]
+        for i, payment_date in enumerate(schedule.interest_dates):
+            self.assertEqual(schedule.business_days[i], self.calc.count_business_days(previous, payment_date))
+            self.assertEqual(schedule.calendar_days[i], (payment_date - previous).days)
+            self.assertEqual(schedule.cumulative_business_days[i],
+                             self.calc.count_business_days(self.args[0], payment_date))
+            self.assertEqual(bool(schedule.amortizes[i]), payment_date in schedule.amort_dates)
+            previous = payment_date
+
+    def test_new_calendar_gets_new_schedule(self):
+        schedule = self.calc.payment_schedule(*self.args)
+        self.calc.calendar = BusinessCalendar(holidays.Brazil())
+        self.assertIsNot(self.calc.payment_schedule(*self.args), schedule)
+
+    def test_cache_is_bounded(self):
+        cache = ScheduleCache(max_size=2)
+        for maturity_year in (2026, 2027, 2028):
+            args = (datetime(2025, 1, 15), datetime(maturity_year, 1, 15), 'anual', 0)
+            cache.get(args, lambda: PaymentSchedule(args[0], *self.calc._build_payment_dates(*args),
+                                                    self.calc.calendar))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.misses, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from debenture_calculator import DebentureCalculator
+
+
+def _curve_calculator():
+    calc = DebentureCalculator()
+    calc.di_curve = pd.DataFrame({'dias_uteis': [21, 126, 252, 504, 1008, 2520],
+                                  'taxa': [14.9, 14.6, 14.2, 13.8, 13.5, 13.4]})
+    calc.ipca_curve = pd.DataFrame({'dias_uteis': [252, 504, 1008, 2520],
+                                    'taxa_real': [6.8, 6.9, 7.0, 7.1]})
+    return calc
+
+
+class VectorizedEngineTest(unittest.TestCase):
+    def assertSameCashFlow(self, calc, **kwargs):
+        loop = calc.generate_cash_flow(engine='loop', **kwargs)
+        vectorized = calc.generate_cash_flow(engine='vectorized', **kwargs)
+
+        self.assertEqual(len(loop), len(vectorized))
+        for expected, row in zip(loop, vectorized):
+            self.assertEqual(expected.keys(), row.keys())
+            for key, value in expected.items():
+                if isinstance(value, float):
+                    self.assertAlmostEqual(row[key], value, delta=1e-9 * max(1.0, abs(value)),
+                                           msg=f"{key} evento {expected['evento']}")
+                else:
+                    self.assertEqual(row[key], value, msg=f"{key} evento {expected['evento']}")
+
+    def test_cdi_matches_loop(self):
+        base = dict(emission_date=datetime(2025, 3, 12), maturity_date=datetime(2030, 3, 12),
+                    vne=1000.0, cdi_rate_annual=10.65, spread_annual=1.5, indexador='CDI')
+
+        calc = DebentureCalculator()
+        self.assertSameCashFlow(calc, interest_frequency='semestral', amort_type='sac',
+                                grace_period_months=24, **base)
+        self.assertSameCashFlow(calc, interest_frequency='mensal', amort_type='bullet', **base)
+
+        calc = _curve_calculator()
+        _, amort_dates = calc.generate_payment_dates(base['emission_date'], base['maturity_date'],
+                                                     'trimestral', 36)
+        weights = np.arange(1, len(amort_dates) + 1, dtype=float)
+        self.assertSameCashFlow(calc, interest_frequency='trimestral', amort_type='custom',
+                                grace_period_months=36,
+                                custom_amort_percentages=(weights / weights.sum() * 100).tolist(),
+                                **base)
+        self.assertSameCashFlow(calc, interest_frequency='trimestral', amort_type='sac',
+                                grace_period_months=36, **base)
+        self.assertSameCashFlow(calc, interest_frequency='semestral', amort_type='price',
+                                cdi_projection='forward', **base)
+
+    def test_ipca_matches_loop(self):
+        base = dict(emission_date=datetime(2024, 7, 15), maturity_date=datetime(2029, 7, 15),
+                    vne=1000.0, cdi_rate_annual=0.0, spread_annual=6.2, indexador='IPCA',
+                    anniversary_day_ipca=15)
+
+        calc = DebentureCalculator()
+        self.assertSameCashFlow(calc, interest_frequency='semestral', amort_type='sac',
+                                grace_period_months=24, ipca_projected_annual=4.5, **base)
+        self.assertSameCashFlow(calc, interest_frequency='mensal', amort_type='bullet',
+                                ipca_custom_indices={'2024-06': 7000.0, '2024-07': 7020.0,
+                                                     '2024-08': 7035.0, '2024-09': 7060.0},
+                                **base)
+
+        calc = _curve_calculator()
+        self.assertSameCashFlow(calc, interest_frequency='anual', amort_type='sac', **base)
+
+    def test_rejects_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            DebentureCalculator().generate_cash_flow(
+                emission_date=datetime(2025, 3, 12), maturity_date=datetime(2026, 3, 12), vne=1000.0,
+                cdi_rate_annual=10.0, spread_annual=1.0, interest_frequency='anual',
+                amort_type='bullet', engine='gpu'
+            )
+
+
+class PortfolioTest(unittest.TestCase):
+    def test_bonds_sharing_a_schedule_are_priced_together(self):
+        calc = _curve_calculator()
+        cdi = dict(emission_date=datetime(2025, 3, 12), maturity_date=datetime(2030, 3, 12),
+                   cdi_rate_annual=0.0, interest_frequency='semestral', amort_type='sac',
+                   grace_period_months=24, indexador='CDI')
+        ipca = dict(emission_date=datetime(2024, 7, 15), maturity_date=datetime(2029, 7, 15),
+                    cdi_rate_annual=0.0, interest_frequency='anual', amort_type='bullet',
+                    indexador='IPCA')
+        bonds = [
+            dict(cdi, vne=1000.0, spread_annual=1.5),
+            dict(ipca, vne=5000.0, spread_annual=6.0),
+            dict(cdi, vne=250.0, spread_annual=0.8),
+            dict(cdi, vne=1000.0, spread_annual=1.5, cdi_projection='forward'),
+            dict(ipca, vne=1000.0, spread_annual=7.1),
+        ]
+
+        with mock.patch.object(calc, '_schedule_arrays', wraps=calc._schedule_arrays) as schedule:
+            cash_flows = calc.price_portfolio(bonds)
+            self.assertEqual(schedule.call_count, 3)
+
+        self.assertEqual(len(cash_flows), len(bonds))
+        for bond, cash_flow in zip(bonds, cash_flows):
+            expected = calc.generate_cash_flow(engine='loop', **bond)
+            self.assertEqual(cash_flow.indexador, bond['indexador'])
+            np.testing.assert_allclose(cash_flow.pmt, expected.pmt, rtol=1e-10)
+            np.testing.assert_allclose(cash_flow.saldo_devedor, expected.saldo_devedor, rtol=1e-10)
+            np.testing.assert_array_equal(cash_flow.dias_uteis, expected.dias_uteis)
+
+        # Colunas do cronograma são compartilhadas entre títulos do mesmo grupo
+        self.assertTrue(np.shares_memory(cash_flows[0].dias_uteis, cash_flows[2].dias_uteis))
+
+    def test_each_bond_uses_its_own_ipca_projection(self):
+        ipca = dict(emission_date=datetime(2024, 7, 15), maturity_date=datetime(2027, 7, 15), vne=1000.0,
+                    cdi_rate_annual=0.0, spread_annual=6.0, interest_frequency='semestral',
+                    amort_type='bullet', indexador='IPCA')
+        bonds = [dict(ipca, ipca_projected_annual=3.0), dict(ipca, ipca_projected_annual=8.0)]
+
+        cash_flows = DebentureCalculator().price_portfolio(bonds)
+        for bond, cash_flow in zip(bonds, cash_flows):
+            expected = DebentureCalculator().generate_cash_flow(**bond)
+            np.testing.assert_allclose(cash_flow.pmt, expected.pmt, rtol=1e-10)
+        self.assertGreater(cash_flows[1].pmt[-1], cash_flows[0].pmt[-1])
+
+
+class SweepTest(unittest.TestCase):
+    def test_scenarios_match_individual_runs(self):
+        calc = _curve_calculator()
+        base = dict(emission_date=datetime(2024, 7, 15), maturity_date=datetime(2029, 7, 15),
+                    interest_frequency='semestral', amort_type='sac', grace_period_months=12,
+                    indexador='IPCA')
+
+        scenarios = calc.sweep(vne=1000.0, cdi_rate_annual=0.0, spread_annual=[5.5, 6.0, 6.5], **base)
+        self.assertEqual([s['spread'] for s in scenarios], [5.5, 6.0, 6.5])
+        for scenario in scenarios:
+            expected = calc.generate_cash_flow(vne=1000.0, cdi_rate_annual=0.0,
+                                               spread_annual=scenario['spread'], **base)
+            np.testing.assert_allclose(scenario['cash_flow'].pmt, expected.pmt, rtol=1e-10)
+            metrics = calc.calculate_metrics(expected, base['emission_date'], 1000.0, 0.0, scenario['spread'])
+            self.assertAlmostEqual(scenario['metrics']['duration_years'], metrics['duration_years'], places=10)
+
+        grid = DebentureCalculator().sweep(vne=[1000.0, 2000.0], cdi_rate_annual=[10.0, 11.0, 12.0],
+                                           spread_annual=1.0, grid=True, **dict(base, indexador='CDI'))
+        self.assertEqual(len(grid), 6)
+        self.assertEqual((grid[5]['vne'], grid[5]['cdi_rate']), (2000.0, 12.0))
+
+        with self.assertRaises(ValueError):
+            calc.sweep(vne=[1000.0, 2000.0], cdi_rate_annual=0.0, spread_annual=[1.0, 2.0, 3.0], **base)
+
+    def test_sweep_endpoint(self):
+        from app import app
+
+        response = app.test_client().post('/sweep', json={
+            'emission_date': '2025-03-12', 'maturity_date': '2028-03-12', 'vne': 1000,
+            'spread': 1.0, 'spreads': [0.5, 1.0], 'cdi_rate': 10.65,
+            'interest_frequency': 'semestral', 'amort_type': 'bullet'
+        })
+        body = response.get_json()
+        self.assertTrue(body['success'])
+        self.assertEqual([s['spread'] for s in body['scenarios']], [0.5, 1.0])
+        self.assertEqual(len(body['scenarios'][0]['cash_flow']), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()